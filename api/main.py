@@ -1,12 +1,19 @@
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import os
 import uuid
+import shutil
+import asyncio
+import threading
 from typing import Optional
 from fastapi.staticfiles import StaticFiles
-from text2sql.orchestrator import Orchestrator
-from .state import add_history, list_history, create_task, update_task, get_task, run_batch
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+# metrics 取编排模块实际使用的同一模块对象，指标与请求计时共用一份注册表
+from text2sql.orchestrator import Orchestrator, metrics
+from text2sql.task_scheduler import TaskScheduler
+from .upload import receive_multipart
+from .state import add_history, list_history, create_task, update_task, get_task, get_task_store, run_batch
 from urllib.parse import urlparse
 
 class ChatConfig(BaseModel):
@@ -38,6 +45,8 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1 << 20)))
+
 downloads_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "results")
 app.mount("/v1/downloads", StaticFiles(directory=downloads_dir), name="downloads")
 
@@ -62,74 +71,160 @@ def _load_env_file():
 
 _load_env_file()
 orchestrator = Orchestrator()
+scheduler = TaskScheduler(get_task_store())
+scheduler.register("batch_query", lambda payload, progress, cancel: run_batch(orchestrator, payload, progress=progress, cancel=cancel))
+scheduler.recover()
+
+async def _watch_disconnect(request: Request, cancel: threading.Event):
+    while not cancel.is_set():
+        if await request.is_disconnected():
+            cancel.set()
+            return
+        await asyncio.sleep(0.5)
 
 @app.post("/v1/chat/completion")
-def chat_completion(req: ChatRequest):
-    limit = req.limit or 100
-    explain = getattr(req.config, "explain", False)
-    dry_run = not req.config.execute_sql
-    res = orchestrator.run_to_result(req.message, limit=limit, explain=explain, dry_run=dry_run, show_schema=req.config.show_schema_insight)
+async def chat_completion(req: ChatRequest, request: Request):
+    timer = metrics.StageTimer()
+    status = "error"
+    try:
+        out = await _chat_completion(req, request, timer)
+        status = "success"
+        return out
+    finally:
+        metrics.REQUEST_SECONDS.observe(timer.elapsed_ms() / 1000, status=status)
+
+async def _chat_completion(req: ChatRequest, request: Request, timer: metrics.StageTimer):
+    cancel = threading.Event()
+    watcher = asyncio.create_task(_watch_disconnect(request, cancel))
+    try:
+        limit = req.limit or 100
+        explain = getattr(req.config, "explain", False)
+        dry_run = not req.config.execute_sql
+        res = await orchestrator.arun_to_result(req.message, limit=limit, explain=explain, dry_run=dry_run, show_schema=req.config.show_schema_insight, cancel=cancel, timer=timer)
+    finally:
+        watcher.cancel()
     sql = res.get("sql")
     data = {
         "sql_query": sql or "",
         "explanation": "",
         "query_result": None,
         "exports": {"json_url": None},
-        "metadata": {"tables_involved": [], "execution_time_ms": 0}
+        "metadata": {"tables_involved": res.get("tables") or [], "execution_time_ms": 0, "truncated": bool(res.get("truncated")), "cache_hit": bool(res.get("cache_hit"))}
     }
-    if res.get("plan_rows") and res.get("plan_headers"):
-        data["plan"] = {"columns": res.get("plan_headers"), "rows": [list(r) for r in res.get("plan_rows") or []]}
-    if sql:
-        rows = res.get("rows") or []
-        headers = res.get("headers") or []
-        data["query_result"] = {"columns": headers, "rows": [list(r) for r in rows]}
-        if req.config.export_json and rows:
-            p = orchestrator.out.save_json(req.message, sql, rows, headers)
-            data["exports"]["json_url"] = "/v1/downloads/" + os.path.basename(p)
-    add_history({"id": uuid.uuid4().hex, "query_text": req.message, "sql_generated": sql or "", "created_at": __import__("datetime").datetime.utcnow().isoformat() + "Z"})
-    return {"code": 200, "status": "success", "data": data}
+    with timer.stage("format"):
+        if res.get("plan_rows") and res.get("plan_headers"):
+            data["plan"] = {"columns": res.get("plan_headers"), "rows": res.get("plan_rows")}
+        if sql:
+            rows = res.get("rows") or []
+            headers = res.get("headers") or []
+            # 结果集（ResultSet，按列存储）原样放入响应，由 orjson 编码时直接输出为行数组，不逐行复制
+            data["query_result"] = {"columns": headers, "rows": rows}
+    if sql and req.config.export_json and rows:
+        with timer.stage("export"):
+            p = await orchestrator.run_blocking(orchestrator.out.save_json, req.message, sql, rows, headers)
+        data["exports"]["json_url"] = "/v1/downloads/" + os.path.basename(p)
+    with timer.stage("history"):
+        await orchestrator.run_blocking(add_history, {"id": uuid.uuid4().hex, "query_text": req.message, "sql_generated": sql or "", "created_at": __import__("datetime").datetime.utcnow().isoformat() + "Z"})
+    data["metadata"].update(timer.metadata())
+    data["metadata"]["execution_time_ms"] = timer.elapsed_ms()
+    return Response(orchestrator.out.dumps({"code": 200, "status": "success", "data": data}), media_type="application/json")
 
+@app.get("/v1/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/v1/user/history")
-def get_history(page: int = 1, limit: int = 10):
-    items = list_history(page, limit)
+def get_history(page: int = 1, limit: int = 10, q: Optional[str] = None):
+    items = list_history(page, limit, q)
     return {"code": 200, "data": items}
 
-@app.post("/v1/tools/upload")
-async def upload(file: UploadFile = File(...), task_type: str = Form(...)):
+def _upload_dirs() -> tuple[str, str]:
     project_root = os.path.dirname(os.path.dirname(__file__))
     upload_dir = os.path.join(os.path.dirname(project_root), "upload")
-    os.makedirs(upload_dir, exist_ok=True)
+    return upload_dir, orchestrator.kb_dir or os.getenv("KB_DIR", None) or upload_dir
+
+def _form_int(fields: dict, name: str, default):
+    raw = (fields.get(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f"{name} 需为整数")
+
+@app.post("/v1/tools/upload")
+async def upload(request: Request):
+    max_bytes = int(float(os.getenv("UPLOAD_MAX_MB", "200")) * 1024 * 1024)
+    # 请求体未读完就拒绝，响应后关闭连接，服务器不再继续接收剩余数据
+    too_large = JSONResponse(status_code=413, content={"code": 413, "message": f"文件超过上限 {max_bytes // (1024 * 1024)} MB"}, headers={"Connection": "close"})
+    bad_request = lambda msg: JSONResponse(status_code=400, content={"code": 400, "message": msg})
+    try:
+        length = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        length = -1
+    if length < 0:
+        return bad_request("Content-Length 无效")
+    # multipart 分隔与表单字段另有少量开销，Content-Length 明显超限时直接拒绝，不读取请求体
+    if length > max_bytes + 64 * 1024:
+        return too_large
+    upload_dir, kb_dir = _upload_dirs()
+    # 不声明 File/Form 参数，框架不会先把整个请求体解析并转存；这里边读边解析，超限即停止读取
+    # 前端先发送文件再发送 task_type，文件先写入批量目录的临时文件，知识库上传完成后再移动
+    try:
+        received = await receive_multipart(request.stream(), request.headers.get("content-type", ""), upload_dir, max_bytes, orchestrator.run_blocking, UPLOAD_CHUNK_SIZE)
+    except ValueError as e:
+        return bad_request(str(e))
+    if received is None:
+        return too_large
+    tmp, digest, size = received.path, received.sha256, received.size
+    try:
+        task_type = received.fields.get("task_type") or ""
+        if not task_type:
+            raise ValueError("缺少 task_type 字段")
+        llm_workers = _form_int(received.fields, "llm_workers", None)
+        db_workers = _form_int(received.fields, "db_workers", None)
+        priority = _form_int(received.fields, "priority", 0)
+    except ValueError as e:
+        os.remove(tmp)
+        return bad_request(str(e))
     task_id = f"task_{uuid.uuid4().hex[:8]}"
-    out_path = os.path.join(upload_dir, task_id + "_" + (file.filename or "upload.bin"))
-    with open(out_path, "wb") as f:
-        f.write(await file.read())
-    create_task(task_id, task_type)
+    name = os.path.basename(received.filename or "") or "upload.bin"
     if task_type == "batch_query":
-        import threading
-        t = threading.Thread(target=run_batch, args=(orchestrator, out_path, task_id))
-        t.daemon = True
-        t.start()
-    else:
-        kb_dir = os.path.join(os.path.dirname(project_root), "upload")
-        os.makedirs(kb_dir, exist_ok=True)
-        dst = os.path.join(kb_dir, file.filename)
-        try:
-            os.replace(out_path, dst)
-        except Exception:
-            pass
+        out_path = os.path.join(upload_dir, task_id + "_" + name)
+        os.replace(tmp, out_path)
+        scheduler.submit(task_id, task_type, {"file_path": out_path, "llm_workers": llm_workers, "db_workers": db_workers, "sha256": digest}, priority)
+        return {"code": 200, "message": "文件上传成功，任务已排队", "data": {"task_id": task_id, "status": "queued", "estimated_time": "30s"}}
+    create_task(task_id, task_type)
+    dst = os.path.join(kb_dir, name)
+    dup = await orchestrator.run_blocking(orchestrator.rag_index.find_by_hash, digest, kb_dir)
+    if dup is not None:
+        # 知识库中已有相同内容的文件，不重复保存与索引
+        os.remove(tmp)
         update_task(task_id, status="completed", progress=100)
-    return {"code": 200, "message": "文件上传成功，任务处理中", "data": {"task_id": task_id, "status": "processing", "estimated_time": "30s"}}
+        return {"code": 200, "message": "知识库中已存在相同内容的文件", "data": {"task_id": task_id, "status": "completed", "duplicate_of": os.path.basename(dup), "sha256": digest, "size": size}}
+    # 知识库目录可能与批量目录不在同一文件系统，move 在同一文件系统内只是改名
+    await orchestrator.run_blocking(shutil.move, tmp, dst)
+    try:
+        await orchestrator.run_blocking(orchestrator.rag_index.ingest_file, dst, digest)
+        update_task(task_id, status="completed", progress=100)
+    except Exception as e:
+        update_task(task_id, status="failed", progress=100, error=str(e))
+    return {"code": 200, "message": "文件上传成功，任务处理中", "data": {"task_id": task_id, "status": "processing", "estimated_time": "30s", "sha256": digest, "size": size}}
 
 @app.get("/v1/tools/task/{task_id}")
 def get_task_status(task_id: str):
     t = get_task(task_id) or {"task_id": task_id, "status": "failed", "progress": 0}
     return {"code": 200, "data": t}
 
+@app.post("/v1/tools/task/{task_id}/cancel")
+def cancel_task(task_id: str):
+    if not scheduler.cancel(task_id):
+        return {"code": 404, "message": "任务不存在或已结束", "data": get_task(task_id)}
+    return {"code": 200, "data": get_task(task_id)}
+
 @app.get("/v1/rag/show")
 def show_rag():
-    project_root = os.path.dirname(os.path.dirname(__file__))
-    kb_dir = orchestrator.kb_dir or os.getenv("KB_DIR", None) or os.path.join(os.path.dirname(project_root), "upload")
+    _, kb_dir = _upload_dirs()
     if not kb_dir or not os.path.isdir(kb_dir):
         return {"code": 200, "data": {"count": 0, "files": [], "previews": []}}
     files = []
@@ -138,6 +233,8 @@ def show_rag():
         text_exts = {".txt", ".md", ".json", ".csv", ".xml", ".py", ".sql", ".log", ".ini", ".cfg"}
         for root, _, fnames in os.walk(kb_dir):
             for fn in fnames:
+                if fn.startswith(".upload_"):
+                    continue
                 count += 1
                 full = os.path.join(root, fn)
                 ext = os.path.splitext(fn)[1].lower()
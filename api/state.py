@@ -1,5 +1,6 @@
 import os
 import json
+import sqlite3
 import threading
 import time
 from typing import Any
@@ -11,7 +12,6 @@ _history_path = os.path.join(_base, "history.json")
 _tasks_path = os.path.join(_base, "tasks.json")
 
 _lock = threading.Lock()
-_tasks: dict[str, dict[str, Any]] = {}
 
 def _load_json(path: str) -> Any:
     if not os.path.exists(path):
@@ -22,46 +22,208 @@ def _load_json(path: str) -> Any:
     except Exception:
         return None
 
-def _save_json(path: str, data: Any):
-    try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception:
-        pass
+_HISTORY_FIELDS = ("id", "query_text", "sql_generated", "created_at")
 
-def add_history(item: dict):
+class HistoryStore:
+    def __init__(self, path: str, max_entries: int | None = None, legacy_path: str | None = None):
+        self.path = path
+        self.max_entries = int(max_entries if max_entries is not None else os.getenv("HISTORY_MAX_ENTRIES", "10000"))
+        self.legacy_path = legacy_path
+        self.fts = True
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS history (seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT, query_text TEXT NOT NULL DEFAULT '', sql_generated TEXT NOT NULL DEFAULT '', created_at TEXT, extra TEXT)")
+            try:
+                # trigram 分词不依赖空格，中文问题也能按子串检索
+                conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(query_text, sql_generated, content='history', content_rowid='seq', tokenize='trigram')")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN INSERT INTO history_fts(rowid, query_text, sql_generated) VALUES (new.seq, new.query_text, new.sql_generated); END")
+                conn.execute("CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN INSERT INTO history_fts(history_fts, rowid, query_text, sql_generated) VALUES ('delete', old.seq, old.query_text, old.sql_generated); END")
+            except sqlite3.OperationalError:
+                self.fts = False
+            self._conn = conn
+            self._migrate()
+        return self._conn
+
+    def _migrate(self):
+        # 旧版 results/history.json（新记录在前）导入一次后改名保留
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        data = _load_json(self.legacy_path)
+        if isinstance(data, list) and self._conn.execute("SELECT 1 FROM history LIMIT 1").fetchone() is None:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT INTO history (id, query_text, sql_generated, created_at, extra) VALUES (?, ?, ?, ?, ?)", [self._row(it) for it in reversed(data) if isinstance(it, dict)])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+
+    def _row(self, item: dict) -> tuple:
+        extra = {k: v for k, v in item.items() if k not in _HISTORY_FIELDS}
+        return (item.get("id"), item.get("query_text") or "", item.get("sql_generated") or "", item.get("created_at"), json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    def _item(self, row) -> dict:
+        item = dict(zip(_HISTORY_FIELDS, row[:4]))
+        if row[4]:
+            item.update(json.loads(row[4]))
+        return item
+
+    def add(self, item: dict):
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT INTO history (id, query_text, sql_generated, created_at, extra) VALUES (?, ?, ?, ?, ?)", self._row(item))
+            self._writes += 1
+            if self.max_entries > 0 and self._writes % 64 == 0:
+                # 保留最新的 max_entries 条，按自增序号整段删除，摊销到每 64 次写入一次
+                db.execute("DELETE FROM history WHERE seq <= (SELECT MAX(seq) FROM history) - ?", (self.max_entries,))
+
+    def list(self, page: int = 1, limit: int = 10, q: str | None = None) -> list[dict]:
+        limit = max(1, int(limit))
+        offset = max(0, int(page) - 1) * limit
+        where, params = self._search(q)
+        with self._lock:
+            rows = self._db().execute(f"SELECT id, query_text, sql_generated, created_at, extra FROM history{where} ORDER BY seq DESC LIMIT ? OFFSET ?", (*params, limit, offset)).fetchall()
+        return [self._item(r) for r in rows]
+
+    def _search(self, q: str | None) -> tuple[str, list]:
+        terms = (q or "").split()
+        if not terms:
+            return "", []
+        conds, params = [], []
+        long_terms = [t for t in terms if len(t) >= 3] if self.fts else []
+        if long_terms:
+            conds.append("seq IN (SELECT rowid FROM history_fts WHERE history_fts MATCH ?)")
+            params.append(" ".join('"' + t.replace('"', '""') + '"' for t in long_terms))
+        for t in terms:
+            if t not in long_terms:
+                # trigram 索引无法匹配少于 3 个字符的词，退回 LIKE
+                pat = "%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                conds.append("(query_text LIKE ? ESCAPE '\\' OR sql_generated LIKE ? ESCAPE '\\')")
+                params += [pat, pat]
+        return " WHERE " + " AND ".join(conds), params
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_history = None
+
+def get_history_store() -> HistoryStore:
+    global _history
     with _lock:
-        data = _load_json(_history_path) or []
-        data.insert(0, item)
-        if len(data) > 500:
-            data = data[:500]
-        _save_json(_history_path, data)
-
-def list_history(page: int, limit: int) -> list[dict]:
-    data = _load_json(_history_path) or []
-    start = (page - 1) * limit
-    end = start + limit
-    return data[start:end]
-
-def create_task(task_id: str, task_type: str):
+        if _history is None:
+            # 旧 JSON 只迁移到默认位置的库；自定义库路径（如基准测试）不接管 results/history.json
+            path = os.getenv("HISTORY_DB_PATH", None)
+            _history = HistoryStore(path or os.path.join(_base, "history.sqlite3"), legacy_path=None if path else _history_path)
+        return _history
+
+def add_history(item: dict):
+    get_history_store().add(item)
+
+def list_history(page: int, limit: int, q: str | None = None) -> list[dict]:
+    return get_history_store().list(page, limit, q)
+
+_TASK_FIELDS = ("task_id", "task_type", "status", "progress", "done", "total", "priority", "result_url", "error", "created_at", "updated_at")
+_TASK_COLUMNS = frozenset(_TASK_FIELDS) - {"task_id", "task_type", "created_at"}
+
+class TaskStore:
+    def __init__(self, path: str, legacy_path: str | None = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS tasks (task_id TEXT PRIMARY KEY, task_type TEXT NOT NULL, status TEXT NOT NULL, progress INTEGER NOT NULL DEFAULT 0, done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0, priority INTEGER NOT NULL DEFAULT 0, result_url TEXT, error TEXT, payload TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status)")
+            self._conn = conn
+            self._migrate()
+        return self._conn
+
+    def _migrate(self):
+        # 旧版 results/tasks.json 只导入状态；其中未完成的任务缺少参数，无法恢复，记为失败
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return
+        data = _load_json(self.legacy_path)
+        if isinstance(data, dict):
+            now = time.time()
+            rows = []
+            for tid, t in data.items():
+                if not isinstance(t, dict):
+                    continue
+                status = t.get("status") if t.get("status") in ("completed", "failed") else "failed"
+                rows.append((tid, t.get("task_type") or "", status, int(t.get("progress") or 0), t.get("result_url"), now, now))
+            self._conn.executemany("INSERT OR IGNORE INTO tasks (task_id, task_type, status, progress, result_url, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+
+    def create(self, task_id: str, task_type: str, payload: dict | None = None, priority: int = 0, status: str = "queued"):
+        now = time.time()
+        with self._lock:
+            self._db().execute("INSERT OR REPLACE INTO tasks (task_id, task_type, status, priority, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               (task_id, task_type, status, int(priority), json.dumps(payload or {}, ensure_ascii=False), now, now))
+
+    def update(self, task_id: str, **fields):
+        fields = {k: v for k, v in fields.items() if k in _TASK_COLUMNS}
+        fields["updated_at"] = time.time()
+        cols = ", ".join(f"{k}=?" for k in fields)
+        with self._lock:
+            self._db().execute(f"UPDATE tasks SET {cols} WHERE task_id=?", (*fields.values(), task_id))
+
+    def get(self, task_id: str) -> dict | None:
+        with self._lock:
+            row = self._db().execute(f"SELECT {', '.join(_TASK_FIELDS)} FROM tasks WHERE task_id=?", (task_id,)).fetchone()
+        return dict(zip(_TASK_FIELDS, row)) if row else None
+
+    def unfinished(self) -> list[dict]:
+        with self._lock:
+            rows = self._db().execute(f"SELECT {', '.join(_TASK_FIELDS)}, payload FROM tasks WHERE status IN ('queued', 'processing') ORDER BY created_at").fetchall()
+        return [dict(zip(_TASK_FIELDS, r[:-1]), payload=json.loads(r[-1] or "{}")) for r in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+_task_store = None
+
+def get_task_store() -> TaskStore:
+    global _task_store
     with _lock:
-        _tasks[task_id] = {"task_id": task_id, "task_type": task_type, "status": "processing", "progress": 0, "result_url": None}
-        _save_json(_tasks_path, _tasks)
+        if _task_store is None:
+            path = os.getenv("TASK_DB_PATH", None)
+            _task_store = TaskStore(path or os.path.join(_base, "tasks.sqlite3"), legacy_path=None if path else _tasks_path)
+        return _task_store
+
+def create_task(task_id: str, task_type: str, status: str = "processing"):
+    get_task_store().create(task_id, task_type, status=status)
 
 def update_task(task_id: str, **kwargs):
-    with _lock:
-        if task_id in _tasks:
-            _tasks[task_id].update(kwargs)
-            _save_json(_tasks_path, _tasks)
+    get_task_store().update(task_id, **kwargs)
 
 def get_task(task_id: str) -> dict | None:
-    with _lock:
-        return _tasks.get(task_id)
+    return get_task_store().get(task_id)
 
-def run_batch(orchestrator, file_path: str, task_id: str, limit: int = 100):
-    try:
-        update_task(task_id, progress=10)
-        orchestrator.run_batch_file(file_path, limit, as_json=True)
-        update_task(task_id, status="completed", progress=100)
-    except Exception:
-        update_task(task_id, status="failed", progress=100)
\ No newline at end of file
+def run_batch(orchestrator, payload: dict, progress=None, cancel: threading.Event | None = None) -> dict:
+    p = orchestrator.run_batch_file(payload["file_path"], payload.get("limit") or 100, as_json=True, llm_workers=payload.get("llm_workers"), db_workers=payload.get("db_workers"), progress=progress, cancel=cancel)
+    return {"result_url": "/v1/downloads/" + os.path.basename(p)} if p else {}
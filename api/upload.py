@@ -0,0 +1,145 @@
+"""
+上传接收模块
+功能：直接从请求体流式解析 multipart/form-data（python-multipart 的回调式解析器），不经过框架的表单解析与临时文件；
+文件部分边收边计算 sha256 并按块写入目标目录下的 .upload_*.part 临时文件，累计超过上限立即停止读取请求体并删除临时文件；
+普通表单字段保存在内存中，总长度不超过 64 KB。
+方法：
+- receive_multipart(chunks, content_type, dst_dir, max_bytes, run_blocking, chunk_size): 返回 Upload；超过上限返回 None，
+  请求格式错误（非 multipart、缺少文件、多个文件、字段过长）抛 ValueError
+"""
+import os
+import uuid
+import hashlib
+from python_multipart.multipart import MultipartParser, parse_options_header
+from python_multipart.exceptions import MultipartParseError
+
+_MAX_FIELD_BYTES = 64 * 1024
+
+class Upload:
+    __slots__ = ("fields", "filename", "path", "sha256", "size")
+    def __init__(self, fields: dict, filename: str, path: str, sha256: str, size: int):
+        self.fields = fields
+        self.filename = filename
+        self.path = path
+        self.sha256 = sha256
+        self.size = size
+
+async def _call(run_blocking, fn, *args):
+    if run_blocking is None:
+        return fn(*args)
+    return await run_blocking(fn, *args)
+
+async def receive_multipart(chunks, content_type: str, dst_dir: str, max_bytes: int, run_blocking=None, chunk_size: int = 1 << 20) -> Upload | None:
+    ctype, params = parse_options_header(content_type or "")
+    boundary = params.get(b"boundary")
+    if ctype != b"multipart/form-data" or not boundary:
+        raise ValueError("请求需为 multipart/form-data")
+    # 解析器回调是同步的：每喂入一块先收集事件，再在协程中处理（写文件进线程池）
+    events = []
+    parser = MultipartParser(boundary, {
+        "on_part_begin": lambda: events.append(("begin", b"")),
+        "on_header_field": lambda d, s, e: events.append(("hfield", d[s:e])),
+        "on_header_value": lambda d, s, e: events.append(("hvalue", d[s:e])),
+        "on_header_end": lambda: events.append(("hend", b"")),
+        "on_headers_finished": lambda: events.append(("hdone", b"")),
+        "on_part_data": lambda d, s, e: events.append(("data", d[s:e])),
+        "on_part_end": lambda: events.append(("end", b"")),
+    })
+    fields: dict[str, str] = {}
+    field_bytes = 0
+    hname = hvalue = b""
+    headers: dict[bytes, bytes] = {}
+    name = None
+    value = bytearray()
+    in_file = False
+    filename = None
+    tmp = None
+    f = None
+    h = hashlib.sha256()
+    size = 0
+    pending: list[bytes] = []
+    pending_size = 0
+
+    async def _flush():
+        nonlocal pending, pending_size
+        if pending:
+            data, pending, pending_size = b"".join(pending), [], 0
+            await _call(run_blocking, f.write, data)
+
+    async def _handle() -> bool:
+        nonlocal hname, hvalue, headers, name, value, in_file, filename, tmp, f, size, field_bytes, pending_size
+        for kind, data in events:
+            if kind == "begin":
+                hname = hvalue = b""
+                headers = {}
+                name = None
+                value = bytearray()
+            elif kind == "hfield":
+                hname += data
+            elif kind == "hvalue":
+                hvalue += data
+            elif kind == "hend":
+                headers[hname.lower()] = hvalue
+                hname = hvalue = b""
+            elif kind == "hdone":
+                _, disp = parse_options_header(headers.get(b"content-disposition", b""))
+                name = disp.get(b"name", b"").decode("utf-8", errors="replace")
+                if b"filename" in disp:
+                    if tmp is not None:
+                        raise ValueError("一次只能上传一个文件")
+                    filename = disp[b"filename"].decode("utf-8", errors="replace")
+                    os.makedirs(dst_dir, exist_ok=True)
+                    tmp = os.path.join(dst_dir, f".upload_{uuid.uuid4().hex}.part")
+                    f = open(tmp, "wb")
+                    in_file = True
+            elif kind == "data":
+                if in_file:
+                    size += len(data)
+                    if size > max_bytes:
+                        return False
+                    h.update(data)
+                    pending.append(data)
+                    pending_size += len(data)
+                    if pending_size >= chunk_size:
+                        await _flush()
+                else:
+                    field_bytes += len(data)
+                    if field_bytes > _MAX_FIELD_BYTES:
+                        raise ValueError("表单字段过长")
+                    value += data
+            elif kind == "end":
+                if in_file:
+                    await _flush()
+                    in_file = False
+                elif name:
+                    fields[name] = value.decode("utf-8", errors="replace")
+        events.clear()
+        return True
+
+    try:
+        async for chunk in chunks:
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise ValueError(f"multipart 格式错误：{e}")
+            if not await _handle():
+                return None
+        parser.finalize()
+        if not await _handle():
+            return None
+        if tmp is None:
+            raise ValueError("缺少 file 字段")
+        if in_file:
+            raise ValueError("请求体不完整")
+        await _flush()
+        f.close()
+        f = None
+        return Upload(fields, filename, tmp, h.hexdigest(), size)
+    finally:
+        if f is not None:
+            f.close()
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
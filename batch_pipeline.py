@@ -0,0 +1,53 @@
+"""
+批量查询流水线模块
+功能：分阶段并发执行批量查询：第一阶段（检索 + LLM 生成 + 护栏）与第二阶段（数据库执行）各用独立的有界线程池，
+某条问题生成完 SQL 即进入数据库阶段，无需等待整批；结果按输入顺序产出。
+配置：BATCH_LLM_WORKERS（默认 4）、BATCH_DB_WORKERS（默认 4）
+方法：
+- BatchPipeline.run(items, prepare, execute): 返回按输入顺序产出结果的迭代器
+  - prepare(item) -> (result, need_execute)：第一阶段，need_execute 为 False 时直接作为最终结果
+  - execute(result) -> result：第二阶段
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, Future
+
+class BatchPipeline:
+    def __init__(self, llm_workers: int | None = None, db_workers: int | None = None):
+        self.llm_workers = max(1, int(llm_workers or os.getenv("BATCH_LLM_WORKERS", "4")))
+        self.db_workers = max(1, int(db_workers or os.getenv("BATCH_DB_WORKERS", "4")))
+
+    def run(self, items: list, prepare, execute):
+        llm_pool = ThreadPoolExecutor(max_workers=self.llm_workers, thread_name_prefix="batch-llm")
+        db_pool = ThreadPoolExecutor(max_workers=self.db_workers, thread_name_prefix="batch-db")
+        outs = [Future() for _ in items]
+
+        def _forward(src: Future, dst: Future):
+            if src.cancelled():
+                dst.cancel()
+                return
+            e = src.exception()
+            if e is not None:
+                dst.set_exception(e)
+            else:
+                dst.set_result(src.result())
+
+        def _first(i: int, item):
+            try:
+                res, need_execute = prepare(item)
+                if not need_execute:
+                    outs[i].set_result(res)
+                    return
+                f = db_pool.submit(execute, res)
+            except BaseException as e:
+                outs[i].set_exception(e)
+                return
+            f.add_done_callback(lambda src: _forward(src, outs[i]))
+
+        try:
+            for i, item in enumerate(items):
+                llm_pool.submit(_first, i, item)
+            for f in outs:
+                yield f.result()
+        finally:
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+            db_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,11 @@
+"""
+基准测试包
+功能：离线评估各组件与整条查询链路的性能，不依赖 SiliconFlow 密钥与 MySQL 服务。
+- llm_stub: OpenAI 兼容接口的确定性本地桩服务
+- fake_mysql: 以 SQLite 为后端的 pymysql 替身（含 information_schema 与 KILL QUERY）
+- synth: 合成 Schema、数据与知识库文件
+- components: 组件微基准，输出 JSON
+- loadgen: 启动桩服务与 API 的 HTTP 压测，统计吞吐、延迟分位与错误率
+在项目目录下运行：python -m bench.components --help、python -m bench.loadgen --help
+"""
+__all__ = []
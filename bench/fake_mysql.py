@@ -0,0 +1,129 @@
+"""
+本地数据库替身
+功能：以 SQLite 文件实现 DbExecutor/SchemaProvider/ResultCache 用到的 pymysql 接口子集，
+每个库对应 <data_dir>/<库名>.sqlite3，information_schema 以附加库形式提供 columns 与 tables 两张表（由 synth.create_database 写入）。
+支持 %s 参数、SSCursor 分批读取、thread_id() 与旁路连接发送的 KILL QUERY（转为 sqlite3 interrupt）；SET 语句忽略。
+可选注入每条查询的固定延迟（latency 秒），用于观察连接池与线程池排队。
+方法：
+- install(data_dir, latency): 注册为 sys.modules["pymysql"]，须在首次连接数据库前调用
+- connect(**kwargs): 与 pymysql.connect 参数兼容
+"""
+import os
+import re
+import sys
+import time
+import zlib
+import types
+import sqlite3
+import itertools
+import threading
+
+_state = {"data_dir": None, "latency": 0.0}
+_ids = itertools.count(1)
+_live: dict[int, "Connection"] = {}
+_live_lock = threading.Lock()
+
+_KILL = re.compile(r"\s*kill\s+(?:query\s+)?(\d+)", re.I)
+
+class Error(Exception):
+    pass
+
+class OperationalError(Error):
+    pass
+
+def _translate(sql: str) -> str:
+    return sql.replace("%s", "?")
+
+class Cursor:
+    def __init__(self, conn: "Connection"):
+        self._conn = conn
+        self._cur = conn._db.cursor()
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, sql: str, params=None):
+        m = _KILL.match(sql)
+        if m:
+            with _live_lock:
+                target = _live.get(int(m.group(1)))
+            if target is not None:
+                target._db.interrupt()
+            return 0
+        if re.match(r"\s*set\b", sql, re.I):
+            return 0
+        if _state["latency"] and re.match(r"\s*(select|with|explain)\b", sql, re.I) and "information_schema" not in sql:
+            time.sleep(_state["latency"])
+        try:
+            self._cur.execute(_translate(sql), tuple(params or ()))
+        except sqlite3.OperationalError as e:
+            if "interrupted" in str(e):
+                raise OperationalError(1317, "Query execution was interrupted") from e
+            raise OperationalError(1064, str(e)) from e
+        self.description = self._cur.description
+        self.rowcount = self._cur.rowcount
+        return self.rowcount
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, size: int = 1):
+        return self._cur.fetchmany(size)
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def close(self):
+        self._cur.close()
+
+class SSCursor(Cursor):
+    pass
+
+class Connection:
+    def __init__(self, database: str):
+        path = os.path.join(_state["data_dir"], f"{database}.sqlite3")
+        if not os.path.exists(path):
+            raise OperationalError(1049, f"Unknown database '{database}'")
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("ATTACH DATABASE ? AS information_schema", (path[:-len(".sqlite3")] + ".info.sqlite3",))
+        self._db.create_function("CRC32", 1, lambda s: zlib.crc32(str(s).encode("utf-8")), deterministic=True)
+        self._db.create_function("CONCAT", -1, lambda *a: None if any(x is None for x in a) else "".join(str(x) for x in a), deterministic=True)
+        self._id = next(_ids)
+        with _live_lock:
+            _live[self._id] = self
+
+    def cursor(self, cls=None):
+        return (cls or Cursor)(self)
+
+    def thread_id(self) -> int:
+        return self._id
+
+    def ping(self, reconnect: bool = False):
+        self._db.execute("SELECT 1")
+
+    def close(self):
+        with _live_lock:
+            _live.pop(self._id, None)
+        self._db.close()
+
+def connect(host=None, port=None, user=None, password=None, database=None, **kwargs) -> Connection:
+    return Connection(database or kwargs.get("db") or "")
+
+def install(data_dir: str, latency: float = 0.0):
+    _state["data_dir"] = os.path.abspath(data_dir)
+    _state["latency"] = float(latency or 0.0)
+    mod = sys.modules[__name__]
+    cursors = types.ModuleType("pymysql.cursors")
+    cursors.Cursor = Cursor
+    cursors.SSCursor = SSCursor
+    err = types.ModuleType("pymysql.err")
+    err.Error = Error
+    err.OperationalError = OperationalError
+    pymysql = types.ModuleType("pymysql")
+    pymysql.connect = mod.connect
+    pymysql.cursors = cursors
+    pymysql.err = err
+    pymysql.Error = Error
+    pymysql.OperationalError = OperationalError
+    sys.modules["pymysql"] = pymysql
+    sys.modules["pymysql.cursors"] = cursors
+    sys.modules["pymysql.err"] = err
@@ -0,0 +1,121 @@
+"""
+LLM 桩服务
+功能：本地 OpenAI 兼容接口（/v1/chat/completions、/v1/embeddings、/v1/models），响应由请求内容确定性生成，
+用于在没有 SiliconFlow 密钥时测量除模型推理外的全部开销。
+chat/completions 从用户消息的 Schema 段（"table 表名: 列, ..."）中选出问题提到的表（否则取第一张）与提到的列，
+返回 SELECT 语句；usage 按字符数/4 估算 token。可注入固定延迟（秒）模拟模型耗时。
+方法：
+- start(port, latency): 在后台线程启动，返回 server（server.base_url 为 http://127.0.0.1:<port>/v1）
+- 命令行：python -m bench.llm_stub --port 18080 --latency-ms 300
+"""
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_TABLE_LINE = re.compile(r"^table\s+([^:\s]+):\s*(.*)$", re.M)
+
+def make_sql(content: str) -> str:
+    question = content.split("\n", 1)[0].removeprefix("问题：")
+    tables = [(m.group(1), [c.strip() for c in m.group(2).split(",") if c.strip()]) for m in _TABLE_LINE.finditer(content)]
+    if not tables:
+        return "SELECT 1"
+    ql = question.lower()
+    mentioned = [t for t in tables if re.search(rf"\b{re.escape(t[0].lower())}\b", ql)]
+    name, cols = (mentioned or tables)[0]
+    picked = [c for c in cols if re.search(rf"\b{re.escape(c.lower())}\b", ql)]
+    select = ", ".join((cols[:1] + [c for c in picked if c != cols[0]]) if cols else ["*"])
+    return f"SELECT {select} FROM {name}"
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def _embedding(text: str, dim: int = 64) -> list[float]:
+    h = hashlib.sha256(text.encode("utf-8")).digest()
+    return [((h[i % len(h)] + i) % 256) / 255.0 for i in range(dim)]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send(self, code: int, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, {"object": "list", "data": [{"id": "bench-stub", "object": "model", "owned_by": "bench"}]})
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length") or 0)
+        try:
+            req = json.loads(self.rfile.read(n) or b"{}")
+        except ValueError:
+            self._send(400, {"error": {"message": "invalid json"}})
+            return
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.count += 1
+        path = self.path.rstrip("/")
+        if path.endswith("/chat/completions"):
+            messages = req.get("messages") or []
+            user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+            sql = make_sql(user)
+            prompt = sum(_tokens(m.get("content") or "") for m in messages)
+            self._send(200, {
+                "id": "chatcmpl-bench-" + hashlib.md5(user.encode("utf-8")).hexdigest()[:12],
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": req.get("model") or "bench-stub",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": sql}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": prompt, "completion_tokens": _tokens(sql), "total_tokens": prompt + _tokens(sql)},
+            })
+        elif path.endswith("/embeddings"):
+            inputs = req.get("input")
+            inputs = [inputs] if isinstance(inputs, str) else list(inputs or [])
+            self._send(200, {
+                "object": "list",
+                "model": req.get("model") or "bench-stub",
+                "data": [{"object": "embedding", "index": i, "embedding": _embedding(str(t))} for i, t in enumerate(inputs)],
+                "usage": {"prompt_tokens": sum(_tokens(str(t)) for t in inputs), "total_tokens": sum(_tokens(str(t)) for t in inputs)},
+            })
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+def start(port: int = 0, latency: float = 0.0, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.latency = float(latency)
+    server.count = 0
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, name="llm-stub", daemon=True).start()
+    return server
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="OpenAI 兼容的确定性 LLM 桩服务")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=18080)
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="每个请求的固定延迟（毫秒）")
+    args = ap.parse_args(argv)
+    server = start(args.port, args.latency_ms / 1000, args.host)
+    print(f"LLM 桩服务已启动：{server.base_url}", file=sys.stderr)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+合成数据生成模块
+功能：按固定随机种子生成可复现的 Schema、SQLite 数据库（供 fake_mysql 使用）、知识库文件与问题集。
+方法：
+- make_schema(n_tables, seed): 返回 {表名: [列名, ...]}，部分表带 <表名>_id 外键列
+- create_database(data_dir, name, schema, rows, seed): 写入 <name>.sqlite3 与 <name>.info.sqlite3（information_schema）
+- make_kb(kb_dir, total_bytes, schema, seed, file_bytes): 生成 md/txt/csv 知识库文件，总大小约为 total_bytes
+- make_questions(schema, n, seed): 生成引用表名与列名的中英文问题
+"""
+import os
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+_NOUNS = ["orders", "users", "products", "stations", "meters", "invoices", "payments", "devices", "regions", "cities",
+          "suppliers", "shipments", "tickets", "contracts", "readings", "alarms", "assets", "employees", "projects", "tariffs"]
+_COLUMNS = ["name", "status", "amount", "price", "quantity", "created_at", "updated_at", "code", "remark", "category",
+            "score", "capacity", "voltage", "power_kwh", "start_time", "end_time", "owner", "level", "address", "phone"]
+_CN = ["电量", "订单", "用户", "站点", "金额", "设备", "告警", "区域", "合同", "读数", "功率", "电压", "负荷", "容量", "客户", "月度", "统计", "明细"]
+
+def make_schema(n_tables: int, seed: int = 0) -> dict:
+    rnd = random.Random(seed)
+    tables = {}
+    for i in range(n_tables):
+        base = _NOUNS[i % len(_NOUNS)]
+        name = base if i < len(_NOUNS) else f"{base}_{i // len(_NOUNS)}"
+        cols = ["id"] + rnd.sample(_COLUMNS, rnd.randint(3, 10))
+        if tables and rnd.random() < 0.6:
+            cols.append(f"{rnd.choice(list(tables))}_id")
+        tables[name] = cols
+    return tables
+
+def _value(col: str, i: int, rnd: random.Random):
+    if col == "id" or col.endswith("_id") or col in ("quantity", "level", "capacity"):
+        return i if col == "id" else rnd.randint(1, 1000)
+    if col in ("amount", "price", "score", "voltage", "power_kwh"):
+        return round(rnd.uniform(0, 10000), 2)
+    if col.endswith("_at") or col.endswith("_time"):
+        return (datetime(2024, 1, 1) + timedelta(minutes=rnd.randint(0, 525600))).strftime("%Y-%m-%d %H:%M:%S")
+    return f"{col}_{rnd.randint(0, 9999)}"
+
+def create_database(data_dir: str, name: str, schema: dict, rows: int = 1000, seed: int = 0) -> str:
+    os.makedirs(data_dir, exist_ok=True)
+    rnd = random.Random(seed)
+    path = os.path.join(data_dir, f"{name}.sqlite3")
+    info_path = os.path.join(data_dir, f"{name}.info.sqlite3")
+    for p in (path, info_path):
+        if os.path.exists(p):
+            os.remove(p)
+    db = sqlite3.connect(path)
+    info = sqlite3.connect(info_path)
+    info.execute("CREATE TABLE columns (table_schema TEXT, table_name TEXT, column_name TEXT, ordinal_position INTEGER)")
+    info.execute("CREATE TABLE tables (table_schema TEXT, table_name TEXT, create_time TEXT, update_time TEXT, table_rows INTEGER)")
+    now = datetime(2025, 1, 1).strftime("%Y-%m-%d %H:%M:%S")
+    for t, cols in schema.items():
+        db.execute(f"CREATE TABLE `{t}` ({', '.join(f'`{c}`' for c in cols)})")
+        db.executemany(f"INSERT INTO `{t}` VALUES ({', '.join('?' for _ in cols)})", ([_value(c, i, rnd) for c in cols] for i in range(1, rows + 1)))
+        info.executemany("INSERT INTO columns VALUES (?, ?, ?, ?)", [(name, t, c, i) for i, c in enumerate(cols, 1)])
+        info.execute("INSERT INTO tables VALUES (?, ?, ?, ?, ?)", (name, t, now, now, rows))
+    info.execute("CREATE INDEX columns_schema ON columns (table_schema, table_name, ordinal_position)")
+    db.commit()
+    info.commit()
+    db.close()
+    info.close()
+    return path
+
+def _paragraph(schema_names: list, rnd: random.Random) -> str:
+    t = rnd.choice(schema_names)
+    words = [rnd.choice(_CN) for _ in range(rnd.randint(8, 30))]
+    return f"{t} 表说明：" + "".join(words) + f"。字段 {rnd.choice(_COLUMNS)} 用于{rnd.choice(_CN)}{rnd.choice(_CN)}，按 {rnd.choice(_COLUMNS)} 汇总。"
+
+def make_kb(kb_dir: str, total_bytes: int, schema: dict | None = None, seed: int = 0, file_bytes: int = 256 * 1024) -> list[str]:
+    os.makedirs(kb_dir, exist_ok=True)
+    rnd = random.Random(seed)
+    names = list(schema or make_schema(20, seed))
+    paths, written, i = [], 0, 0
+    while written < total_bytes:
+        ext = ("md", "txt", "csv")[i % 3]
+        path = os.path.join(kb_dir, f"kb_{i:05d}.{ext}")
+        target = min(file_bytes, total_bytes - written)
+        size = 0
+        with open(path, "w", encoding="utf-8") as f:
+            if ext == "csv":
+                line = "table,column,meaning\n"
+                f.write(line)
+                size += len(line.encode("utf-8"))
+            while size < target:
+                if ext == "csv":
+                    line = f"{rnd.choice(names)},{rnd.choice(_COLUMNS)},{rnd.choice(_CN)}{rnd.choice(_CN)}\n"
+                else:
+                    line = _paragraph(names, rnd) + "\n\n"
+                f.write(line)
+                size += len(line.encode("utf-8"))
+        paths.append(path)
+        written += size
+        i += 1
+    return paths
+
+def make_questions(schema: dict, n: int, seed: int = 0) -> list[str]:
+    rnd = random.Random(seed)
+    names = list(schema)
+    out = []
+    for i in range(n):
+        t = rnd.choice(names)
+        col = rnd.choice(schema[t][1:] or ["id"])
+        if i % 2:
+            out.append(f"统计 {t} 中 {col} 的{rnd.choice(_CN)}情况 #{i}")
+        else:
+            out.append(f"list {col} of {t} by {rnd.choice(_COLUMNS)} #{i}")
+    return out
@@ -0,0 +1,239 @@
+"""
+缓存模块
+功能：进程内 LRU 缓存与基于 SQLite 的磁盘缓存，按条目数与 TTL 淘汰，并统计命中情况；两者可组合为二级缓存。
+方法：
+- LRUCache.get(key) / set(key, value) / pop(key) / clear() / stats()
+- DiskCache.get(key) / set(key, value) / pop(key) / clear() / stats()：值以 JSON 保存，重启后仍可命中
+- DiskCache.get_many(keys) / set_many(items)：批量读写，单次事务
+- ZstdBlobCache：DiskCache 的二进制变体，值为 bytes，以 zstd 压缩后存为 BLOB
+- TieredCache.get(key) / set(key, value) / clear() / stats()：先查内存再查磁盘，磁盘命中回填内存
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return item[0] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "hit_ratio": (self.hits / total) if total else 0.0}
+
+class DiskCache:
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float | None = None):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS kv_accessed ON kv (accessed)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            try:
+                db = self._db()
+                row = db.execute("SELECT value, created FROM kv WHERE key=?", (key,)).fetchone()
+                now = time.time()
+                if row is not None and (self.ttl is None or row[1] + self.ttl > now):
+                    db.execute("UPDATE kv SET accessed=? WHERE key=?", (now, key))
+                    self.hits += 1
+                    return self._loads(row[0])
+                if row is not None:
+                    db.execute("DELETE FROM kv WHERE key=?", (key,))
+            except Exception:
+                pass
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value):
+        with self._lock:
+            try:
+                db = self._db()
+                now = time.time()
+                db.execute("INSERT OR REPLACE INTO kv (key, value, created, accessed) VALUES (?, ?, ?, ?)", (key, self._dumps(value), now, now))
+                self._writes += 1
+                if self._writes % 64 == 1:
+                    self._evict(db, now)
+            except Exception:
+                pass
+
+    def _dumps(self, value):
+        return json.dumps(value, ensure_ascii=False)
+
+    def _loads(self, raw):
+        return json.loads(raw)
+
+    def get_many(self, keys: list[str]) -> dict:
+        found = {}
+        with self._lock:
+            try:
+                db = self._db()
+                now = time.time()
+                uniq = list(dict.fromkeys(keys))
+                for i in range(0, len(uniq), 500):
+                    part = uniq[i:i + 500]
+                    marks = ",".join("?" * len(part))
+                    for key, raw, created in db.execute(f"SELECT key, value, created FROM kv WHERE key IN ({marks})", part):
+                        if self.ttl is None or created + self.ttl > now:
+                            found[key] = self._loads(raw)
+                if found:
+                    db.executemany("UPDATE kv SET accessed=? WHERE key=?", [(now, k) for k in found])
+            except Exception:
+                found = {}
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+        return found
+
+    def set_many(self, items: dict):
+        if not items:
+            return
+        with self._lock:
+            try:
+                db = self._db()
+                now = time.time()
+                db.execute("BEGIN")
+                try:
+                    db.executemany("INSERT OR REPLACE INTO kv (key, value, created, accessed) VALUES (?, ?, ?, ?)", [(k, self._dumps(v), now, now) for k, v in items.items()])
+                    db.execute("COMMIT")
+                except Exception:
+                    db.execute("ROLLBACK")
+                    raise
+                before = self._writes
+                self._writes += len(items)
+                if before // 64 != self._writes // 64:
+                    self._evict(db, now)
+            except Exception:
+                pass
+
+    def _evict(self, db, now: float):
+        if self.ttl is not None:
+            db.execute("DELETE FROM kv WHERE created < ?", (now - self.ttl,))
+        count = db.execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+        if count > self.max_entries:
+            db.execute("DELETE FROM kv WHERE key IN (SELECT key FROM kv ORDER BY accessed LIMIT ?)", (count - self.max_entries,))
+
+    def pop(self, key: str):
+        with self._lock:
+            try:
+                self._db().execute("DELETE FROM kv WHERE key=?", (key,))
+            except Exception:
+                pass
+
+    def clear(self):
+        with self._lock:
+            try:
+                self._db().execute("DELETE FROM kv")
+            except Exception:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            try:
+                entries = self._db().execute("SELECT COUNT(*) FROM kv").fetchone()[0]
+            except Exception:
+                entries = 0
+        total = self.hits + self.misses
+        return {"entries": entries, "hits": self.hits, "misses": self.misses, "hit_ratio": (self.hits / total) if total else 0.0}
+
+class ZstdBlobCache(DiskCache):
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float | None = None, level: int = 3):
+        super().__init__(path, max_entries, ttl)
+        import zstandard
+        self._cctx = zstandard.ZstdCompressor(level=level)
+        self._dctx = zstandard.ZstdDecompressor()
+
+    def _dumps(self, value: bytes):
+        return self._cctx.compress(value)
+
+    def _loads(self, raw) -> bytes:
+        return self._dctx.decompress(raw)
+
+class TieredCache:
+    def __init__(self, memory: LRUCache, disk: DiskCache | None = None):
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key, default=None):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                return value
+        return default
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        mem = self.memory.stats()
+        disk = self.disk.stats() if self.disk is not None else None
+        lookups = mem["hits"] + mem["misses"]
+        hits = mem["hits"] + (disk["hits"] if disk else 0)
+        return {"memory": mem, "disk": disk, "hits": hits, "misses": lookups - hits, "hit_ratio": (hits / lookups) if lookups else 0.0}
@@ -38,6 +38,8 @@ def main():
     parser.add_argument("--dry-run", dest="dry_run", action="store_true")
     parser.add_argument("--json", dest="json", action="store_true")
     parser.add_argument("--show-schema", dest="show_schema", action="store_true")
+    parser.add_argument("--llm-workers", dest="llm_workers", type=int, default=None)
+    parser.add_argument("--db-workers", dest="db_workers", type=int, default=None)
     args = parser.parse_args()
     orchestrator = Orchestrator()
     stop_evt = threading.Event()
@@ -73,6 +75,8 @@ def main():
     dry_run = args.dry_run
     as_json = args.json
     show_schema = args.show_schema
+    llm_workers = args.llm_workers
+    db_workers = args.db_workers
     while True:
         try:
             q = input("> ").strip()
@@ -85,7 +89,7 @@ def main():
             break
 
         if q.lower() in ("-h", "-help", "--h", "--help"):
-            print("命令：\n  输入问题执行查询\n  -h 显示帮助\n  -e 切换是否显示执行计划\n  -d 切换干运行（仅显示SQL不执行）\n  -j 切换JSON输出\n  -l N 设置LIMIT 上限\n  -import 路径 批量查询文件\n  -s 切换显示数据库表结构\n  -showrag 展示已导入的知识库（来自 KB_DIR/KB_GLOB）\n  exit 退出")
+            print("命令：\n  输入问题执行查询\n  -h 显示帮助\n  -e 切换是否显示执行计划\n  -d 切换干运行（仅显示SQL不执行）\n  -j 切换JSON输出\n  -l N 设置LIMIT 上限\n  -import 路径 批量查询文件\n  -w N [M] 设置批量查询并发（LLM N 路，数据库 M 路）\n  -s 切换显示数据库表结构\n  -showrag 展示已导入的知识库（来自 KB_DIR/KB_GLOB）\n  exit 退出")
             continue
 
         if q.lower().startswith("-import"):
@@ -95,7 +99,7 @@ def main():
                 continue
             path = parts[1].strip()
             try:
-                orchestrator.run_batch_file(path, limit, as_json=as_json)
+                orchestrator.run_batch_file(path, limit, as_json=as_json, llm_workers=llm_workers, db_workers=db_workers)
             except Exception as e:
                 print(f"批量查询失败: {e}")
             continue
@@ -109,6 +113,16 @@ def main():
                 print("用法：-l 100")
             continue
 
+        if q.lower() == "-w" or q.lower().startswith("-w "):
+            parts = q.split()
+            if len(parts) in (2, 3) and all(p.isdigit() and int(p) > 0 for p in parts[1:]):
+                llm_workers = int(parts[1])
+                db_workers = int(parts[2]) if len(parts) == 3 else db_workers
+                print(f"BATCH_WORKERS=LLM {llm_workers} / DB {db_workers or '默认'}")
+            else:
+                print("用法：-w 8 4")
+            continue
+
         if q.lower() == "-showrag":
             try:
                 orchestrator.show_rag()
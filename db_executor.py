@@ -1,52 +1,241 @@
 """
 数据库执行模块
-功能：连接并执行只读查询与执行计划（仅 MySQL）。
+功能：连接并执行只读查询与执行计划（仅 MySQL），连接取自按 DB URL 共享的连接池。
+流式模式使用无缓冲服务端游标（SSCursor）按批读取，读到 row_limit 即停止并标记结果被截断。
+超时控制：顶层 SELECT（WITH 查询为 CTE 定义之后的主 SELECT）注入 MAX_EXECUTION_TIME 提示，
+主查询整体加括号等找不到顶层 SELECT 的语句只由看门狗限时；后台看门狗线程在超时或 cancel 事件触发时经旁路连接发送 KILL QUERY。
 方法：
-- query(db_url, sql, timeout, row_limit): 执行只读查询并返回行与列
+- stream(db_url, sql, timeout, row_limit, batch_size, cancel): 返回 ResultStream，按批迭代行
+- query(db_url, sql, timeout, row_limit, cancel): 执行只读查询并返回行与列（最多 row_limit 行）
+- fetch(db_url, sql, timeout, row_limit, cancel): 同 query，额外返回是否截断；行为按批逐列追加构建的 ResultSet（result_set.py）
+- fetch_cached(db_url, sql, timeout, row_limit, cancel): 同 fetch，先查结果缓存（result_cache.py），额外返回是否命中
 - explain(db_url, sql): 返回查询执行计划
 """
-from urllib.parse import urlparse
+import os
+import time
+import threading
+from db_pool import get_pool, connect_kwargs
+from sql_analyzer import analyze, main_select_end
+from result_cache import get_result_cache
+from result_set import ResultSet
+
+def _apply_time_limit(sql: str, timeout: float | None) -> str:
+    if not timeout or timeout <= 0 or "max_execution_time" in sql.lower():
+        return sql
+    end = main_select_end(sql)
+    if end is None:
+        return sql
+    return sql[:end] + f" /*+ MAX_EXECUTION_TIME({int(timeout * 1000)}) */" + sql[end:]
+
+class _Watch:
+    __slots__ = ("db_url", "thread_id", "deadline", "cancel", "reason", "active", "lock")
+    def __init__(self, db_url: str, thread_id: int, deadline: float | None, cancel):
+        self.db_url = db_url
+        self.thread_id = thread_id
+        self.deadline = deadline
+        self.cancel = cancel
+        self.reason = None
+        self.active = True
+        self.lock = threading.Lock()
+
+class QueryWatchdog:
+    def __init__(self, interval: float | None = None, grace: float | None = None):
+        self.interval = float(interval or os.getenv("DB_WATCHDOG_INTERVAL", "0.2"))
+        # 服务端 MAX_EXECUTION_TIME 优先生效，看门狗在其后 grace 秒兜底
+        self.grace = float(grace if grace is not None else os.getenv("DB_WATCHDOG_GRACE", "1"))
+        self._entries: dict[int, _Watch] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def watch(self, db_url: str, thread_id: int, timeout: float | None, cancel=None) -> _Watch:
+        deadline = time.monotonic() + timeout + self.grace if timeout and timeout > 0 else None
+        w = _Watch(db_url, thread_id, deadline, cancel)
+        with self._cond:
+            self._entries[id(w)] = w
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-watchdog", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return w
+
+    def unwatch(self, w: _Watch):
+        with w.lock:
+            w.active = False
+        with self._cond:
+            self._entries.pop(id(w), None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._entries:
+                    self._cond.wait()
+                now = time.monotonic()
+                due = []
+                waits = []
+                for w in list(self._entries.values()):
+                    if w.cancel is not None and w.cancel.is_set():
+                        due.append((w, "cancelled"))
+                    elif w.deadline is not None and now >= w.deadline:
+                        due.append((w, "timeout"))
+                    else:
+                        if w.deadline is not None:
+                            waits.append(w.deadline - now)
+                        if w.cancel is not None:
+                            waits.append(self.interval)
+                        continue
+                    del self._entries[id(w)]
+                if not due:
+                    self._cond.wait(min(waits) if waits else None)
+                    continue
+            for w, reason in due:
+                self._kill(w, reason)
+
+    def _kill(self, w: _Watch, reason: str):
+        with w.lock:
+            if not w.active:
+                return
+            w.reason = reason
+            try:
+                import pymysql
+                conn = pymysql.connect(charset="utf8mb4", connect_timeout=5, **connect_kwargs(w.db_url))
+                try:
+                    conn.cursor().execute(f"KILL QUERY {int(w.thread_id)}")
+                finally:
+                    conn.close()
+            except Exception:
+                pass
+
+_watchdog = QueryWatchdog()
+
+def _translate_error(e: BaseException, w: _Watch | None, timeout: float | None) -> BaseException:
+    reason = w.reason if w is not None else None
+    code = e.args[0] if getattr(e, "args", None) and isinstance(e.args[0], int) else None
+    if reason == "cancelled":
+        return RuntimeError("查询已取消")
+    if reason == "timeout" or code == 3024:
+        return RuntimeError(f"查询超时（超过 {timeout} 秒）")
+    return e
+
+class ResultStream:
+    def __init__(self, pool, conn, cur, row_limit: int | None, batch_size: int, watch: _Watch | None = None, timeout: float | None = None):
+        self.headers = [c[0] for c in cur.description] if cur.description else []
+        self.row_limit = row_limit if row_limit and row_limit > 0 else None
+        self.batch_size = max(1, batch_size)
+        self.truncated = False
+        self.fetched = 0
+        self._pool = pool
+        self._conn = conn
+        self._cur = cur
+        self._exhausted = False
+        self._closed = False
+        self._watch = watch
+        self._timeout = timeout
+
+    def __iter__(self):
+        try:
+            while True:
+                want = self.batch_size
+                if self.row_limit is not None:
+                    want = min(want, self.row_limit - self.fetched)
+                try:
+                    if want <= 0:
+                        self.truncated = self._cur.fetchone() is not None
+                        self._exhausted = not self.truncated
+                        break
+                    batch = self._cur.fetchmany(want)
+                except Exception as e:
+                    raise _translate_error(e, self._watch, self._timeout)
+                if not batch:
+                    self._exhausted = True
+                    break
+                self.fetched += len(batch)
+                yield list(batch)
+        finally:
+            self.close()
+
+    def rows(self):
+        for batch in self:
+            yield from batch
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._watch is not None:
+            _watchdog.unwatch(self._watch)
+        if self._exhausted:
+            try:
+                self._cur.close()
+            except Exception:
+                self._pool.release(self._conn, discard=True)
+                return
+            self._pool.release(self._conn)
+        else:
+            # 未读完的无缓冲结果集无法复用连接，直接丢弃连接而不是读完剩余行
+            self._pool.release(self._conn, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
 class DbExecutor:
-    def query(self, db_url: str, sql: str, timeout: int, row_limit: int):
-        
+    def __init__(self, batch_size: int | None = None, result_cache=None):
+        self.batch_size = int(batch_size or os.getenv("DB_FETCH_BATCH", "1000"))
+        self.result_cache = result_cache if result_cache is not None else get_result_cache()
+
+    def stream(self, db_url: str, sql: str, timeout: float | None = None, row_limit: int | None = None, batch_size: int | None = None, cancel=None) -> ResultStream:
         if db_url.startswith("mysql://"):
-            parsed = urlparse(db_url)
-            host = parsed.hostname or "localhost"
-            port = parsed.port or 3306
-            user = parsed.username or "root"
-            password = parsed.password or ""
-            db = (parsed.path or "/").lstrip("/")
+            import pymysql.cursors
+            if cancel is not None and cancel.is_set():
+                raise RuntimeError("查询已取消")
+            pool = get_pool(db_url)
+            conn = pool.acquire()
+            w = None
             try:
-                import pymysql
-            except Exception as e:
-                raise RuntimeError("MySQL execution requires 'pymysql' to be installed") from e
-            conn = pymysql.connect(host=host, port=port, user=user, password=password, database=db, charset="utf8mb4")
-            cur = conn.cursor()
-            cur.execute(sql)
-            rows = cur.fetchall()
-            headers = [c[0] for c in cur.description]
-            conn.close()
-            return rows, headers
+                if (timeout and timeout > 0) or cancel is not None:
+                    w = _watchdog.watch(db_url, conn.thread_id(), timeout, cancel)
+                cur = conn.cursor(pymysql.cursors.SSCursor)
+                cur.execute(_apply_time_limit(sql, timeout))
+            except BaseException as e:
+                if w is not None:
+                    _watchdog.unwatch(w)
+                pool.release(conn, discard=True)
+                err = _translate_error(e, w, timeout)
+                if err is e:
+                    raise
+                raise err from e
+            return ResultStream(pool, conn, cur, row_limit, batch_size or self.batch_size, watch=w, timeout=timeout)
         raise RuntimeError("Unsupported DB_URL. Please use mysql://...")
+    def fetch(self, db_url: str, sql: str, timeout: float | None = None, row_limit: int | None = None, cancel=None):
+        with self.stream(db_url, sql, timeout=timeout, row_limit=row_limit, cancel=cancel) as rs:
+            rows = ResultSet.from_batches(rs, rs.headers)
+        rows.truncated = rs.truncated
+        return rows, rs.headers, rs.truncated
+    def fetch_cached(self, db_url: str, sql: str, timeout: float | None = None, row_limit: int | None = None, cancel=None):
+        cache = self.result_cache
+        if cache is None:
+            return (*self.fetch(db_url, sql, timeout=timeout, row_limit=row_limit, cancel=cancel), False)
+        hit = cache.get(db_url, sql, row_limit)
+        if hit is not None:
+            return (*hit, True)
+        # 先记录表版本再执行，执行期间发生的写入会在下次读取时使条目失效
+        token = cache.prepare(db_url, analyze(sql))
+        rows, headers, truncated = self.fetch(db_url, sql, timeout=timeout, row_limit=row_limit, cancel=cancel)
+        cache.put(db_url, sql, row_limit, rows, headers, truncated, token)
+        return rows, headers, truncated, False
+    def query(self, db_url: str, sql: str, timeout: int, row_limit: int, cancel=None):
+        rows, headers, _ = self.fetch(db_url, sql, timeout=timeout, row_limit=row_limit, cancel=cancel)
+        return rows, headers
     def explain(self, db_url: str, sql: str):
-        
+
         if db_url.startswith("mysql://"):
-            parsed = urlparse(db_url)
-            host = parsed.hostname or "localhost"
-            port = parsed.port or 3306
-            user = parsed.username or "root"
-            password = parsed.password or ""
-            db = (parsed.path or "/").lstrip("/")
-            try:
-                import pymysql
-            except Exception as e:
-                raise RuntimeError("MySQL execution requires 'pymysql' to be installed") from e
-            conn = pymysql.connect(host=host, port=port, user=user, password=password, database=db, charset="utf8mb4")
-            cur = conn.cursor()
-            cur.execute("EXPLAIN " + sql)
-            rows = cur.fetchall()
-            headers = [c[0] for c in cur.description]
-            conn.close()
+            with get_pool(db_url).connection() as conn:
+                cur = conn.cursor()
+                cur.execute("EXPLAIN " + sql)
+                rows = cur.fetchall()
+                headers = [c[0] for c in cur.description]
+                cur.close()
             return rows, headers
-        raise RuntimeError("Unsupported DB_URL. Please use mysql://...")
\ No newline at end of file
+        raise RuntimeError("Unsupported DB_URL. Please use mysql://...")
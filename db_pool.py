@@ -0,0 +1,159 @@
+"""
+数据库连接池模块
+功能：按 DB URL 维护线程安全的 pymysql 连接池，供查询、执行计划与结构读取复用连接。
+借出时 ping 检活，超过空闲时限的连接在借还时回收（保留不少于最小连接数）。
+配置：DB_POOL_MIN（默认 1）、DB_POOL_MAX（默认 10）、DB_POOL_IDLE_TIMEOUT（秒，默认 300）、DB_POOL_TIMEOUT（借出等待秒数，默认 30）、
+DB_READ_TIMEOUT（socket 读超时秒数，默认 120，0 表示不限）
+方法：
+- get_pool(db_url): 获取（或创建）该 URL 的连接池
+- close_all(): 关闭全部连接池
+- connect_kwargs(db_url): 解析 URL 为 pymysql 连接参数
+- ConnectionPool.connection(): 借出连接的上下文管理器，异常时丢弃连接
+- ConnectionPool.acquire() / release(conn, discard): 手动借还
+- ConnectionPool.close(): 关闭连接池
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+def connect_kwargs(db_url: str) -> dict:
+    if not db_url or not db_url.startswith("mysql://"):
+        raise RuntimeError("Unsupported DB_URL. Please use mysql://...")
+    parsed = urlparse(db_url)
+    return {
+        "host": parsed.hostname or "localhost",
+        "port": parsed.port or 3306,
+        "user": parsed.username or "root",
+        "password": parsed.password or "",
+        "database": (parsed.path or "/").lstrip("/"),
+    }
+
+class ConnectionPool:
+    def __init__(self, db_url: str, min_size: int | None = None, max_size: int | None = None, idle_timeout: float | None = None, timeout: float | None = None):
+        self.db_url = db_url
+        self.min_size = int(min_size if min_size is not None else os.getenv("DB_POOL_MIN", "1"))
+        self.max_size = max(1, int(max_size if max_size is not None else os.getenv("DB_POOL_MAX", "10")))
+        self.idle_timeout = float(idle_timeout if idle_timeout is not None else os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+        self.timeout = float(timeout if timeout is not None else os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.read_timeout = float(os.getenv("DB_READ_TIMEOUT", "120")) or None
+        self._kwargs = connect_kwargs(db_url)
+        self._idle: list[tuple[object, float]] = []
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        try:
+            import pymysql
+        except Exception as e:
+            raise RuntimeError("MySQL execution requires 'pymysql' to be installed") from e
+        return pymysql.connect(charset="utf8mb4", autocommit=True, read_timeout=self.read_timeout, **self._kwargs)
+
+    def _close_quietly(self, conns):
+        for c in conns:
+            try:
+                c.close()
+            except Exception:
+                pass
+
+    def _evict_idle(self) -> list:
+        now = time.monotonic()
+        evicted = []
+        keep = []
+        # 空闲列表按归还时间排列，最早归还的在前
+        for conn, ts in self._idle:
+            if now - ts > self.idle_timeout and self._size - len(evicted) > self.min_size:
+                evicted.append(conn)
+            else:
+                keep.append((conn, ts))
+        self._idle = keep
+        self._size -= len(evicted)
+        return evicted
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            evicted = []
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("数据库连接池已关闭")
+                    evicted += self._evict_idle()
+                    if self._idle:
+                        conn = self._idle.pop()[0]
+                        break
+                    if self._size < self.max_size:
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise RuntimeError("数据库连接池已满，等待连接超时")
+                    self._cond.wait(remaining)
+            self._close_quietly(evicted)
+            if conn is None:
+                try:
+                    return self._connect()
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            try:
+                conn.ping(reconnect=False)
+                return conn
+            except Exception:
+                self.release(conn, discard=True)
+
+    def release(self, conn, discard: bool = False):
+        with self._cond:
+            if discard or self._closed:
+                self._size -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+                conn = None
+            self._cond.notify()
+        if conn is not None:
+            self._close_quietly([conn])
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, discard=True)
+            raise
+        self.release(conn)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            conns = [c for c, _ in self._idle]
+            self._size -= len(conns)
+            self._idle = []
+            self._cond.notify_all()
+        self._close_quietly(conns)
+
+_pools: dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_url: str) -> ConnectionPool:
+    pool = _pools.get(db_url)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(db_url)
+        if pool is None:
+            pool = ConnectionPool(db_url)
+            _pools[db_url] = pool
+        return pool
+
+def close_all():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for p in pools:
+        p.close()
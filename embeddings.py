@@ -0,0 +1,211 @@
+"""
+向量化模块
+功能：提供可插拔的文本向量化后端与进程内向量索引，RAGIndex 在无远程向量服务时使用，无需网络。
+本地后端将文本切成字符 n-gram 并哈希到固定维度（NumPy 向量化计算，每批文本一次完成），索引构建时按语料计算 IDF 加权并归一化，
+检索为归一化向量点积；全部向量保存在连续的 float32 矩阵中，持久化为 .npy 并以内存映射方式加载。
+配置：RAG_EMBEDDING_DIM（哈希维度，默认 4096）、RAG_EMBEDDING_NGRAMS（n-gram 长度，逗号分隔，默认 2,3）、RAG_EMBEDDING_BATCH（每批文本数，默认 256）
+方法：
+- EmbeddingBackend.embed_documents(texts) / embed_query(text): 后端接口，返回 float32 向量
+- HashingEmbeddings: 本地哈希字符 n-gram 后端（tfidf=True，由索引负责 IDF 加权）
+- CachedEmbeddings(backend, cache): 为任意后端加按文本内容寻址的向量缓存，键为 xxhash(模型, 文本)，值为 zstd 压缩的 float32 字节；
+  只把缺失文本按批（RAG_EMBED_BATCH，默认 64）并发（RAG_EMBED_CONCURRENCY，默认 4）发送给后端，失败按指数退避重试（RAG_EMBED_RETRIES，默认 3）
+- get_embedding_cache(): 获取进程内共享的向量磁盘缓存（RAG_EMBED_CACHE_PATH，默认 ./cache/embeddings.sqlite3；RAG_EMBED_CACHE=0 关闭）
+- VectorIndex.from_texts(texts, emb, metadatas) / load_local(path, emb) / save_local(path): 构建、加载与保存索引
+- VectorIndex.similarity_search(question, k): 返回带 page_content 与 metadata 的结果
+"""
+import os
+import json
+import time
+import threading
+import numpy as np
+
+class EmbeddingBackend:
+    model = ""
+    tfidf = False
+
+    def embed_documents(self, texts: list[str]):
+        raise NotImplementedError
+
+    def embed_query(self, text: str):
+        return self.embed_documents([text])[0]
+
+_PRIMES = np.array([1000003, 2654435761, 97531, 31337, 7919], dtype=np.uint64)
+
+class HashingEmbeddings(EmbeddingBackend):
+    tfidf = True
+
+    def __init__(self, dim: int | None = None, ngrams: tuple[int, ...] | None = None, batch_size: int | None = None):
+        self.dim = int(dim or os.getenv("RAG_EMBEDDING_DIM", "4096"))
+        self.ngrams = tuple(ngrams or (int(n) for n in os.getenv("RAG_EMBEDDING_NGRAMS", "2,3").split(",") if n.strip()))
+        self.batch_size = max(1, int(batch_size or os.getenv("RAG_EMBEDDING_BATCH", "256")))
+        self.model = f"hash-char-{'-'.join(map(str, self.ngrams))}-{self.dim}"
+
+    def _batch_counts(self, texts: list[str], out: np.ndarray) -> np.ndarray:
+        # 一批文本拼成一个码点数组统一计算 n-gram 哈希，跨文本边界的 n-gram 丢弃，再按 (文本, 桶) 一次 bincount 写入 out
+        parts = [np.frombuffer(" ".join((t or "").lower().split()).encode("utf-32-le"), dtype=np.uint32) for t in texts]
+        codes = np.concatenate(parts).astype(np.uint64)
+        doc = np.repeat(np.arange(len(parts), dtype=np.int64), [len(p) for p in parts])
+        idx = []
+        for n in self.ngrams:
+            m = len(codes) - n + 1
+            if m <= 0:
+                continue
+            h = np.full(m, n, dtype=np.uint64)
+            for j in range(n):
+                h = h * _PRIMES[j % len(_PRIMES)] + codes[j:m + j]
+            same = doc[:m] == doc[n - 1:]
+            idx.append(doc[:m][same] * self.dim + (h[same] % np.uint64(self.dim)).astype(np.int64))
+        flat = out.reshape(-1)
+        if idx:
+            flat[:] = np.bincount(np.concatenate(idx), minlength=flat.size)
+        else:
+            flat[:] = 0
+        return np.log1p(out, out=out)
+
+    def embed_documents(self, texts: list[str]):
+        texts = list(texts)
+        mat = np.empty((len(texts), self.dim), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            batch = texts[start:start + self.batch_size]
+            self._batch_counts(batch, mat[start:start + len(batch)])
+        return mat
+
+class CachedEmbeddings(EmbeddingBackend):
+    def __init__(self, backend, cache, batch_size: int | None = None, concurrency: int | None = None, retries: int | None = None):
+        self.backend = backend
+        self.cache = cache
+        self.model = str(getattr(backend, "model", "") or type(backend).__name__)
+        self.tfidf = getattr(backend, "tfidf", False)
+        self.batch_size = max(1, int(batch_size or os.getenv("RAG_EMBED_BATCH", "64")))
+        self.concurrency = max(1, int(concurrency or os.getenv("RAG_EMBED_CONCURRENCY", "4")))
+        self.retries = max(1, int(retries or os.getenv("RAG_EMBED_RETRIES", "3")))
+        self.embedded = 0
+
+    def key(self, text: str) -> str:
+        import xxhash
+        h = xxhash.xxh3_128()
+        h.update(self.model.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def _call(self, batch: list[str]) -> np.ndarray:
+        delay = 0.5
+        for attempt in range(self.retries):
+            try:
+                return np.asarray(self.backend.embed_documents(batch), dtype=np.float32)
+            except Exception:
+                if attempt == self.retries - 1:
+                    raise
+                time.sleep(delay)
+                delay *= 2
+
+    def embed_documents(self, texts: list[str]):
+        texts = list(texts)
+        keys = [self.key(t) for t in texts]
+        found = {k: np.frombuffer(v, dtype=np.float32) for k, v in self.cache.get_many(keys).items()}
+        missing = {}
+        for k, t in zip(keys, texts):
+            if k not in found:
+                missing.setdefault(k, t)
+        if missing:
+            items = list(missing.items())
+            batches = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+            def _run(batch):
+                vecs = self._call([t for _, t in batch])
+                fresh = {k: v for (k, _), v in zip(batch, vecs)}
+                self.cache.set_many({k: v.tobytes() for k, v in fresh.items()})
+                return fresh
+            if len(batches) == 1 or self.concurrency == 1:
+                results = [_run(b) for b in batches]
+            else:
+                from concurrent.futures import ThreadPoolExecutor
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches)), thread_name_prefix="embed") as pool:
+                    results = list(pool.map(_run, batches))
+            for fresh in results:
+                found.update(fresh)
+            self.embedded += len(missing)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(np.stack([found[k] for k in keys]))
+
+    def embed_query(self, text: str):
+        return np.asarray(self.backend.embed_query(text), dtype=np.float32)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache():
+    global _cache
+    if os.getenv("RAG_EMBED_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            from cache import ZstdBlobCache
+            path = os.getenv("RAG_EMBED_CACHE_PATH", None) or os.path.join(os.path.dirname(__file__), "cache", "embeddings.sqlite3")
+            _cache = ZstdBlobCache(path, int(os.getenv("RAG_EMBED_CACHE_SIZE", "200000")))
+        return _cache
+
+class _Hit:
+    __slots__ = ("page_content", "metadata", "score")
+    def __init__(self, page_content: str, metadata: dict, score: float):
+        self.page_content = page_content
+        self.metadata = metadata
+        self.score = score
+
+def _normalize(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mat /= norms
+    return mat
+
+class VectorIndex:
+    def __init__(self, matrix: np.ndarray, docs: list[str], emb, metadatas: list[dict] | None = None, idf: np.ndarray | None = None):
+        self.matrix = matrix
+        self.docs = docs
+        self.metadatas = metadatas
+        self.emb = emb
+        self.idf = idf
+
+    @classmethod
+    def from_texts(cls, texts: list[str], emb, metadatas: list[dict] | None = None):
+        texts = list(texts)
+        mat = np.ascontiguousarray(np.asarray(emb.embed_documents(texts), dtype=np.float32))
+        idf = None
+        if getattr(emb, "tfidf", False) and len(texts):
+            df = np.count_nonzero(mat, axis=0).astype(np.float32)
+            idf = np.log((1.0 + len(texts)) / (1.0 + df)) + 1.0
+            mat *= idf
+        return cls(_normalize(mat), texts, emb, metadatas, idf)
+
+    @classmethod
+    def load_local(cls, path: str, emb, allow_dangerous_deserialization: bool = False):
+        matrix = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(path, "docs.json"), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        idf = None
+        if os.path.exists(os.path.join(path, "idf.npy")):
+            idf = np.load(os.path.join(path, "idf.npy"))
+        return cls(matrix, data["docs"], emb, data.get("metadatas"), idf)
+
+    def save_local(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "vectors.npy"), np.ascontiguousarray(self.matrix, dtype=np.float32))
+        if self.idf is not None:
+            np.save(os.path.join(path, "idf.npy"), self.idf)
+        with open(os.path.join(path, "docs.json"), "w", encoding="utf-8") as f:
+            json.dump({"docs": self.docs, "metadatas": self.metadatas}, f, ensure_ascii=False)
+
+    def similarity_search(self, question: str, k: int = 4) -> list[_Hit]:
+        if not self.docs or k <= 0:
+            return []
+        q = np.asarray(self.emb.embed_query(question), dtype=np.float32).copy()
+        if self.idf is not None:
+            q *= self.idf
+        _normalize(q)
+        scores = self.matrix @ q
+        k = min(k, len(self.docs))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        metas = self.metadatas
+        return [_Hit(self.docs[i], dict(metas[i]) if metas else {}, float(scores[i])) for i in top if scores[i] > 0]
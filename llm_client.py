@@ -1,12 +1,108 @@
 """
 LLM 客户端模块
 功能：调用 OpenAI 兼容接口生成 SQL，并支持模型动态切换。
+生成结果按（规范化问题、Schema 指纹、模型、方言、LIMIT、检索上下文）缓存：内存 LRU + 磁盘 SQLite，
+Schema 指纹变化后旧条目不再命中并随 TTL/容量淘汰。
+配置：LLM_CACHE（默认 1，0 关闭）、LLM_CACHE_SIZE（内存条目，默认 1024）、LLM_CACHE_DISK_SIZE（磁盘条目，默认 20000）、
+LLM_CACHE_TTL（秒，默认 7 天）、LLM_CACHE_PATH（默认 ./cache/llm_sql.sqlite3）
+Schema 文档按整张表累加到 SCHEMA_MAX_CHARS（默认 8000）、检索上下文按整个片段累加到 RAG_CONTEXT_MAX_CHARS（默认 2400）为止，不在中间截断。
+缓存命中与每次调用的 prompt/completion token 数记入 metrics.py。
+远程调用按提供方（base_url）共享令牌桶限速：LLM_RATE_LIMIT（每秒请求数，默认 0 不限）、LLM_RATE_BURST（突发上限）
 方法：
+- get_rate_limiter(provider): 获取提供方共享的限速器
 - generate_sql(question, schema, dialect, limit, context_docs): 返回 SQL 字符串
+- cache_key(question, schema, dialect, limit, context_docs): 返回缓存键
+- cache_stats(): 返回缓存命中统计
 - reconfigure_model(provider, model_name): 切换模型名
+- AsyncLLMClient.generate_sql(question, schema, dialect, limit, context_docs, timeout): 异步生成 SQL，
+  基于 AsyncOpenAI 与共享 httpx 连接池，信号量限制并发（LLM_MAX_CONCURRENCY，默认 64），单次请求截止时间（LLM_TIMEOUT，默认 60 秒）
 """
 import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
 from openai import OpenAI
+from cache import LRUCache, DiskCache, TieredCache
+import metrics
+
+def _normalize_question(question: str) -> str:
+    return " ".join((question or "").split()).casefold()
+
+def _take_whole(docs: list[str], max_chars: int) -> list[str]:
+    kept, size = [], 0
+    for d in docs:
+        if kept and size + len(d) > max_chars:
+            break
+        kept.append(d)
+        size += len(d) + 1
+    return kept
+
+class RateLimiter:
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = float(rate)
+        self.capacity = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._ts = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._ts) * self.rate)
+            self._ts = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        if self.rate <= 0:
+            return
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+_limiters: dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    with _limiters_lock:
+        lim = _limiters.get(provider)
+        if lim is None:
+            lim = RateLimiter(float(os.getenv("LLM_RATE_LIMIT", "0")), float(os.getenv("LLM_RATE_BURST", "0")) or None)
+            _limiters[provider] = lim
+        return lim
+
+_caches: dict[str, TieredCache] = {}
+_caches_lock = threading.Lock()
+
+def _build_cache():
+    # 同一缓存文件在进程内只打开一次，同步与异步客户端共享
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    path = os.getenv("LLM_CACHE_PATH", None) or os.path.join(os.path.dirname(__file__), "cache", "llm_sql.sqlite3")
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            ttl = float(os.getenv("LLM_CACHE_TTL", str(7 * 86400)))
+            memory = LRUCache(int(os.getenv("LLM_CACHE_SIZE", "1024")), ttl)
+            disk = DiskCache(path, int(os.getenv("LLM_CACHE_DISK_SIZE", "20000")), ttl)
+            cache = TieredCache(memory, disk)
+            _caches[path] = cache
+        return cache
 
 class LLMClient:
     def __init__(self):
@@ -18,7 +114,14 @@ class LLMClient:
             raise RuntimeError("未配置 API_KEY")
         if not self._model_name:
             raise RuntimeError("未设置 MODEL_NAME。请选择有效的模型名称。")
-        self._client = OpenAI(api_key=api_key, base_url=base_url)
+        self._client = self._make_client(api_key, base_url)
+        self.cache = _build_cache()
+        self.rate_limiter = get_rate_limiter(base_url)
+        self.schema_max_chars = int(os.getenv("SCHEMA_MAX_CHARS", "8000"))
+        self.context_max_chars = int(os.getenv("RAG_CONTEXT_MAX_CHARS", "2400"))
+
+    def _make_client(self, api_key: str, base_url: str):
+        return OpenAI(api_key=api_key, base_url=base_url)
 
     def _extract_sql(self, text: str) -> str:
         t = text.strip()
@@ -29,24 +132,105 @@ class LLMClient:
             t = t[:semi]
         return t.strip()
 
-    def generate_sql(self, question: str, schema: dict, dialect: str, limit: int, context_docs: list[str] | None = None) -> str:
-        schema_docs = "\n".join(schema.get("docs", []))[:4000]
-        ctx_docs = "\n".join(context_docs or [])[:2000]
-        messages = [
+    def cache_key(self, question: str, schema: dict, dialect: str, limit: int, context_docs: list[str] | None = None) -> str:
+        fp = schema.get("fingerprint") or hashlib.sha1("\n".join(schema.get("docs", [])).encode("utf-8")).hexdigest()
+        ctx = hashlib.sha1("\n".join(context_docs or []).encode("utf-8")).hexdigest()
+        raw = json.dumps([_normalize_question(question), fp, self._model_name, dialect, limit, ctx], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats() if self.cache is not None else {}
+
+    def _messages(self, question: str, schema: dict, dialect: str, context_docs: list[str] | None = None) -> list[dict]:
+        # Schema 由 SchemaLinker 按相关性裁剪、知识库按片段检索；此处只按整条累加到字符上限，不在中间截断
+        schema_docs = "\n".join(_take_whole(schema.get("docs", []), self.schema_max_chars))
+        ctx_docs = "\n".join(_take_whole(context_docs or [], self.context_max_chars))
+        return [
             {"role": "system", "content": f"你是一个只返回SQL的助手。目标方言：{dialect}。必须仅返回一条合法的SELECT语句，不要任何解释或代码块；只能使用提供的表与列信息；如果询问中出现的字段不在数据库中，直接返回字符串7355608。"},
             {"role": "user", "content": f"问题：{question}\nSchema：\n{schema_docs}\n上下文：\n{ctx_docs}\n输出：一条{dialect}方言的SELECT查询。"},
         ]
+
+    def _lookup(self, question: str, schema: dict, dialect: str, limit: int, context_docs: list[str] | None):
+        if self.cache is None:
+            return None, None
+        key = self.cache_key(question, schema, dialect, limit, context_docs)
+        cached = self.cache.get(key)
+        metrics.record_cache("llm", cached is not None)
+        return key, cached
+
+    def _finish(self, key: str | None, resp) -> str:
+        usage = getattr(resp, "usage", None)
+        if usage is not None:
+            metrics.record_tokens(getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+        sql = self._extract_sql(resp.choices[0].message.content or "")
+        if key is not None and sql:
+            self.cache.set(key, sql)
+        return sql
+
+    def _translate_error(self, e: Exception) -> Exception:
+        msg = str(e)
+        if "Model does not exist" in msg or "20012" in msg:
+            return RuntimeError("模型不可用")
+        return e
+
+    def generate_sql(self, question: str, schema: dict, dialect: str, limit: int, context_docs: list[str] | None = None) -> str:
+        key, cached = self._lookup(question, schema, dialect, limit, context_docs)
+        if cached is not None:
+            return cached
+        messages = self._messages(question, schema, dialect, context_docs)
+        self.rate_limiter.acquire()
         try:
             resp = self._client.chat.completions.create(model=self._model_name, messages=messages, temperature=0)
-            text = resp.choices[0].message.content or ""
         except Exception as e:
-            msg = str(e)
-            if "Model does not exist" in msg or "20012" in msg:
-                raise RuntimeError("模型不可用")
-            raise
-        sql = self._extract_sql(text)
-        return sql
+            err = self._translate_error(e)
+            if err is e:
+                raise
+            raise err
+        return self._finish(key, resp)
 
     def reconfigure_model(self, provider: str | None = None, model_name: str | None = None):
         if model_name:
-            self._model_name = model_name
\ No newline at end of file
+            self._model_name = model_name
+
+class AsyncLLMClient(LLMClient):
+    def __init__(self):
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "64"))
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "60"))
+        self._sem = None
+        super().__init__()
+
+    def _make_client(self, api_key: str, base_url: str):
+        import httpx
+        from openai import AsyncOpenAI
+        # 同一 httpx 连接池承载全部并发请求，保持长连接复用
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self._http = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(self.timeout, connect=10.0))
+        return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self._http)
+
+    async def generate_sql(self, question: str, schema: dict, dialect: str, limit: int, context_docs: list[str] | None = None, timeout: float | None = None) -> str:
+        key, cached = self._lookup(question, schema, dialect, limit, context_docs)
+        if cached is not None:
+            return cached
+        messages = self._messages(question, schema, dialect, context_docs)
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+        deadline = min(timeout, self.timeout) if timeout else self.timeout
+
+        async def _call():
+            await self.rate_limiter.acquire_async()
+            async with self._sem:
+                return await self._client.chat.completions.create(model=self._model_name, messages=messages, temperature=0)
+
+        try:
+            resp = await asyncio.wait_for(_call(), timeout=deadline)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"模型调用超时（超过 {deadline} 秒）")
+        except Exception as e:
+            err = self._translate_error(e)
+            if err is e:
+                raise
+            raise err
+        return self._finish(key, resp)
+
+    async def aclose(self):
+        await self._client.close()
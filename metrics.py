@@ -0,0 +1,169 @@
+"""
+指标模块
+功能：进程内的轻量计数器与直方图，以 Prometheus 文本格式导出（/v1/metrics）；
+StageTimer 记录单个请求各阶段耗时（同时写入阶段直方图）、LLM token 数与读取行数，经 contextvars 在编排流程中传递，
+IO 线程池中的步骤由 Orchestrator.run_blocking 复制上下文后同样记录到当前请求。
+方法：
+- StageTimer.stage(name): 计时上下文；metadata(): 返回 {"stages", "llm_tokens", "rows_fetched"}；elapsed_ms(): 请求已用时间
+- activate(timer) / deactivate(token): 设置当前请求的 StageTimer
+- stage(name): 为当前请求（若有）计时并写入 text2sql_stage_seconds
+- record_tokens(prompt, completion) / record_rows(n) / record_cache(cache, hit): 记录 token、行数与缓存命中
+- render(): 返回 Prometheus 文本（含按缓存计算的 text2sql_cache_hit_ratio）
+"""
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+_DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(n, "") for n in self.labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labels, key)} {v:g}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = _DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                # [各桶计数..., 总和, 总数]
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+                    break
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for key, s in series:
+            acc = 0
+            for i, b in enumerate(self.buckets):
+                acc += s[i]
+                lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + (f'{b:g}',))} {acc}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), key + ('+Inf',))} {s[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {s[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {s[-1]}")
+        return lines
+
+STAGE_SECONDS = Histogram("text2sql_stage_seconds", "Duration of each query pipeline stage", ("stage",))
+REQUEST_SECONDS = Histogram("text2sql_request_seconds", "End-to-end duration of chat completion requests", ("status",))
+LLM_TOKENS = Counter("text2sql_llm_tokens_total", "LLM tokens consumed", ("kind",))
+ROWS_FETCHED = Counter("text2sql_rows_fetched_total", "Rows returned by database queries")
+CACHE_REQUESTS = Counter("text2sql_cache_requests_total", "Cache lookups by cache and result", ("cache", "result"))
+_METRICS = [STAGE_SECONDS, REQUEST_SECONDS, LLM_TOKENS, ROWS_FETCHED, CACHE_REQUESTS]
+
+class StageTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.rows = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            dt = time.perf_counter() - t0
+            self.stages[name] = round(self.stages.get(name, 0.0) + dt * 1000, 3)
+            STAGE_SECONDS.observe(dt, stage=name)
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 3)
+
+    def metadata(self) -> dict:
+        return {"stages": dict(self.stages), "llm_tokens": {"prompt": self.prompt_tokens, "completion": self.completion_tokens}, "rows_fetched": self.rows}
+
+_current: contextvars.ContextVar = contextvars.ContextVar("text2sql_stage_timer", default=None)
+
+def activate(timer: StageTimer):
+    return _current.set(timer)
+
+def deactivate(token):
+    _current.reset(token)
+
+def current() -> StageTimer | None:
+    return _current.get()
+
+@contextmanager
+def stage(name: str):
+    timer = _current.get()
+    if timer is not None:
+        with timer.stage(name):
+            yield timer
+        return
+    t0 = time.perf_counter()
+    try:
+        yield None
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=name)
+
+def record_tokens(prompt: int, completion: int):
+    LLM_TOKENS.inc(prompt or 0, kind="prompt")
+    LLM_TOKENS.inc(completion or 0, kind="completion")
+    timer = _current.get()
+    if timer is not None:
+        timer.prompt_tokens += prompt or 0
+        timer.completion_tokens += completion or 0
+
+def record_rows(n: int):
+    ROWS_FETCHED.inc(n)
+    timer = _current.get()
+    if timer is not None:
+        timer.rows += n
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def render() -> str:
+    lines = []
+    for m in _METRICS:
+        lines.extend(m.render())
+    lines += ["# HELP text2sql_cache_hit_ratio Cache hit ratio since process start", "# TYPE text2sql_cache_hit_ratio gauge"]
+    for cache in sorted({k[0] for k in list(CACHE_REQUESTS._values)}):
+        hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+        total = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+        lines.append(f"text2sql_cache_hit_ratio{_labels(('cache',), (cache,))} {(hits / total) if total else 0:g}")
+    return "\n".join(lines) + "\n"
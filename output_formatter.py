@@ -1,92 +1,77 @@
 # 输出与结果保存模块
 # 功能：格式化查询结果为表格、JSON、CSV，并保存到 results 目录。
+# 结果按列处理（result_set.ResultSet，其他行序列先转换），JSON 由 orjson 按批序列化，结构与缩进同缩进 2 格的 json.dumps；
+# 浮点数写法不同（1e16、0.000025，原为 1e+16、2.5e-05），NaN/Infinity 输出为 null（原为 NaN/Infinity）。
 # 方法：
 # - to_table(rows, headers): 返回表格字符串
 # - to_json(rows, headers): 返回JSON字符串
 # - to_csv(rows, headers): 返回CSV字符串
-# - save_json(rows, headers, filename=None): 保存JSON文件并返回路径
+# - save_json(question, sql, rows, headers, filename=None): 保存JSON文件并返回路径（rows 可为生成器，流式写出）
 # - save_csv(rows, headers, filename=None): 保存CSV文件并返回路径
-import json
-import io
+# - save_batch_json(items, filename=None): 逐条写出批量结果
+# - dumps(obj, indent=False): orjson 序列化为 UTF-8 字节（供 API 响应使用，ResultSet 输出为行数组）
 import os
+import itertools
+from collections.abc import Mapping
 from datetime import datetime
+from result_set import ResultSet, dumps
+
+_CHUNK = 1000
+
+def _records(rows, headers):
+    if isinstance(rows, ResultSet):
+        yield from rows.records()
+        return
+    for r in rows:
+        yield {h: r[h] for h in headers} if isinstance(r, Mapping) else dict(zip(headers, r))
+
+def _write_array(f, items, level: int, chunk: int = _CHUNK):
+    # 每批用 orjson 序列化为缩进数组，去掉首尾方括号后按嵌套层级补缩进拼接，内存只保留一批
+    pad = "  " * level
+    first = True
+    it = iter(items)
+    while True:
+        batch = list(itertools.islice(it, chunk))
+        if not batch:
+            break
+        inner = dumps(batch, indent=True).decode("utf-8")[2:-2]
+        f.write(("[\n" if first else ",\n") + pad + inner.replace("\n", "\n" + pad))
+        first = False
+    f.write("[]" if first else "\n" + pad + "]")
 
 class OutputFormatter:
     def to_table(self, rows, headers) -> str:
-        widths = [len(h) for h in headers]
-        for r in rows:
-            for i, h in enumerate(headers):
-                try:
-                    v = str(r[h])
-                except Exception:
-                    v = str(r[i])
-                if len(v) > widths[i]:
-                    widths[i] = len(v)
-        line = " | ".join(h.ljust(widths[i]) for i, h in enumerate(headers))
-        sep = "-+-".join("-" * w for w in widths)
-        out = [line, sep]
-        for r in rows:
-            line_vals = []
-            for i, h in enumerate(headers):
-                try:
-                    v = str(r[h])
-                except Exception:
-                    v = str(r[i])
-                line_vals.append(v.ljust(widths[i]))
-            out.append(" | ".join(line_vals))
+        rs = ResultSet.from_rows(rows, headers)
+        cells = [[str(v) for v in col] for col in rs.columns]
+        widths = [max([len(h)] + [len(v) for v in col]) for h, col in zip(headers, cells)]
+        out = [" | ".join(h.ljust(w) for h, w in zip(headers, widths)), "-+-".join("-" * w for w in widths)]
+        for row in zip(*cells):
+            out.append(" | ".join(v.ljust(w) for v, w in zip(row, widths)))
         return "\n".join(out)
+    def dumps(self, obj, indent: bool = False) -> bytes:
+        return dumps(obj, indent)
     def to_json(self, rows, headers) -> str:
-        out = []
-        for r in rows:
-            item = {}
-            for i, h in enumerate(headers):
-                try:
-                    item[h] = r[h]
-                except Exception:
-                    item[h] = r[i]
-            out.append(item)
-        return json.dumps(out, ensure_ascii=False, indent=2)
+        return dumps(list(_records(rows, headers)), indent=True).decode("utf-8")
     def save_json(self, question: str, sql: str, rows, headers, filename: str | None = None) -> str:
         base = os.path.join(os.path.dirname(__file__), "results")
         os.makedirs(base, exist_ok=True)
         name = filename or f"result_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         path = os.path.join(base, name)
-        result_rows = []
-        for r in rows:
-            item = {}
-            for i, h in enumerate(headers):
-                try:
-                    item[h] = r[h]
-                except Exception:
-                    item[h] = r[i]
-            result_rows.append(item)
-        payload = {"用户问题": question, "SQL查询语句": sql, "查询结果": result_rows}
+        head = dumps({"用户问题": question, "SQL查询语句": sql}, indent=True).decode("utf-8")
         with open(path, "w", encoding="utf-8") as f:
-            f.write(json.dumps(payload, ensure_ascii=False, indent=2))
-            f.write("\n")
+            # rows 可为生成器（如 DbExecutor.stream），按批写出，不在内存中拼装完整结果
+            f.write(head[:-2] + ',\n  "查询结果": ')
+            _write_array(f, _records(rows, headers), 1)
+            f.write("\n}\n")
         return path
     def save_batch_json(self, items: list, filename: str | None = None) -> str:
         base = os.path.join(os.path.dirname(__file__), "results")
         os.makedirs(base, exist_ok=True)
         name = filename or f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         path = os.path.join(base, name)
-        out_items = []
-        for it in items:
-            q = it.get("question", "")
-            sql = it.get("sql")
-            rows = it.get("rows") or []
-            headers = it.get("headers") or []
-            result_rows = []
-            for r in rows:
-                item = {}
-                for i, h in enumerate(headers):
-                    try:
-                        item[h] = r[h]
-                    except Exception:
-                        item[h] = r[i]
-                result_rows.append(item)
-            out_items.append({"用户问题": q, "SQL查询语句": sql, "查询结果": result_rows})
+        out_items = ({"用户问题": it.get("question", ""), "SQL查询语句": it.get("sql"), "查询结果": list(_records(it.get("rows") or [], it.get("headers") or []))} for it in items)
         with open(path, "w", encoding="utf-8") as f:
-            f.write(json.dumps({"批次结果": out_items}, ensure_ascii=False, indent=2))
-            f.write("\n")
-        return path
\ No newline at end of file
+            f.write('{\n  "批次结果": ')
+            _write_array(f, out_items, 1, chunk=1)
+            f.write("\n}\n")
+        return path
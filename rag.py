@@ -1,77 +1,255 @@
 """
 RAG 检索模块
 功能：构建向量索引或启用简易检索，返回相关文档。
+向量化后端由 RAG_EMBEDDING 选择：remote（OpenAIEmbeddings + FAISS）、local（embeddings.py 本地哈希 n-gram TF-IDF，无需网络）、
+auto（默认，远程依赖可用时用 remote，否则用 local）。远程向量按文本内容缓存（见 embeddings.CachedEmbeddings），知识库改动只为变化的片段调用向量接口。
+向量索引按文档内容哈希持久化到 RAG_INDEX_DIR（默认 ./rag_index），文档集合不变时直接复用，不再重复计算文档向量。
+知识库文件清单 (path, size, mtime, hash) 与抽取文本同样保存在该目录，未变化的文件不再重复解析。
 方法：
-- RAGIndex.build(docs): 构建索引
+- RAGIndex.build(docs, metadatas): 构建索引（命中内存或磁盘缓存时跳过），metadatas 与 docs 一一对应
+- RAGIndex.content_key(docs, emb): 计算文档集合的内容哈希
+- RAGIndex.load_docs_from_dir(dir_path, glob_patterns): 按文件清单增量抽取知识库文本（变更文件多进程解析，删除文件出清单）
+- RAGIndex.load_chunks_from_dir(dir_path, glob_patterns): 同上，但返回切分后的 (chunks, metadatas)，metadata 含 source/chunk/offset
+- RAGIndex.ingest_file(path, h): 单文件写入清单（上传后调用，无需全量扫描；h 为上传时已算出的 sha256，避免重复读取文件）
+- RAGIndex.find_by_hash(h, dir_path): 返回清单中内容哈希相同的文件路径，用于上传去重
+- chunk_text(text, ext, size, overlap): 将文档切分为有界且相互重叠的片段，返回 [(字符偏移, 片段)]；
+  csv/xlsx/xls 按行切分并在每段重复表头，docx 按段落、md/txt 按空行分隔的段落切分，超长段落按字符窗口切分
+  配置：RAG_CHUNK_SIZE（片段字符上限，默认 800）、RAG_CHUNK_OVERLAP（相邻片段重叠字符数，默认 100）
 - RAGRetriever.set_index(index): 设置索引
-- RAGRetriever.query(question, top_k): 返回相关文档列表
+- RAGRetriever.query(question, top_k): 返回相关文档列表；无向量索引时使用 BM25 倒排索引检索
+- RAGRetriever.search(question, top_k): 返回 [{"text", "metadata"}]，可追溯片段来源文件与偏移
+- BM25Index(docs).search(question, top_k): 返回 [(文档下标, 分数)]，倒排表在 RAGIndex.build 中一次性构建，查询开销只与问题词项的倒排长度相关
+- tokenize(text, lower): 分词（英文/数字按词，lower 为 True 时转小写；中文按相邻双字），schema_linker 在此基础上再拆分词项
 """
-class RAGIndex:
-    def __init__(self):
-        self.docs = []
-        self.vs = None
-        try:
-            from langchain_openai import OpenAIEmbeddings
-            from langchain_community.vectorstores import FAISS
-            self._emb_cls = OpenAIEmbeddings
-            self._vs_cls = FAISS
-        except Exception:
-            self._emb_cls = None
-            self._vs_cls = None
-    def _extract_text_from_file(self, path: str) -> str | None:
-        try:
-            ext = (path.split('.')[-1] or '').lower()
-            if ext in ("txt", "md"):
-                with open(path, "r", encoding="utf-8") as f:
-                    return f.read()
-            if ext == "csv":
-                import csv
+import os
+import re
+import math
+import heapq
+import hashlib
+import shutil
+import json
+import glob
+import threading
+
+def _extract_text(path: str) -> str | None:
+    try:
+        ext = (path.split('.')[-1] or '').lower()
+        if ext in ("txt", "md"):
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        if ext == "csv":
+            import csv
+            out = []
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                r = csv.reader(f)
+                for row in r:
+                    out.append("\t".join(str(x) for x in row))
+            return "\n".join(out)
+        if ext in ("xlsx",):
+            try:
+                import openpyxl
+                wb = openpyxl.load_workbook(path, read_only=True)
                 out = []
-                with open(path, "r", encoding="utf-8", newline="") as f:
-                    r = csv.reader(f)
-                    for row in r:
+                for ws in wb.worksheets:
+                    for row in ws.iter_rows(values_only=True):
+                        out.append("\t".join(str(x) if x is not None else "" for x in row))
+                return "\n".join(out)
+            except Exception:
+                return None
+        if ext in ("xls",):
+            try:
+                import xlrd
+                book = xlrd.open_workbook(path)
+                out = []
+                for si in range(book.nsheets):
+                    sh = book.sheet_by_index(si)
+                    for ri in range(sh.nrows):
+                        row = sh.row_values(ri)
                         out.append("\t".join(str(x) for x in row))
                 return "\n".join(out)
-            if ext in ("xlsx",):
-                try:
-                    import openpyxl
-                    wb = openpyxl.load_workbook(path, read_only=True)
-                    out = []
-                    for ws in wb.worksheets:
-                        for row in ws.iter_rows(values_only=True):
-                            out.append("\t".join(str(x) if x is not None else "" for x in row))
-                    return "\n".join(out)
-                except Exception:
-                    return None
-            if ext in ("xls",):
-                try:
-                    import xlrd
-                    book = xlrd.open_workbook(path)
-                    out = []
-                    for si in range(book.nsheets):
-                        sh = book.sheet_by_index(si)
-                        for ri in range(sh.nrows):
-                            row = sh.row_values(ri)
-                            out.append("\t".join(str(x) for x in row))
-                    return "\n".join(out)
-                except Exception:
-                    return None
-            if ext in ("docx",):
-                try:
-                    from docx import Document
-                    doc = Document(path)
-                    return "\n".join(p.text for p in doc.paragraphs)
-                except Exception:
-                    return None
+            except Exception:
+                return None
+        if ext in ("docx",):
+            try:
+                from docx import Document
+                doc = Document(path)
+                return "\n".join(p.text for p in doc.paragraphs)
+            except Exception:
+                return None
 
-        except Exception:
-            return None
+    except Exception:
         return None
+    return None
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+_TABLE_EXTS = ("csv", "xlsx", "xls")
+
+def _units(text: str, ext: str) -> list[tuple[int, str]]:
+    if ext in _TABLE_EXTS or ext == "docx":
+        pat = r"[^\n]+"
+    else:
+        pat = r"[^\n]+(?:\n(?![ \t]*\n)[^\n]+)*"
+    return [(m.start(), m.group()) for m in re.finditer(pat, text) if m.group().strip()]
+
+def _split_long(off: int, s: str, size: int, overlap: int) -> list[tuple[int, str]]:
+    step = max(1, size - overlap)
+    out = []
+    i = 0
+    while True:
+        out.append((off + i, s[i:i + size]))
+        if i + size >= len(s):
+            return out
+        i += step
+
+def chunk_text(text: str, ext: str, size: int | None = None, overlap: int | None = None) -> list[tuple[int, str]]:
+    size = max(1, int(size or os.getenv("RAG_CHUNK_SIZE", "800")))
+    overlap = max(0, int(overlap if overlap is not None else os.getenv("RAG_CHUNK_OVERLAP", "100")))
+    ext = (ext or "").lower().lstrip(".")
+    units = _units(text or "", ext)
+    prefix = ""
+    if ext in _TABLE_EXTS and len(units) > 1:
+        prefix = units[0][1] + "\n"
+        units = units[1:]
+    sep = "\n" if ext in _TABLE_EXTS or ext == "docx" else "\n\n"
+    budget = max(1, size - len(prefix))
+    overlap = min(overlap, budget - 1) if budget > 1 else 0
+    flat = []
+    for off, u in units:
+        flat.extend(_split_long(off, u, budget, overlap) if len(u) > budget else [(off, u)])
+    chunks = []
+    i = 0
+    while i < len(flat):
+        j = i
+        n = 0
+        while j < len(flat) and (j == i or n + len(sep) + len(flat[j][1]) <= budget):
+            n += len(flat[j][1]) + (len(sep) if j > i else 0)
+            j += 1
+        chunks.append((flat[i][0], prefix + sep.join(u for _, u in flat[i:j])))
+        if j >= len(flat):
+            break
+        # 回退若干个完整单元作为与下一片段的重叠，保证至少前进一个单元
+        k = j
+        m = 0
+        while k - 1 > i and m + len(flat[k - 1][1]) <= overlap:
+            k -= 1
+            m += len(flat[k][1]) + len(sep)
+        if m + len(flat[j][1]) > budget:
+            k = j
+        i = k
+    return chunks
+
+_TOKEN = re.compile(r"[A-Za-z0-9_]+|[\u4e00-\u9fff]+")
+
+def tokenize(text: str, lower: bool = True) -> list[str]:
+    out = []
+    for w in _TOKEN.findall(text or ""):
+        if "\u4e00" <= w[0] <= "\u9fff":
+            if len(w) > 1:
+                out.extend(w[i:i + 2] for i in range(len(w) - 1))
+            else:
+                out.append(w)
+        else:
+            out.append(w.lower() if lower else w)
+    return out
+
+class BM25Index:
+    def __init__(self, docs: list[str], k1: float = 1.5, b: float = 0.75, metadatas: list[dict] | None = None):
+        self.docs = docs
+        self.metadatas = metadatas
+        self.k1 = k1
+        self.b = b
+        self.postings: dict[str, list[tuple[int, int]]] = {}
+        self.doc_len = []
+        for i, d in enumerate(docs):
+            tf: dict[str, int] = {}
+            for t in tokenize(d):
+                tf[t] = tf.get(t, 0) + 1
+            self.doc_len.append(sum(tf.values()))
+            for t, c in tf.items():
+                self.postings.setdefault(t, []).append((i, c))
+        n = len(self.doc_len)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    def search(self, question: str, top_k: int = 5) -> list[tuple[int, float]]:
+        scores: dict[int, float] = {}
+        k1, b, avgdl = self.k1, self.b, self.avgdl or 1.0
+        for t in set(tokenize(question)):
+            p = self.postings.get(t)
+            if not p:
+                continue
+            idf = self.idf[t]
+            for i, tf in p:
+                norm = tf + k1 * (1 - b + b * self.doc_len[i] / avgdl)
+                scores[i] = scores.get(i, 0.0) + idf * tf * (k1 + 1) / norm
+        return heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
+
+class RAGIndex:
+    def __init__(self, index_dir: str | None = None):
+        self.docs = []
+        self.vs = None
+        self.key = None
+        self.bm25 = None
+        self.metadatas = None
+        self.index_dir = index_dir or os.getenv("RAG_INDEX_DIR", None) or os.path.join(os.path.dirname(__file__), "rag_index")
+        self.keep = int(os.getenv("RAG_INDEX_KEEP", "3"))
+        self.manifest = None
+        self._manifest_lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._emb_cls = None
+        self._vs_cls = None
+        self._remote = False
+        self._embed_cache = None
+        mode = os.getenv("RAG_EMBEDDING", "auto").strip().lower()
+        if mode in ("auto", "remote"):
+            try:
+                from langchain_openai import OpenAIEmbeddings
+                from langchain_community.vectorstores import FAISS
+                self._emb_cls = OpenAIEmbeddings
+                self._vs_cls = FAISS
+                self._remote = True
+            except Exception:
+                pass
+        if self._emb_cls is None and mode in ("auto", "local"):
+            try:
+                from embeddings import HashingEmbeddings, VectorIndex
+                self._emb_cls = HashingEmbeddings
+                self._vs_cls = VectorIndex
+            except Exception:
+                pass
+    def _extract_text_from_file(self, path: str) -> str | None:
+        return _extract_text(path)
     def load_docs_from_dir(self, dir_path: str, glob_patterns: str | None = None) -> list[str]:
-        import os
-        import glob
-        if not dir_path or not os.path.isdir(dir_path):
+        paths = self._sync_dir(dir_path, glob_patterns)
+        if not paths:
             return []
+        texts = []
+        with self._manifest_lock:
+            for p in paths:
+                t = self._entry_text(p)
+                if t and t.strip():
+                    texts.append(t)
+        return texts
+    def load_chunks_from_dir(self, dir_path: str, glob_patterns: str | None = None) -> tuple[list[str], list[dict]]:
+        paths = self._sync_dir(dir_path, glob_patterns)
+        chunks, metas = [], []
+        if not paths:
+            return chunks, metas
+        with self._manifest_lock:
+            for p in paths:
+                for i, (off, c) in enumerate(self._entry_chunks(p)):
+                    chunks.append(c)
+                    metas.append({"source": p, "chunk": i, "offset": off})
+        return chunks, metas
+    def _sync_dir(self, dir_path: str, glob_patterns: str | None) -> list[str] | None:
+        if not dir_path or not os.path.isdir(dir_path):
+            return None
         pats = []
         if glob_patterns:
             for p in str(glob_patterns).split(","):
@@ -80,29 +258,234 @@ class RAGIndex:
                     pats.append(p)
         if not pats:
             pats = ["*.txt", "*.md", "*.csv", "*.xlsx", "*.xls", "*.docx"]
-        texts = []
+        paths = []
+        seen = set()
         for gp in pats:
             for p in glob.glob(os.path.join(dir_path, gp)):
-                t = self._extract_text_from_file(p)
-                if t and t.strip():
-                    texts.append(t)
-        return texts
-    def build(self, docs: list[str]):
-        self.docs = docs or []
+                p = os.path.abspath(p)
+                if p not in seen:
+                    seen.add(p)
+                    paths.append(p)
+        with self._manifest_lock:
+            self._load_manifest()
+            changed = self._evict_missing(dir_path)
+            stale = []
+            for p in paths:
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                e = self.manifest.get(p)
+                if e and e["size"] == st.st_size and e["mtime"] == st.st_mtime_ns:
+                    continue
+                try:
+                    h = _file_hash(p)
+                except OSError:
+                    continue
+                if e and e["hash"] == h:
+                    e["size"], e["mtime"] = st.st_size, st.st_mtime_ns
+                    changed = True
+                    continue
+                stale.append((p, st, h))
+            if stale:
+                texts = self._extract_many([p for p, _, _ in stale])
+                for (p, st, h), t in zip(stale, texts):
+                    self._put_entry(p, st, h, t)
+                changed = True
+            if changed:
+                self._save_manifest()
+        return paths
+    def find_by_hash(self, h: str, dir_path: str | None = None) -> str | None:
+        base = os.path.abspath(dir_path) if dir_path else None
+        with self._manifest_lock:
+            self._load_manifest()
+            for p, e in self.manifest.items():
+                if e["hash"] == h and (base is None or os.path.dirname(p) == base) and os.path.isfile(p):
+                    return p
+        return None
+    def ingest_file(self, path: str, h: str | None = None) -> str | None:
+        path = os.path.abspath(path)
+        if not os.path.isfile(path):
+            return None
+        st = os.stat(path)
+        h = h or _file_hash(path)
+        with self._manifest_lock:
+            self._load_manifest()
+            e = self.manifest.get(path)
+            if e and e["hash"] == h:
+                e["size"], e["mtime"] = st.st_size, st.st_mtime_ns
+            else:
+                self._put_entry(path, st, h, _extract_text(path))
+            self._save_manifest()
+            return self._entry_text(path)
+    def _extract_many(self, paths: list[str]) -> list[str | None]:
+        workers = int(os.getenv("KB_WORKERS", "0")) or (os.cpu_count() or 1)
+        workers = min(workers, len(paths))
+        if workers > 1:
+            try:
+                from concurrent.futures import ProcessPoolExecutor
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    return list(pool.map(_extract_text, paths))
+            except Exception:
+                pass
+        return [_extract_text(p) for p in paths]
+    def _manifest_path(self) -> str:
+        return os.path.join(self.index_dir, "kb_manifest.json")
+    def _text_path(self, h: str) -> str:
+        return os.path.join(self.index_dir, "kb_text", h + ".txt")
+    def _load_manifest(self):
+        if self.manifest is not None:
+            return
+        self.manifest = {}
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for p, e in (data.get("files") or {}).items():
+                self.manifest[p] = {"size": e["size"], "mtime": e["mtime"], "hash": e["hash"], "empty": bool(e.get("empty")), "text": None, "chunks": None}
+        except Exception:
+            self.manifest = {}
+    def _save_manifest(self):
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            files = {p: {"size": e["size"], "mtime": e["mtime"], "hash": e["hash"], "empty": e["empty"]} for p, e in self.manifest.items()}
+            tmp = self._manifest_path() + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"files": files}, f, ensure_ascii=False, indent=2)
+                f.write("\n")
+            os.replace(tmp, self._manifest_path())
+        except Exception:
+            pass
+    def _put_entry(self, path: str, st, h: str, text: str | None):
+        empty = not (text and text.strip())
+        if not empty:
+            try:
+                tp = self._text_path(h)
+                os.makedirs(os.path.dirname(tp), exist_ok=True)
+                with open(tp, "w", encoding="utf-8") as f:
+                    f.write(text)
+            except Exception:
+                pass
+        self.manifest[path] = {"size": st.st_size, "mtime": st.st_mtime_ns, "hash": h, "empty": empty, "text": None if empty else text, "chunks": None}
+    def _entry_text(self, path: str) -> str | None:
+        e = self.manifest.get(path)
+        if not e or e["empty"]:
+            return None
+        if e["text"] is None:
+            try:
+                with open(self._text_path(e["hash"]), "r", encoding="utf-8") as f:
+                    e["text"] = f.read()
+            except Exception:
+                e["text"] = _extract_text(path)
+        return e["text"]
+    def _entry_chunks(self, path: str) -> list[tuple[int, str]]:
+        e = self.manifest.get(path)
+        if not e or e["empty"]:
+            return []
+        if e["chunks"] is None:
+            text = self._entry_text(path)
+            e["chunks"] = chunk_text(text, path.rsplit(".", 1)[-1]) if text else []
+        return e["chunks"]
+    def _evict_missing(self, dir_path: str) -> bool:
+        base = os.path.abspath(dir_path)
+        gone = [p for p in self.manifest if os.path.dirname(p) == base and not os.path.exists(p)]
+        for p in gone:
+            h = self.manifest.pop(p)["hash"]
+            if not any(e["hash"] == h for e in self.manifest.values()):
+                try:
+                    os.remove(self._text_path(h))
+                except OSError:
+                    pass
+        return bool(gone)
+    def content_key(self, docs: list[str], emb=None, metadatas: list[dict] | None = None) -> str:
+        h = hashlib.sha256()
+        ident = f"{type(emb).__name__}:{getattr(emb, 'model', '')}:{os.getenv('SILICONFLOW_BASE_URL', '')}"
+        h.update(ident.encode("utf-8"))
+        for d in docs:
+            b = d.encode("utf-8")
+            h.update(len(b).to_bytes(8, "little"))
+            h.update(b)
+        if metadatas:
+            h.update(json.dumps(metadatas, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        return h.hexdigest()[:32]
+    def build(self, docs: list[str], metadatas: list[dict] | None = None):
+        with self._build_lock:
+            self._build(docs, metadatas)
+    def _build(self, docs: list[str], metadatas: list[dict] | None = None):
+        docs = docs or []
+        if metadatas is not None and len(metadatas) != len(docs):
+            raise RuntimeError("metadatas 数量与文档数量不一致")
+        unchanged = self.bm25 is not None and docs == self.docs and metadatas == self.metadatas
+        if unchanged and self.vs is not None:
+            # 每个问题都会调用 build：文档未变且向量索引已就绪时，不再构造向量化对象、不再对全部文档计算内容哈希
+            return
+        if not unchanged:
+            self.bm25 = BM25Index(docs, metadatas=metadatas)
+        self.docs = docs
+        self.metadatas = metadatas
         if self._emb_cls and self._vs_cls and self.docs:
             try:
-                import os
-                base_url = os.getenv("SILICONFLOW_BASE_URL", None)
-                api_key = os.getenv("SILICONFLOW_API_KEY", None)
-                kwargs = {}
-                if base_url:
-                    kwargs["base_url"] = base_url
-                if api_key:
-                    kwargs["api_key"] = api_key
-                emb = self._emb_cls(**kwargs)
-                self.vs = self._vs_cls.from_texts(self.docs, emb)
+                emb = self._make_embeddings()
+                key = self.content_key(self.docs, emb, metadatas)
+                if key == self.key and self.vs is not None:
+                    return
+                path = os.path.join(self.index_dir, key)
+                vs = None
+                if os.path.isdir(path):
+                    try:
+                        vs = self._vs_cls.load_local(path, emb, allow_dangerous_deserialization=True)
+                        os.utime(path)
+                    except Exception:
+                        vs = None
+                if vs is None:
+                    vs = self._from_docs(emb, metadatas)
+                    self._save(vs, path)
+                self.vs = vs
+                self.key = key
             except Exception:
                 self.vs = None
+                self.key = None
+    def _from_docs(self, emb, metadatas: list[dict] | None):
+        # 远程向量化只对缓存中缺失的文本发起请求，再由已有向量直接建 FAISS 索引
+        if self._remote and hasattr(self._vs_cls, "from_embeddings"):
+            from embeddings import CachedEmbeddings, get_embedding_cache
+            if self._embed_cache is None:
+                self._embed_cache = get_embedding_cache()
+            if self._embed_cache is not None:
+                vectors = CachedEmbeddings(emb, self._embed_cache).embed_documents(self.docs)
+                return self._vs_cls.from_embeddings(list(zip(self.docs, vectors.tolist())), emb, metadatas=metadatas)
+        return self._vs_cls.from_texts(self.docs, emb, metadatas=metadatas)
+    def _make_embeddings(self):
+        if not self._remote:
+            return self._emb_cls()
+        base_url = os.getenv("SILICONFLOW_BASE_URL", None)
+        api_key = os.getenv("SILICONFLOW_API_KEY", None)
+        kwargs = {}
+        if base_url:
+            kwargs["base_url"] = base_url
+        if api_key:
+            kwargs["api_key"] = api_key
+        return self._emb_cls(**kwargs)
+    def _save(self, vs, path: str):
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            tmp = path + ".tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            vs.save_local(tmp)
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+            os.utime(path)
+        except Exception:
+            return
+        self._prune()
+    def _prune(self):
+        try:
+            entries = [os.path.join(self.index_dir, n) for n in os.listdir(self.index_dir) if not n.endswith(".tmp")]
+            entries = [e for e in entries if os.path.isdir(e)]
+            entries.sort(key=os.path.getmtime, reverse=True)
+            for e in entries[max(self.keep, 1):]:
+                shutil.rmtree(e, ignore_errors=True)
+        except Exception:
+            pass
 
 class RAGRetriever:
     def __init__(self):
@@ -110,21 +493,18 @@ class RAGRetriever:
     def set_index(self, index: RAGIndex):
         self.index = index
     def query(self, question: str, top_k: int = 5) -> list[str]:
+        return [h["text"] for h in self.search(question, top_k)]
+    def search(self, question: str, top_k: int = 5) -> list[dict]:
         if not self.index:
             return []
         if self.index.vs is not None:
             try:
                 docs = self.index.vs.similarity_search(question, k=top_k)
-                return [d.page_content for d in docs]
+                return [{"text": d.page_content, "metadata": dict(d.metadata or {})} for d in docs]
             except Exception:
                 pass
-        q = question.lower()
-        scored = []
-        for d in self.index.docs:
-            s = 0
-            for tok in q.split():
-                if tok and tok in d.lower():
-                    s += 1
-            scored.append((s, d))
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [d for s, d in scored[:top_k] if s > 0]
\ No newline at end of file
+        bm25 = self.index.bm25
+        if bm25 is None:
+            return []
+        metas = bm25.metadatas
+        return [{"text": bm25.docs[i], "metadata": dict(metas[i]) if metas else {}} for i, _ in bm25.search(question, top_k)]
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""
+查询结果缓存模块
+功能：按（DB URL、规范化 SQL、行数上限）缓存查询结果，按条目数与字节数做 LRU 淘汰；
+每条结果记录所读表的 information_schema.tables.UPDATE_TIME，读取时发现任一表的 UPDATE_TIME 变化即失效，
+另按表设置 TTL 兜底（UPDATE_TIME 为空或同一秒内多次写入时仍能过期）。各表 UPDATE_TIME 每个库每隔 check_interval 秒最多查询一次。
+含 RAND()/UUID()/NOW()/CURRENT_TIMESTAMP 等易变或取当前时间的函数的查询、以及不读任何表的查询（如 SELECT NOW()）不缓存；
+缓存键为保留字面量原文的规范化 SQL，字面量内空白不同的查询不会共用结果。
+配置：RESULT_CACHE（默认 1，0 关闭）、RESULT_CACHE_SIZE（条目数，默认 512）、RESULT_CACHE_MAX_MB（默认 64）、
+RESULT_CACHE_TTL（秒，默认 60）、RESULT_CACHE_TABLE_TTL（按表覆盖，如 "orders=10,dim_city=3600"）、RESULT_CACHE_CHECK_INTERVAL（秒，默认 2）
+方法：
+- ResultCache.get(db_url, sql, row_limit): 命中返回 (rows, headers, truncated)，否则 None
+- ResultCache.prepare(db_url, analysis): 执行查询前记录所读表的版本，不可缓存时返回 None
+- ResultCache.put(db_url, sql, row_limit, rows, headers, truncated, token): 写入结果
+- ResultCache.invalidate(db_url, tables) / clear() / stats()
+- get_result_cache(): 获取进程内共享的结果缓存（关闭时返回 None）
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from sql_analyzer import normalize_sql
+from db_pool import get_pool, connect_kwargs
+from result_set import ResultSet
+
+_VOLATILE = frozenset((
+    "rand", "uuid", "uuid_short", "sysdate", "connection_id", "last_insert_id", "found_rows", "row_count", "sleep", "get_lock",
+    "release_lock", "benchmark", "now", "curdate", "curtime", "current_timestamp", "current_date", "current_time", "localtime",
+    "localtimestamp", "utc_timestamp", "utc_date", "utc_time", "unix_timestamp",
+))
+
+def _row_bytes(row) -> int:
+    return 24 + sum(len(v) if isinstance(v, (str, bytes)) else 16 for v in row)
+
+class _Entry:
+    __slots__ = ("rows", "headers", "truncated", "tables", "versions", "expires", "size")
+    def __init__(self, rows, headers, truncated, tables, versions, expires, size):
+        self.rows = rows
+        self.headers = headers
+        self.truncated = truncated
+        self.tables = tables
+        self.versions = versions
+        self.expires = expires
+        self.size = size
+
+class ResultCache:
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None, ttl: float | None = None, check_interval: float | None = None, table_ttl: dict | None = None):
+        self.max_entries = max(1, int(max_entries or os.getenv("RESULT_CACHE_SIZE", "512")))
+        self.max_bytes = int(max_bytes or float(os.getenv("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024)
+        self.ttl = float(ttl if ttl is not None else os.getenv("RESULT_CACHE_TTL", "60"))
+        self.check_interval = float(check_interval if check_interval is not None else os.getenv("RESULT_CACHE_CHECK_INTERVAL", "2"))
+        self.table_ttl = table_ttl if table_ttl is not None else self._parse_table_ttl(os.getenv("RESULT_CACHE_TABLE_TTL", ""))
+        self._data: OrderedDict = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._versions: dict[str, tuple[float, dict]] = {}
+        self._version_locks: dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _parse_table_ttl(self, raw: str) -> dict:
+        out = {}
+        for part in raw.split(","):
+            if "=" in part:
+                t, v = part.split("=", 1)
+                try:
+                    out[t.strip().lower()] = float(v)
+                except ValueError:
+                    pass
+        return out
+
+    def _key(self, db_url: str, sql: str, row_limit: int | None):
+        return (db_url, normalize_sql(sql), row_limit)
+
+    def _table_versions(self, db_url: str, force: bool = False) -> dict | None:
+        now = time.monotonic()
+        cached = self._versions.get(db_url)
+        if cached and not force and now - cached[0] < self.check_interval:
+            return cached[1]
+        lock = self._version_locks.setdefault(db_url, threading.Lock())
+        with lock:
+            cached = self._versions.get(db_url)
+            if cached and not force and time.monotonic() - cached[0] < self.check_interval:
+                return cached[1]
+            try:
+                db = connect_kwargs(db_url)["database"]
+                with get_pool(db_url).connection() as conn:
+                    cur = conn.cursor()
+                    try:
+                        # MySQL 8 默认缓存 information_schema 统计信息，需关闭才能看到最新的 UPDATE_TIME
+                        cur.execute("SET SESSION information_schema_stats_expiry = 0")
+                    except Exception:
+                        pass
+                    cur.execute("SELECT table_name, update_time FROM information_schema.tables WHERE table_schema=%s", (db,))
+                    versions = {str(t).lower(): (str(u) if u is not None else None) for t, u in cur.fetchall()}
+                    cur.close()
+            except Exception:
+                return None
+            self._versions[db_url] = (time.monotonic(), versions)
+            return versions
+
+    def get(self, db_url: str, sql: str, row_limit: int | None = None):
+        key = self._key(db_url, sql, row_limit)
+        with self._lock:
+            e = self._data.get(key)
+        if e is not None and time.monotonic() >= e.expires:
+            self._drop(key, e)
+            e = None
+        if e is not None and e.tables:
+            versions = self._table_versions(db_url)
+            if versions is None or any(versions.get(t) != e.versions.get(t) for t in e.tables):
+                self._drop(key, e)
+                e = None
+        with self._lock:
+            if e is None:
+                self.misses += 1
+                return None
+            if key in self._data:
+                self._data.move_to_end(key)
+            self.hits += 1
+            return e.rows, e.headers, e.truncated
+
+    def prepare(self, db_url: str, analysis) -> tuple | None:
+        # CURRENT_TIMESTAMP 等不带括号时被解析为列名，需同时检查列
+        if analysis.error or analysis.functions & _VOLATILE or not _VOLATILE.isdisjoint(c.lower() for c in analysis.columns):
+            return None
+        tables = tuple(dict.fromkeys(t.lower() for t in analysis.tables))
+        if not tables:
+            # 不读表的查询（SELECT NOW()、SELECT @@hostname 等）没有可跟踪的版本，执行代价也低，不缓存
+            return None
+        current = self._table_versions(db_url)
+        if current is None:
+            return None
+        versions = {t: current.get(t) for t in tables}
+        ttl = min(self.table_ttl.get(t, self.ttl) for t in tables)
+        if ttl <= 0:
+            return None
+        return tables, versions, ttl
+
+    def put(self, db_url: str, sql: str, row_limit: int | None, rows: list, headers: list, truncated: bool, token: tuple | None):
+        if token is None:
+            return
+        tables, versions, ttl = token
+        size = 64 + (rows.nbytes() if isinstance(rows, ResultSet) else sum(_row_bytes(r) for r in rows)) + sum(len(str(h)) for h in headers)
+        if size > self.max_bytes // 4:
+            return
+        key = self._key(db_url, sql, row_limit)
+        e = _Entry(rows, headers, truncated, tables, versions, time.monotonic() + ttl, size)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._data[key] = e
+            self._bytes += size
+            while self._data and (len(self._data) > self.max_entries or self._bytes > self.max_bytes):
+                _, ev = self._data.popitem(last=False)
+                self._bytes -= ev.size
+                self.evictions += 1
+
+    def _drop(self, key, e: _Entry):
+        with self._lock:
+            if self._data.get(key) is e:
+                del self._data[key]
+                self._bytes -= e.size
+                self.invalidations += 1
+
+    def invalidate(self, db_url: str | None = None, tables: list[str] | None = None):
+        wanted = {t.lower() for t in tables} if tables else None
+        with self._lock:
+            for key in [k for k, e in self._data.items() if (db_url is None or k[0] == db_url) and (wanted is None or wanted & set(e.tables))]:
+                self._bytes -= self._data.pop(key).size
+                self.invalidations += 1
+            if db_url is None:
+                self._versions.clear()
+            else:
+                self._versions.pop(db_url, None)
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"entries": len(self._data), "bytes": self._bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions, "invalidations": self.invalidations, "hit_ratio": (self.hits / total) if total else 0.0}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_result_cache() -> ResultCache | None:
+    global _cache
+    if os.getenv("RESULT_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -0,0 +1,125 @@
+"""
+查询结果模块
+功能：ResultSet 以列存储一次查询的结果（每列一个 list），由 DbExecutor 逐批构建，结果缓存、OutputFormatter 与 API 直接使用同一对象，
+不再在各层之间反复转成行列表或逐格构造字典；按行迭代时得到元组。
+dumps 基于 orjson 序列化，ResultSet 输出为行数组，Decimal/日期/bytes 等数据库类型按 FastAPI 默认编码规则转换；
+超出 64 位整数范围的整数值 Decimal（如 DECIMAL(30,0)、大额 SUM()）orjson 无法编码，输出为字符串。
+浮点数按 orjson 的写法输出（1e16、0.000025，json.dumps 为 1e+16、2.5e-05），NaN/Infinity 输出为 null。
+方法：
+- ResultSet.from_rows(rows, headers, truncated): 由行（元组或按列名取值的映射）构建
+- ResultSet.from_batches(batches, headers, truncated): 由分批读取的行构建，每批按列转置后追加
+- ResultSet.column(name) / records() / nbytes(): 取单列、按行产出字典、估算内存占用
+- dumps(obj, indent): 返回 UTF-8 JSON 字节；indent 为 True 时缩进 2 格
+"""
+import datetime
+from decimal import Decimal
+from collections.abc import Mapping
+
+import orjson
+
+class ResultSet:
+    __slots__ = ("headers", "columns", "truncated", "_len")
+
+    def __init__(self, headers: list, columns: list[list] | None = None, truncated: bool = False):
+        self.headers = list(headers)
+        self.columns = columns if columns is not None else [[] for _ in self.headers]
+        if len(self.columns) != len(self.headers):
+            raise ValueError("列数与表头数量不一致")
+        self.truncated = truncated
+        self._len = len(self.columns[0]) if self.columns else 0
+
+    @classmethod
+    def from_rows(cls, rows, headers: list, truncated: bool = False) -> "ResultSet":
+        if isinstance(rows, ResultSet):
+            return rows
+        rows = rows if isinstance(rows, list) else list(rows)
+        headers = list(headers)
+        if rows and isinstance(rows[0], Mapping):
+            return cls(headers, [[r[h] for r in rows] for h in headers], truncated)
+        rs = cls(headers, None, truncated)
+        rs._extend(rows)
+        return rs
+
+    @classmethod
+    def from_batches(cls, batches, headers: list, truncated: bool = False) -> "ResultSet":
+        rs = cls(headers, None, truncated)
+        for batch in batches:
+            rs._extend(batch)
+        return rs
+
+    def _extend(self, rows: list):
+        if not rows:
+            return
+        if self.columns:
+            for col, values in zip(self.columns, zip(*rows)):
+                col.extend(values)
+        self._len += len(rows)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self):
+        if not self.columns:
+            return iter(() for _ in range(self._len))
+        return zip(*self.columns)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ResultSet(self.headers, [c[i] for c in self.columns], self.truncated)
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("行号超出范围")
+        return tuple(c[i] for c in self.columns)
+
+    def __eq__(self, other):
+        if isinstance(other, ResultSet):
+            return self.headers == other.headers and self.columns == other.columns and self._len == other._len
+        if isinstance(other, (list, tuple)):
+            return len(other) == self._len and all(tuple(a) == b for a, b in zip(other, self))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"ResultSet(headers={self.headers!r}, rows={self._len}, truncated={self.truncated})"
+
+    def column(self, name: str) -> list:
+        return self.columns[self.headers.index(name)]
+
+    def records(self):
+        headers = self.headers
+        for row in self:
+            yield dict(zip(headers, row))
+
+    def nbytes(self) -> int:
+        # 与结果缓存原按行估算的口径一致：每行 24 字节，字符串/字节按长度，其余值按 16 字节
+        size = 24 * self._len
+        for col in self.columns:
+            for v in col:
+                size += len(v) if isinstance(v, (str, bytes)) else 16
+        return size
+
+# orjson 可编码的整数范围（有符号 64 位下限至无符号 64 位上限）
+_INT_MIN = -(1 << 63)
+_UINT_MAX = (1 << 64) - 1
+
+def _default(o):
+    if isinstance(o, ResultSet):
+        return list(o)
+    if isinstance(o, Decimal):
+        if o.is_finite() and o.as_tuple().exponent >= 0:
+            n = int(o)
+            return n if _INT_MIN <= n <= _UINT_MAX else str(n)
+        return float(o)
+    if isinstance(o, datetime.timedelta):
+        return o.total_seconds()
+    if isinstance(o, (bytes, bytearray, memoryview)):
+        return bytes(o).decode("utf-8", errors="replace")
+    if isinstance(o, (set, frozenset)):
+        return list(o)
+    raise TypeError(f"无法序列化的类型：{type(o).__name__}")
+
+def dumps(obj, indent: bool = False) -> bytes:
+    option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+    return orjson.dumps(obj, default=_default, option=option)
@@ -0,0 +1,127 @@
+"""
+Schema 关联模块
+功能：按问题为表打分，只把最相关的 top-K 张表及与其关联的表发送给模型，替代按字符截断整份 Schema。
+打分：表名/列名与问题词项匹配（英文按下划线、驼峰拆分并做简单单复数归一，中文按双字切分，词项按 IDF 加权），
+再叠加 RAG 检索命中的 "table X: ..." 文档；关联表由 `<表名>_id` 形式的列推断。
+词项倒排索引按 Schema 指纹缓存，表数量上千时单次打分只与问题词项的倒排长度相关。
+配置：SCHEMA_TOP_K（默认 8）、SCHEMA_MAX_CHARS（发送给模型的 Schema 字符上限，默认 8000）
+方法：
+- SchemaLinker.prune(question, schema, context_docs): 返回裁剪后的 {tables, docs, fingerprint}；表数不超过 top-K 时原样返回
+- SchemaLinker.score(question, schema, context_docs): 返回按分数降序的 [(表名, 分数)]
+"""
+import os
+import re
+import math
+import threading
+from rag import tokenize
+
+_CAMEL = re.compile(r"([a-z0-9])([A-Z])")
+
+def _terms(text: str) -> list[str]:
+    out = []
+    # 中文双字切分与 RAG 检索共用 rag.tokenize，英文词保留大小写以便按驼峰拆分
+    for w in tokenize(text, lower=False):
+        if "一" <= w[0] <= "鿿":
+            out.append(w)
+            continue
+        low = w.lower()
+        parts = [p for p in _CAMEL.sub(r"\1_\2", w).lower().split("_") if p]
+        for p in [low] + (parts if len(parts) > 1 else []):
+            out.append(p)
+            if len(p) > 3 and p.endswith("s") and not p.endswith("ss"):
+                out.append(p[:-1])
+    return out
+
+class _LinkIndex:
+    def __init__(self, tables: dict):
+        self.tables = tables
+        self.postings: dict[str, dict[str, float]] = {}
+        for t, cols in tables.items():
+            for term in set(_terms(t)):
+                self._add(term, t, 3.0)
+            for c in cols:
+                for term in set(_terms(c)):
+                    self._add(term, t, 1.0)
+        n = max(1, len(tables))
+        self.idf = {term: math.log(1 + n / len(p)) for term, p in self.postings.items()}
+        # 外键推断：列名形如 <表名>_id / <表名单数>_id
+        names = {}
+        for t in tables:
+            low = t.lower()
+            names[low] = t
+            if len(low) > 3 and low.endswith("s"):
+                names.setdefault(low[:-1], t)
+        self.links: dict[str, set] = {t: set() for t in tables}
+        for t, cols in tables.items():
+            for c in cols:
+                cl = str(c).lower()
+                if cl.endswith("_id") and cl[:-3] in names:
+                    ref = names[cl[:-3]]
+                    if ref != t:
+                        self.links[t].add(ref)
+                        self.links[ref].add(t)
+
+    def _add(self, term: str, table: str, weight: float):
+        p = self.postings.setdefault(term, {})
+        if weight > p.get(table, 0.0):
+            p[table] = weight
+
+class SchemaLinker:
+    def __init__(self, top_k: int | None = None, max_chars: int | None = None):
+        self.top_k = int(top_k or os.getenv("SCHEMA_TOP_K", "8"))
+        self.max_chars = int(max_chars or os.getenv("SCHEMA_MAX_CHARS", "8000"))
+        self._indexes: dict[str, _LinkIndex] = {}
+        self._lock = threading.Lock()
+
+    def _index(self, schema: dict) -> _LinkIndex:
+        tables = schema.get("tables") or {}
+        fp = schema.get("fingerprint")
+        if not fp:
+            return _LinkIndex(tables)
+        with self._lock:
+            idx = self._indexes.get(fp)
+            if idx is None:
+                if len(self._indexes) >= 4:
+                    self._indexes.pop(next(iter(self._indexes)))
+                idx = _LinkIndex(tables)
+                self._indexes[fp] = idx
+            return idx
+
+    def score(self, question: str, schema: dict, context_docs: list[str] | None = None) -> list[tuple[str, float]]:
+        idx = self._index(schema)
+        scores: dict[str, float] = {}
+        for term in set(_terms(question)):
+            for t, w in idx.postings.get(term, {}).items():
+                scores[t] = scores.get(t, 0.0) + w * idx.idf[term]
+        for rank, d in enumerate(context_docs or []):
+            m = re.match(r"table\s+([^:\s]+)\s*:", d)
+            if m and m.group(1) in idx.tables:
+                scores[m.group(1)] = scores.get(m.group(1), 0.0) + 2.0 / (rank + 1)
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+    def prune(self, question: str, schema: dict, context_docs: list[str] | None = None) -> dict:
+        tables = schema.get("tables") or {}
+        if len(tables) <= self.top_k:
+            return schema
+        idx = self._index(schema)
+        ranked = [t for t, s in self.score(question, schema, context_docs) if s > 0][: self.top_k]
+        if not ranked:
+            ranked = list(tables)[: self.top_k]
+        picked = list(ranked)
+        seen = set(picked)
+        for t in ranked:
+            for ref in sorted(idx.links.get(t, ())):
+                if ref not in seen:
+                    seen.add(ref)
+                    picked.append(ref)
+        out_tables = {}
+        docs = []
+        size = 0
+        for t in picked:
+            doc = f"table {t}: " + ", ".join(tables[t])
+            if docs and size + len(doc) > self.max_chars:
+                break
+            out_tables[t] = tables[t]
+            docs.append(doc)
+            size += len(doc) + 1
+        return {"tables": out_tables, "docs": docs, "fingerprint": schema.get("fingerprint")}
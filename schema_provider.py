@@ -1,8 +1,11 @@
 """
 Schema 提供模块
 功能：读取数据库结构并生成检索文档，支持 MySQL/SQL Server；导入 JSON 数据并校验；输出 db_info JSON。
+连接取自共享连接池；按 DB URL 缓存结构快照：TTL 内直接复用，过期后先用 information_schema 指纹判断是否变化，仅在变化时全量重载。
 方法：
-- load(db_url, dialect): 加载并返回 {tables, docs}
+- load(db_url, dialect, force): 加载并返回 {tables, docs, fingerprint}
+- invalidate(db_url): 清除结构缓存
+- _fingerprint(cur, db): 计算结构指纹
 - import_json(file_path, db_url, dialect): 导入 JSON 到数据库
 - _write_db_info(db_url, schema): 写入 db_info 文件
 - _ensure_mysql_table(cur, table_name, columns): 创建表
@@ -13,36 +16,66 @@ import os
 from urllib.parse import urlparse
 import json
 import re
+import threading
+import time
+import hashlib
+from db_pool import get_pool
 
 class SchemaProvider:
-    def load(self, db_url: str, dialect: str) -> dict:
+    def __init__(self, ttl: float | None = None):
+        self.ttl = float(ttl if ttl is not None else os.getenv("SCHEMA_CACHE_TTL", "30"))
+        self._cache: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db_url: str, dialect: str, force: bool = False) -> dict:
         if db_url.startswith("mysql://"):
-            parsed = urlparse(db_url)
-            host = parsed.hostname or "localhost"
-            port = parsed.port or 3306
-            user = parsed.username or "root"
-            password = parsed.password or ""
-            db = (parsed.path or "/").lstrip("/")
-            try:
-                import pymysql
-            except Exception as e:
-                raise RuntimeError("MySQL schema introspection requires 'pymysql' to be installed") from e
-            conn = pymysql.connect(host=host, port=port, user=user, password=password, database=db, charset="utf8mb4")
-            cur = conn.cursor()
-            cur.execute("SELECT table_name, column_name FROM information_schema.columns WHERE table_schema=%s ORDER BY table_name, ordinal_position", (db,))
-            tables = {}
-            docs = []
-            for t, c in cur.fetchall():
-                tables.setdefault(t, []).append(c)
-            for t, cols in tables.items():
-                docs.append(f"table {t}: " + ", ".join(cols))
-            conn.close()
-            try:
-                self._write_db_info(db_url, {"tables": tables, "docs": docs})
-            except Exception:
-                pass
-            return {"tables": tables, "docs": docs}
+            with self._lock:
+                entry = self._cache.get(db_url)
+                now = time.monotonic()
+                if entry and not force and now - entry["checked_at"] < self.ttl:
+                    return entry["schema"]
+                db = (urlparse(db_url).path or "/").lstrip("/")
+                with get_pool(db_url).connection() as conn:
+                    cur = conn.cursor()
+                    fp = self._fingerprint(cur, db)
+                    if entry and not force and entry["schema"].get("fingerprint") == fp:
+                        entry["checked_at"] = now
+                        return entry["schema"]
+                    cur.execute("SELECT table_name, column_name FROM information_schema.columns WHERE table_schema=%s ORDER BY table_name, ordinal_position", (db,))
+                    tables = {}
+                    docs = []
+                    for t, c in cur.fetchall():
+                        tables.setdefault(t, []).append(c)
+                    for t, cols in tables.items():
+                        docs.append(f"table {t}: " + ", ".join(cols))
+                schema = {"tables": tables, "docs": docs, "fingerprint": fp}
+                try:
+                    self._write_db_info(db_url, schema)
+                except Exception:
+                    pass
+                self._cache[db_url] = {"schema": schema, "checked_at": now}
+                return schema
         raise RuntimeError("Unsupported DB_URL. Please use mysql://...")
+
+    def invalidate(self, db_url: str | None = None):
+        with self._lock:
+            if db_url is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(db_url, None)
+
+    def _fingerprint(self, cur, db: str) -> str:
+        # 表数量、最近建表时间、列数量与列名校验和；数据写入不会改变指纹
+        cur.execute(
+            "SELECT (SELECT COUNT(*) FROM information_schema.tables WHERE table_schema=%s), "
+            "(SELECT MAX(create_time) FROM information_schema.tables WHERE table_schema=%s), "
+            "COUNT(*), COALESCE(SUM(CRC32(CONCAT(table_name, '.', column_name))), 0) "
+            "FROM information_schema.columns WHERE table_schema=%s",
+            (db, db, db),
+        )
+        rows = cur.fetchall()
+        raw = "|".join(str(x) for x in (rows[0] if rows else ()))
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
     
     def import_json(self, file_path: str, db_url: str, dialect: str) -> dict:
         raise NotImplementedError("import_json feature is temporarily disabled")
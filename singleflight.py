@@ -0,0 +1,73 @@
+"""
+请求合并模块
+功能：同一键的并发调用只执行一次，其余调用方等待并共享同一结果（或同一异常），执行结束即移除，不做结果缓存。
+方法：
+- SingleFlight.do(key, fn): 线程版，返回 fn() 的结果
+- AsyncSingleFlight.do(key, factory): 协程版，factory() 返回协程；共享任务以 shield 等待，单个调用方被取消不会中断其他调用方
+- stats(): 返回 {"calls", "shared"}
+"""
+import asyncio
+import threading
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    def __init__(self):
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.calls += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared}
+
+class AsyncSingleFlight:
+    def __init__(self):
+        self._tasks: dict = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key, factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            self.calls += 1
+            task.add_done_callback(lambda t, k=key: self._tasks.pop(k, None) if self._tasks.get(k) is t else None)
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "shared": self.shared}
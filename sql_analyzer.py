@@ -0,0 +1,297 @@
+"""
+SQL 分析模块
+功能：对 SQL 做一次词法扫描，得到安全结论、语句类型、涉及的表、列与函数以及最外层 LIMIT；
+字符串、引号标识符与注释整体作为一个词元，`updated_at` 之类的列名不会被误判为写操作，子查询里的 LIMIT 也不会被当作外层 LIMIT。
+MySQL 可执行注释（/*! ... */）与除 MAX_EXECUTION_TIME 外的优化器提示（/*+ ... */）会被服务器执行，一律拒绝。
+分析结果按原始 SQL 文本缓存（SQL_ANALYSIS_CACHE_SIZE，默认 2048），护栏、元数据与结果缓存共用同一次解析；
+body 始终取自调用方传入的 SQL，不会被空白不同的另一条 SQL 的缓存条目替换。
+方法：
+- analyze(sql): 返回 SqlAnalysis（error 为 None 表示安全的只读单语句）
+- with_limit(analysis, limit): 返回追加 LIMIT 后的 SQL 及其分析结果（同时写入缓存）
+- normalize_sql(sql): 返回用作缓存键的规范化 SQL（只折叠词元间空白，字符串、引号标识符与注释原样保留）
+- main_select_end(sql): 返回顶层 SELECT 关键字（含 WITH 子句之后的主查询）的结束位置，用于注入优化器提示；找不到时返回 None
+"""
+import os
+import re
+from cache import LRUCache
+
+_TOKEN = re.compile(
+    r"""
+    (?P<ws>\s+)
+    |(?P<comment>--[^\n]*|\#[^\n]*|/\*.*?(?:\*/|\Z))
+    |(?P<str>'(?:[^'\\]|\\.|'')*(?:'|\Z)|"(?:[^"\\]|\\.|"")*(?:"|\Z))
+    |(?P<qid>`(?:[^`]|``)*(?:`|\Z))
+    |(?P<num>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+)
+    |(?P<word>[A-Za-z_\u0080-￿][A-Za-z0-9_$\u0080-￿]*)
+    |(?P<punct>[(),;.*])
+    |(?P<op>[^\sA-Za-z0-9_(),;.*'"`]+)
+    """,
+    re.S | re.X,
+)
+
+# 只读 SELECT 中出现即视为写入或加锁的关键字（INTO OUTFILE、FOR UPDATE、LOCK IN SHARE MODE、WITH ... DELETE 等）
+_WRITE = frozenset(("insert", "update", "delete", "drop", "alter", "truncate", "create", "replace", "rename", "grant", "revoke", "call", "lock", "unlock", "set", "into", "outfile", "dumpfile"))
+
+_KEYWORDS = frozenset((
+    "select", "from", "where", "group", "by", "order", "having", "limit", "offset", "join", "inner", "left", "right", "full",
+    "outer", "cross", "natural", "straight_join", "on", "using", "as", "and", "or", "not", "xor", "in", "is", "null", "like",
+    "rlike", "regexp", "between", "exists", "case", "when", "then", "else", "end", "distinct", "all", "any", "some", "union",
+    "intersect", "except", "with", "recursive", "asc", "desc", "true", "false", "interval", "over", "partition", "window",
+    "rows", "range", "preceding", "following", "current", "row", "unbounded", "explain", "div", "mod", "escape", "binary",
+    "collate", "rollup", "lateral", "for", "share", "of", "nowait", "skip", "locked", "high_priority", "sql_no_cache",
+    "sql_calc_found_rows", "sql_small_result", "sql_big_result", "sql_buffer_result", "distinctrow", "date", "time",
+    "timestamp", "year", "month", "day", "hour", "minute", "second", "week", "quarter", "microsecond", "unsigned", "signed",
+    "char", "decimal", "separator", "value", "values", "format", "analyze", "dual", "ignore", "force", "index", "key", "use",
+    "leading", "trailing", "both",
+)) | _WRITE
+
+_TABLE_START = frozenset(("from", "join", "straight_join"))
+_CLAUSE_END = frozenset(("where", "group", "order", "having", "limit", "on", "using", "union", "window", "for", "lock", "join",
+                         "inner", "left", "right", "full", "cross", "natural", "straight_join", "into", "except", "intersect"))
+
+# 由本项目注入的语句级超时提示（db_executor._apply_time_limit）
+_ALLOWED_HINT = re.compile(r"/\*\+\s*MAX_EXECUTION_TIME\(\d+\)\s*\*/\Z", re.I)
+
+def normalize_sql(sql: str) -> str:
+    return " ".join(m.group() for m in _TOKEN.finditer(sql or "") if m.lastgroup != "ws")
+
+def main_select_end(sql: str) -> int | None:
+    depth = 0
+    first = True
+    for m in _TOKEN.finditer(sql or ""):
+        kind = m.lastgroup
+        if kind in ("ws", "comment"):
+            continue
+        t = m.group()
+        if first:
+            first = False
+            w = t.lower()
+            if w == "select":
+                return m.end()
+            if w != "with":
+                return None
+        elif t == "(":
+            depth += 1
+        elif t == ")":
+            depth -= 1
+        elif depth == 0 and kind == "word" and t.lower() == "select":
+            return m.end()
+    return None
+
+def _ident(tok) -> str:
+    kind, text = tok
+    if kind == "qid":
+        return text[1:-1].replace("``", "`")
+    if kind == "str" and text[:1] == '"':
+        return text[1:-1]
+    return text
+
+class SqlAnalysis:
+    __slots__ = ("sql", "body", "statement", "error", "tables", "columns", "functions", "limit", "ctes")
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.body = sql.strip()
+        self.statement = ""
+        self.error = None
+        self.tables: tuple = ()
+        self.columns: tuple = ()
+        self.functions: frozenset = frozenset()
+        self.limit = None
+        self.ctes: tuple = ()
+
+    @property
+    def safe(self) -> bool:
+        return self.error is None
+
+def _parse(sql: str) -> SqlAnalysis:
+    a = SqlAnalysis(sql)
+    toks = []
+    end = 0
+    executable = False
+    for m in _TOKEN.finditer(sql):
+        kind = m.lastgroup
+        if kind == "comment":
+            text = m.group()
+            if text.startswith(("/*!", "/*M!")) or (text.startswith("/*+") and not _ALLOWED_HINT.match(text)):
+                executable = True
+            continue
+        if kind == "ws":
+            continue
+        toks.append((kind, m.group()))
+        if m.group() != ";":
+            end = m.end()
+    a.body = sql[:end].strip()
+    lw = [t.lower() if k == "word" else None for k, t in toks]
+
+    writes = False
+    multi = False
+    seen_semicolon = False
+    for i, (k, t) in enumerate(toks):
+        if seen_semicolon:
+            multi = True
+        if k == "punct" and t == ";":
+            seen_semicolon = True
+        elif k == "word" and lw[i] in _WRITE and not (i > 0 and toks[i - 1][1] == "."):
+            # 函数名与 `t.update` 这类限定列名不算写关键字
+            if not (i + 1 < len(toks) and toks[i + 1][1] == "(" and lw[i] in ("replace", "insert")):
+                writes = True
+
+    words = [w for w in lw if w]
+    first = words[0] if words else ""
+    if first == "explain":
+        a.statement = "explain"
+        inner = words[1] if len(words) > 1 else ""
+        is_select = inner in ("select", "with")
+    else:
+        a.statement = first
+        is_select = first in ("select", "with")
+    if writes or executable:
+        a.error = "unsafe sql"
+    elif multi:
+        a.error = "multi statements not allowed"
+    elif not is_select:
+        a.error = "only select allowed"
+
+    tables: list[str] = []
+    aliases: set = set()
+    ctes: list[str] = []
+    columns: list[str] = []
+    functions: set = set()
+    n = len(toks)
+
+    def _is_name(j: int) -> bool:
+        return j < n and (toks[j][0] == "qid" or (toks[j][0] == "word" and lw[j] not in _KEYWORDS))
+
+    def _cte_header(j: int) -> int:
+        # name [(col, ...)] AS ，返回主体左括号的位置
+        if not _is_name(j):
+            return j
+        ctes.append(_ident(toks[j]))
+        j += 1
+        if j < n and toks[j][1] == "(":
+            while j < n and toks[j][1] != ")":
+                j += 1
+            j += 1
+        if j < n and lw[j] == "as":
+            j += 1
+        return j
+
+    def _alias(j: int) -> int:
+        if j < n and lw[j] == "as":
+            j += 1
+        if _is_name(j):
+            aliases.add(_ident(toks[j]).lower())
+            j += 1
+        return j
+
+    stack: list[str] = []
+    mode = None
+    expect_table = False
+    pending_cte = False
+    i = 0
+    while i < n:
+        k, t = toks[i]
+        w = lw[i]
+        if t == "(":
+            stack.append("cte" if pending_cte else "from" if expect_table else "plain")
+            pending_cte = False
+            expect_table = False
+            i += 1
+            continue
+        if t == ")":
+            kind = stack.pop() if stack else "plain"
+            i += 1
+            if kind == "from":
+                i = _alias(i)
+                if mode == "from" and i < n and toks[i][1] == ",":
+                    expect_table = True
+                    i += 1
+            elif kind == "cte" and i < n and toks[i][1] == ",":
+                i = _cte_header(i + 1)
+                pending_cte = True
+            continue
+        if w == "with":
+            j = i + 1
+            if j < n and lw[j] == "recursive":
+                j += 1
+            i = _cte_header(j)
+            pending_cte = True
+            continue
+        if w in _TABLE_START and not (stack and stack[-1] == "func"):
+            mode = "from" if w == "from" else "join"
+            expect_table = True
+            i += 1
+            continue
+        if expect_table and _is_name(i):
+            name = _ident(toks[i])
+            j = i + 1
+            while j + 1 < n and toks[j][1] == "." and toks[j + 1][0] in ("word", "qid"):
+                name = _ident(toks[j + 1])
+                j += 2
+            tables.append(name)
+            expect_table = False
+            j = _alias(j)
+            if mode == "from" and j < n and toks[j][1] == ",":
+                expect_table = True
+                j += 1
+            i = j
+            continue
+        expect_table = False
+        if w in _CLAUSE_END:
+            mode = None
+        if w == "limit" and not stack:
+            nums = []
+            j = i + 1
+            while j < n and len(nums) < 2 and (toks[j][0] == "num" or toks[j][1] == ","):
+                if toks[j][0] == "num":
+                    nums.append(int(float(toks[j][1])))
+                j += 1
+            if nums:
+                a.limit = nums[-1]
+            i = j
+            continue
+        if _is_name(i):
+            nxt = toks[i + 1][1] if i + 1 < n else ""
+            if nxt == "(" and k == "word":
+                # 函数参数里的 FROM（EXTRACT(YEAR FROM d)、TRIM(LEADING 0 FROM c)、SUBSTRING(s FROM 2)）不是表的开始
+                functions.add(w)
+                stack.append("func")
+                i += 2
+                continue
+            if nxt == ".":
+                i += 1
+                continue
+            # 紧跟在表达式之后的名字是别名：`sum(x) total`、`col AS c`、`CASE ... END flag`
+            if i > 0 and (lw[i - 1] in ("as", "end") or toks[i - 1][1] == ")" or toks[i - 1][0] in ("num", "str", "qid") or _is_name(i - 1)):
+                aliases.add(_ident(toks[i]).lower())
+                i += 1
+                continue
+            columns.append(_ident(toks[i]))
+        i += 1
+
+    cte_set = {c.lower() for c in ctes}
+    a.functions = frozenset(functions)
+    a.ctes = tuple(dict.fromkeys(ctes))
+    a.tables = tuple(dict.fromkeys(t for t in tables if t.lower() not in cte_set))
+    skip = aliases | cte_set | {t.lower() for t in tables}
+    a.columns = tuple(dict.fromkeys(c for c in columns if c.lower() not in skip))
+    return a
+
+_cache = LRUCache(int(os.getenv("SQL_ANALYSIS_CACHE_SIZE", "2048")))
+
+def analyze(sql: str) -> SqlAnalysis:
+    # 以原文为键：规范化会让字面量内空白不同的 SQL 共用条目，body 便不再是调用方的 SQL
+    a = _cache.get(sql)
+    if a is None:
+        a = _parse(sql)
+        _cache.set(sql, a)
+    return a
+
+def with_limit(a: SqlAnalysis, limit: int) -> tuple[str, SqlAnalysis]:
+    sql = f"{a.body} LIMIT {int(limit)}"
+    b = SqlAnalysis(sql)
+    b.statement, b.error, b.tables, b.columns, b.functions, b.ctes = a.statement, a.error, a.tables, a.columns, a.functions, a.ctes
+    b.limit = int(limit)
+    _cache.set(sql, b)
+    return sql, b
@@ -1,24 +1,23 @@
 """
 SQL 护栏模块
-功能：约束查询为只读单语句并追加默认 LIMIT。
+功能：约束查询为只读单语句并追加默认 LIMIT；判定基于 sql_analyzer 的词法分析（按规范化 SQL 缓存），
+列名中含 update 之类的子串不再误拒，最外层没有 LIMIT 时才追加（子查询中的 LIMIT 不算）。
 方法：
 - validate(sql, dialect): 返回安全的查询或抛出异常
+- analyze(sql): 返回 SqlAnalysis（语句类型、表、列、外层 LIMIT、安全结论）
 """
+from sql_analyzer import analyze, with_limit
+
 class SqlGuard:
+    def analyze(self, sql: str):
+        return analyze(sql)
     def validate(self, sql: str, dialect: str) -> str:
-        s = sql.strip()
-        l = s.lower()
-        forbidden = ["delete", "update", "insert", "drop", "alter", "truncate"]
-        for k in forbidden:
-            if k in l:
-                raise ValueError("unsafe sql")
-        if ";" in s:
-            raise ValueError("multi statements not allowed")
-        if not l.startswith("select") and not l.startswith("explain select"):
-            raise ValueError("only select allowed")
-        if "limit" not in l:
-            s = s + " LIMIT 100"
-        return s
+        a = analyze(sql)
+        if a.error:
+            raise ValueError(a.error)
+        if a.limit is None:
+            return with_limit(a, 100)[0]
+        return a.body
     def check_semantics(self, question: str, schema: dict, sql: str) -> str:
         q = (question or "").lower()
         doc = "\n".join(schema.get("docs", []))
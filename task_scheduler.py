@@ -0,0 +1,119 @@
+"""
+任务调度模块
+功能：上传任务进入优先级队列，由固定数量的工作线程执行（TASK_WORKERS，默认 2），同时运行的批量任务数有上限；
+任务状态与逐条进度写入持久化任务表（store），进程重启后未完成的任务按原参数重新入队。
+方法：
+- TaskScheduler.register(task_type, handler): 注册任务处理函数 handler(payload, progress, cancel)，
+  progress(done, total) 上报逐条进度，cancel 为 threading.Event；返回的字典（如 result_url）在完成时写入任务表
+- TaskScheduler.submit(task_id, task_type, payload, priority): 创建任务并入队，priority 越大越先执行，同优先级先进先出
+- TaskScheduler.cancel(task_id): 排队中的任务直接取消；运行中的任务置取消事件，由 handler 在处理下一条前停止
+- TaskScheduler.recover(): 重新入队上次进程退出时未完成的任务
+- TaskScheduler.shutdown(wait): 停止工作线程
+"""
+import os
+import queue
+import itertools
+import threading
+
+class TaskScheduler:
+    def __init__(self, store, workers: int | None = None):
+        self.store = store
+        self.workers = max(1, int(workers or os.getenv("TASK_WORKERS", "2")))
+        self._handlers: dict = {}
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._pending: dict[str, tuple] = {}
+        self._running: dict[str, threading.Event] = {}
+        self._threads: list[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def register(self, task_type: str, handler):
+        self._handlers[task_type] = handler
+
+    def _start(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                t = threading.Thread(target=self._worker, name=f"task-worker-{len(self._threads)}", daemon=True)
+                self._threads.append(t)
+                t.start()
+
+    def _enqueue(self, task_id: str, task_type: str, payload: dict, priority: int):
+        with self._lock:
+            self._pending[task_id] = (task_type, payload)
+        self._queue.put((-int(priority), next(self._seq), task_id))
+        self._start()
+
+    def submit(self, task_id: str, task_type: str, payload: dict | None = None, priority: int = 0) -> dict:
+        if task_type not in self._handlers:
+            raise ValueError(f"未知任务类型：{task_type}")
+        self.store.create(task_id, task_type, payload or {}, priority)
+        self._enqueue(task_id, task_type, payload or {}, priority)
+        return self.store.get(task_id)
+
+    def cancel(self, task_id: str) -> bool:
+        with self._lock:
+            queued = self._pending.pop(task_id, None)
+            running = self._running.get(task_id)
+        if queued is not None:
+            self.store.update(task_id, status="cancelled")
+            return True
+        if running is not None:
+            running.set()
+            return True
+        return False
+
+    def recover(self) -> int:
+        n = 0
+        for t in self.store.unfinished():
+            if t["task_type"] not in self._handlers:
+                self.store.update(t["task_id"], status="failed", error="服务重启后无法恢复")
+                continue
+            self.store.update(t["task_id"], status="queued")
+            self._enqueue(t["task_id"], t["task_type"], t.get("payload") or {}, t.get("priority") or 0)
+            n += 1
+        return n
+
+    def _progress(self, task_id: str):
+        last = [-1]
+        def report(done: int, total: int):
+            pct = int(done * 100 / total) if total else 100
+            # 百分比变化时才写任务表，单个大批量任务不会逐条写库
+            if pct != last[0] or done == total:
+                last[0] = pct
+                self.store.update(task_id, progress=pct, done=done, total=total)
+        return report
+
+    def _worker(self):
+        while True:
+            _, _, task_id = self._queue.get()
+            if task_id is None:
+                return
+            cancel = threading.Event()
+            with self._lock:
+                entry = self._pending.pop(task_id, None)
+                if entry is not None:
+                    self._running[task_id] = cancel
+            if entry is None:
+                continue
+            task_type, payload = entry
+            self.store.update(task_id, status="processing")
+            try:
+                fields = self._handlers[task_type](payload, self._progress(task_id), cancel) or {}
+                if cancel.is_set():
+                    self.store.update(task_id, status="cancelled", **fields)
+                else:
+                    self.store.update(task_id, status="completed", progress=100, **fields)
+            except Exception as e:
+                self.store.update(task_id, status="cancelled" if cancel.is_set() else "failed", error=str(e))
+            finally:
+                with self._lock:
+                    self._running.pop(task_id, None)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put((float("inf"), next(self._seq), None))
+        if wait:
+            for t in threads:
+                t.join()
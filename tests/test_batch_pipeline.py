@@ -0,0 +1,41 @@
+import threading
+import time
+import unittest
+
+from text2sql.batch_pipeline import BatchPipeline
+
+class TestBatchPipeline(unittest.TestCase):
+    def test_keeps_input_order_with_concurrency(self):
+        active = {"llm": 0, "peak": 0}
+        lock = threading.Lock()
+        def prepare(n):
+            with lock:
+                active["llm"] += 1
+                active["peak"] = max(active["peak"], active["llm"])
+            time.sleep(0.02 * (5 - n % 5))
+            with lock:
+                active["llm"] -= 1
+            if n % 3 == 0:
+                return {"n": n, "skipped": True}, False
+            return {"n": n}, True
+        def execute(res):
+            time.sleep(0.01)
+            res["done"] = True
+            return res
+        started = time.monotonic()
+        out = list(BatchPipeline(llm_workers=4, db_workers=2).run(list(range(12)), prepare, execute))
+        self.assertEqual([r["n"] for r in out], list(range(12)))
+        self.assertTrue(all(r.get("skipped") or r.get("done") for r in out))
+        self.assertGreater(active["peak"], 1)
+        self.assertLess(time.monotonic() - started, 0.6)
+
+    def test_stage_errors_are_raised_in_order(self):
+        def execute(res):
+            raise ValueError("db down")
+        it = BatchPipeline(2, 2).run([1, 2], lambda n: (n, n == 2), execute)
+        self.assertEqual(next(it), 1)
+        with self.assertRaises(ValueError):
+            next(it)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from text2sql.bench import synth, fake_mysql
+from text2sql.bench.llm_stub import make_sql
+from text2sql.bench.loadgen import parse_mix, summarize, stage_summary
+
+class TestBenchFixtures(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.schema = synth.make_schema(30, seed=1)
+        synth.create_database(self.tmp.name, "bench", self.schema, rows=20, seed=1)
+        patcher = mock.patch.dict(sys.modules)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        fake_mysql.install(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_schema_is_deterministic(self):
+        self.assertEqual(synth.make_schema(30, seed=1), self.schema)
+        self.assertEqual(len(self.schema), 30)
+        self.assertEqual(len(set(self.schema)), 30)
+
+    def test_information_schema_and_params(self):
+        import pymysql
+        conn = pymysql.connect(host="127.0.0.1", user="u", password="p", database="bench")
+        cur = conn.cursor()
+        cur.execute("SELECT table_name, column_name FROM information_schema.columns WHERE table_schema=%s ORDER BY table_name, ordinal_position", ("bench",))
+        tables = {}
+        for t, c in cur.fetchall():
+            tables.setdefault(t, []).append(c)
+        self.assertEqual(tables, {t: self.schema[t] for t in sorted(self.schema)})
+        cur.execute("SELECT COUNT(*) FROM orders WHERE id > %s", (5,))
+        self.assertEqual(cur.fetchone()[0], 15)
+        cur.execute("SET SESSION MAX_EXECUTION_TIME=1000")
+        conn.close()
+
+    def test_kill_query_interrupts(self):
+        import pymysql
+        conn = pymysql.connect(database="bench")
+        killer = pymysql.connect(database="bench")
+        errors = []
+        def run():
+            try:
+                conn.cursor().execute("WITH RECURSIVE r(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM r) SELECT COUNT(*) FROM r")
+            except pymysql.err.OperationalError as e:
+                errors.append(e)
+        t = threading.Thread(target=run)
+        t.start()
+        t.join(0.2)
+        killer.cursor().execute(f"KILL QUERY {conn.thread_id()}")
+        t.join(5)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(errors[0].args[0], 1317)
+
+    def test_kb_size(self):
+        kb = os.path.join(self.tmp.name, "kb")
+        paths = synth.make_kb(kb, 200 * 1024, self.schema, file_bytes=64 * 1024)
+        total = sum(os.path.getsize(p) for p in paths)
+        self.assertGreaterEqual(total, 200 * 1024)
+        self.assertLess(total, 210 * 1024)
+        self.assertEqual({os.path.splitext(p)[1] for p in paths}, {".md", ".txt", ".csv"})
+
+    def test_stub_sql_uses_mentioned_table(self):
+        content = "问题：list amount of payments\nSchema：\ntable orders: id, amount\ntable payments: id, amount, status\n上下文：\n"
+        self.assertEqual(make_sql(content), "SELECT id, amount FROM payments")
+        self.assertEqual(make_sql("问题：随便\nSchema：\ntable orders: id, name\n"), "SELECT id FROM orders")
+
+class TestLoadgenReport(unittest.TestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("chat=3, history=1"), {"chat": 3.0, "history": 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix("delete=1")
+        with self.assertRaises(ValueError):
+            parse_mix("chat=0")
+
+    def test_summarize(self):
+        samples = [("chat", float(i), None) for i in range(1, 101)] + [("schema", 5.0, "code 500")]
+        r = summarize(samples, 2.0)
+        self.assertEqual(r["chat"]["requests"], 100)
+        self.assertEqual(r["chat"]["rps"], 50.0)
+        self.assertEqual(r["chat"]["p99_ms"], 99.0)
+        self.assertEqual(r["schema"]["error_rate"], 1.0)
+        self.assertEqual(r["total"]["errors"], {"code 500": 1})
+        self.assertNotIn("upload", r)
+
+    def test_stage_summary(self):
+        text = 'text2sql_stage_seconds_bucket{stage="llm",le="0.1"} 1\ntext2sql_stage_seconds_sum{stage="llm"} 0.300000\ntext2sql_stage_seconds_count{stage="llm"} 3\n'
+        self.assertEqual(stage_summary(text), {"llm": {"count": 3, "mean_ms": 100.0}})
+
+if __name__ == "__main__":
+    unittest.main()
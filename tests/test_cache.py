@@ -0,0 +1,86 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from text2sql.cache import LRUCache, DiskCache, TieredCache, ZstdBlobCache
+
+class TestLRUCache(unittest.TestCase):
+    def test_lru_eviction_and_stats(self):
+        c = LRUCache(max_entries=2)
+        c.set("a", 1)
+        c.set("b", 2)
+        self.assertEqual(c.get("a"), 1)
+        c.set("c", 3)
+        self.assertIsNone(c.get("b"))
+        self.assertEqual(c.get("c"), 3)
+        st = c.stats()
+        self.assertEqual((st["hits"], st["misses"], st["evictions"]), (2, 1, 1))
+
+    def test_ttl_expiry(self):
+        c = LRUCache(max_entries=10, ttl=0.01)
+        c.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(c.get("a"))
+
+class TestDiskCache(unittest.TestCase):
+    def test_survives_reopen_and_tiered_promotion(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "c.sqlite3")
+            DiskCache(path).set("k", "SELECT 1")
+            tiered = TieredCache(LRUCache(4), DiskCache(path))
+            self.assertEqual(tiered.get("k"), "SELECT 1")
+            self.assertEqual(tiered.stats()["hits"], 1)
+            self.assertEqual(tiered.memory.get("k"), "SELECT 1")
+
+    def test_blob_batch_roundtrip(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "b.sqlite3")
+            items = {f"k{i}": bytes([i]) * 1000 for i in range(10)}
+            ZstdBlobCache(path).set_many(items)
+            c = ZstdBlobCache(path)
+            got = c.get_many(["k1", "k3", "k3", "missing"])
+            self.assertEqual(got, {"k1": items["k1"], "k3": items["k3"]})
+            self.assertEqual((c.hits, c.misses), (2, 1))
+            self.assertEqual(c.get("k9"), items["k9"])
+
+class TestLLMClientCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.env = {"SILICONFLOW_API_KEY": "sk-test", "MODEL_NAME": "m1", "LLM_CACHE_PATH": os.path.join(self.tmp.name, "llm.sqlite3")}
+        self.saved = {k: os.environ.get(k) for k in self.env}
+        os.environ.update(self.env)
+
+    def tearDown(self):
+        for k, v in self.saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+        self.tmp.cleanup()
+
+    def _client(self, calls):
+        from text2sql.llm_client import LLMClient
+        llm = LLMClient()
+        def create(**kw):
+            calls.append(kw)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="SELECT a FROM t1;"))])
+        llm._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        return llm
+
+    def test_repeat_question_hits_cache_across_restart(self):
+        calls = []
+        schema = {"tables": {"t1": ["a"]}, "docs": ["table t1: a"], "fingerprint": "fp1"}
+        llm = self._client(calls)
+        self.assertEqual(llm.generate_sql("查询  a", schema, "mysql", 100), "SELECT a FROM t1")
+        self.assertEqual(llm.generate_sql("查询 a ", schema, "mysql", 100), "SELECT a FROM t1")
+        self.assertEqual(len(calls), 1)
+        restarted = self._client(calls)
+        restarted.generate_sql("查询 a", schema, "mysql", 100)
+        self.assertEqual(len(calls), 1)
+        restarted.generate_sql("查询 a", dict(schema, fingerprint="fp2"), "mysql", 100)
+        self.assertEqual(len(calls), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import sys
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import text2sql.db_executor as db_executor_mod
+from text2sql.db_executor import DbExecutor, _apply_time_limit
+
+KILLED = threading.Event()
+
+class FakeSSCursor:
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self._pos = 0
+        self.description = [("id",), ("name",)]
+        self.closed = False
+    def execute(self, sql, params=None):
+        self.sql = sql
+        if "SLEEP" in sql:
+            if not KILLED.wait(2):
+                raise AssertionError("watchdog did not fire")
+            raise Exception(1317, "Query execution was interrupted")
+    def fetchmany(self, n):
+        out = self._rows[self._pos:self._pos + n]
+        self._pos += len(out)
+        return out
+    def fetchone(self):
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+    def close(self):
+        self.closed = True
+
+class TestDbExecutorStreaming(unittest.TestCase):
+    def setUp(self):
+        self.conns = []
+        self.total = 10
+        test = self
+        class FakeConn:
+            def __init__(self):
+                self.closed = False
+                test.conns.append(self)
+            def cursor(self, cls=None):
+                if cls is None:
+                    return SimpleNamespace(execute=test.side_execute)
+                return FakeSSCursor((i, f"n{i}") for i in range(test.total))
+            def ping(self, reconnect=False):
+                pass
+            def thread_id(self):
+                return 42
+            def close(self):
+                self.closed = True
+        sys.modules['pymysql.cursors'] = SimpleNamespace(SSCursor=FakeSSCursor)
+        sys.modules['pymysql'] = SimpleNamespace(connect=lambda **kw: FakeConn(), cursors=sys.modules['pymysql.cursors'])
+        self.db_url = f"mysql://{self._testMethodName}:pw@localhost:3306/db"
+        self.db = DbExecutor(batch_size=3)
+        self.side_sql = []
+        KILLED.clear()
+
+    def side_execute(self, sql, params=None):
+        self.side_sql.append(sql)
+        KILLED.set()
+
+    def test_stream_batches_and_truncates(self):
+        with self.db.stream(self.db_url, "SELECT 1", row_limit=7) as rs:
+            batches = list(rs)
+        self.assertEqual([len(b) for b in batches], [3, 3, 1])
+        self.assertTrue(rs.truncated)
+        self.assertTrue(self.conns[0].closed)
+
+    def test_fetch_complete_result_reuses_connection(self):
+        rows, headers, truncated = self.db.fetch(self.db_url, "SELECT 1", row_limit=10)
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(headers, ["id", "name"])
+        self.assertFalse(truncated)
+        self.db.query(self.db_url, "SELECT 1", timeout=30, row_limit=100)
+        self.assertEqual(len(self.conns), 1)
+        self.assertFalse(self.conns[0].closed)
+
+    def test_time_limit_hint(self):
+        self.assertEqual(_apply_time_limit("select a from t", 2), "select /*+ MAX_EXECUTION_TIME(2000) */ a from t")
+        self.assertEqual(_apply_time_limit("EXPLAIN select 1", 2), "EXPLAIN select 1")
+        self.assertEqual(_apply_time_limit("select 1", None), "select 1")
+        self.assertEqual(_apply_time_limit("WITH c AS (SELECT a FROM t) SELECT a FROM c", 1),
+                         "WITH c AS (SELECT a FROM t) SELECT /*+ MAX_EXECUTION_TIME(1000) */ a FROM c")
+        self.assertEqual(_apply_time_limit("with recursive r(n) as (select 1 union all select n + 1 from r where n < 3), s as (select 'select') select n from r", 1),
+                         "with recursive r(n) as (select 1 union all select n + 1 from r where n < 3), s as (select 'select') select /*+ MAX_EXECUTION_TIME(1000) */ n from r")
+
+    def test_watchdog_kills_on_timeout(self):
+        patcher = mock.patch.object(db_executor_mod._watchdog, "grace", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with self.assertRaises(RuntimeError) as ctx:
+            self.db.fetch(self.db_url, "SELECT SLEEP(10)", timeout=0.05, row_limit=10)
+        self.assertIn("超时", str(ctx.exception))
+        self.assertEqual(self.side_sql, ["KILL QUERY 42"])
+
+    def test_watchdog_kills_on_cancel(self):
+        cancel = threading.Event()
+        threading.Timer(0.05, cancel.set).start()
+        with self.assertRaises(RuntimeError) as ctx:
+            self.db.fetch(self.db_url, "SELECT SLEEP(10)", timeout=None, row_limit=10, cancel=cancel)
+        self.assertIn("取消", str(ctx.exception))
+        with self.assertRaises(RuntimeError):
+            self.db.fetch(self.db_url, "SELECT 1", row_limit=10, cancel=cancel)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import sys
+import threading
+import unittest
+from types import SimpleNamespace
+
+from text2sql.db_pool import ConnectionPool
+
+class FakeConn:
+    def __init__(self, registry):
+        self.closed = False
+        self.pings = 0
+        self.alive = True
+        registry.append(self)
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.alive:
+            raise RuntimeError("gone away")
+    def close(self):
+        self.closed = True
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+        sys.modules['pymysql'] = SimpleNamespace(connect=lambda **kw: FakeConn(self.created))
+
+    def test_reuse_and_ping_on_borrow(self):
+        pool = ConnectionPool("mysql://u:p@h:3306/db", min_size=0, max_size=2)
+        with pool.connection() as c1:
+            pass
+        with pool.connection() as c2:
+            pass
+        self.assertIs(c1, c2)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(c1.pings, 1)
+
+    def test_dead_connection_replaced(self):
+        pool = ConnectionPool("mysql://u:p@h:3306/db", min_size=0, max_size=1)
+        with pool.connection() as c1:
+            pass
+        c1.alive = False
+        with pool.connection() as c2:
+            pass
+        self.assertIsNot(c1, c2)
+        self.assertTrue(c1.closed)
+
+    def test_error_discards_connection(self):
+        pool = ConnectionPool("mysql://u:p@h:3306/db", min_size=0, max_size=1)
+        with self.assertRaises(ValueError):
+            with pool.connection() as c1:
+                raise ValueError("boom")
+        self.assertTrue(c1.closed)
+        with pool.connection() as c2:
+            self.assertIsNot(c1, c2)
+
+    def test_idle_eviction_keeps_min(self):
+        pool = ConnectionPool("mysql://u:p@h:3306/db", min_size=1, max_size=3, idle_timeout=0)
+        a = pool.acquire()
+        b = pool.acquire()
+        pool.release(a)
+        pool.release(b)
+        c = pool.acquire()
+        self.assertEqual(sum(1 for x in self.created if x.closed), 1)
+        pool.release(c)
+
+    def test_max_size_blocks_until_release(self):
+        pool = ConnectionPool("mysql://u:p@h:3306/db", min_size=0, max_size=1, timeout=2)
+        a = pool.acquire()
+        threading.Timer(0.05, pool.release, args=(a,)).start()
+        b = pool.acquire()
+        self.assertIs(a, b)
+        pool.release(b)
+        pool.timeout = 0.01
+        pool.acquire()
+        with self.assertRaises(RuntimeError):
+            pool.acquire()
+
+if __name__ == "__main__":
+    unittest.main()
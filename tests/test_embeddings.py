@@ -0,0 +1,154 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from text2sql.cache import ZstdBlobCache
+from text2sql.embeddings import HashingEmbeddings, VectorIndex, CachedEmbeddings
+from text2sql.rag import RAGIndex, RAGRetriever
+
+DOCS = [
+    "table orders: id, user_id, amount, created_at",
+    "table users: id, name, city",
+    "电站装机容量按月统计，单位为兆瓦",
+    "发电量口径说明：上网电量不含厂用电",
+]
+
+class TestHashingEmbeddings(unittest.TestCase):
+    def test_deterministic_float32_matrix(self):
+        emb = HashingEmbeddings(dim=512)
+        a = emb.embed_documents(DOCS)
+        b = HashingEmbeddings(dim=512).embed_documents(DOCS)
+        self.assertEqual(a.dtype, np.float32)
+        self.assertEqual(a.shape, (4, 512))
+        self.assertTrue(np.array_equal(a, b))
+        self.assertEqual(emb.embed_documents([""]).sum(), 0)
+
+    def test_batch_size_does_not_change_vectors(self):
+        texts = DOCS + ["", "a", "ab"]
+        whole = HashingEmbeddings(dim=512, batch_size=256).embed_documents(texts)
+        for bs in (1, 2, 3):
+            self.assertTrue(np.array_equal(HashingEmbeddings(dim=512, batch_size=bs).embed_documents(texts), whole))
+        self.assertTrue(np.array_equal(HashingEmbeddings(dim=512).embed_query(DOCS[2]), whole[2]))
+
+    def test_search_ranks_similar_text(self):
+        vs = VectorIndex.from_texts(DOCS, HashingEmbeddings(dim=1024), metadatas=[{"i": i} for i in range(4)])
+        self.assertTrue(vs.matrix.flags["C_CONTIGUOUS"])
+        hits = vs.similarity_search("各电站的装机容量", k=2)
+        self.assertEqual(hits[0].page_content, DOCS[2])
+        self.assertEqual(hits[0].metadata, {"i": 2})
+        self.assertEqual(vs.similarity_search("user city", k=1)[0].page_content, DOCS[1])
+
+    def test_save_and_mmap_load(self):
+        emb = HashingEmbeddings(dim=256)
+        vs = VectorIndex.from_texts(DOCS, emb)
+        with tempfile.TemporaryDirectory() as tmp:
+            vs.save_local(tmp)
+            loaded = VectorIndex.load_local(tmp, emb)
+            self.assertIsInstance(loaded.matrix, np.memmap)
+            q = "上网电量"
+            self.assertEqual([h.page_content for h in loaded.similarity_search(q, 3)], [h.page_content for h in vs.similarity_search(q, 3)])
+            del loaded
+
+class TestLocalBackendInRAGIndex(unittest.TestCase):
+    def test_offline_index_is_persisted(self):
+        os.environ["RAG_EMBEDDING"] = "local"
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                idx = RAGIndex(index_dir=tmp)
+                self.assertEqual(idx._vs_cls.__name__, "VectorIndex")
+                idx.build(DOCS)
+                self.assertIsNotNone(idx.vs)
+                self.assertTrue(os.path.exists(os.path.join(tmp, idx.key, "vectors.npy")))
+                again = RAGIndex(index_dir=tmp)
+                again.build(list(DOCS))
+                self.assertEqual(again.key, idx.key)
+                self.assertIsInstance(again.vs.matrix, np.memmap)
+                r = RAGRetriever()
+                r.set_index(again)
+                self.assertEqual(r.query("装机容量", top_k=1), [DOCS[2]])
+                del again, r
+        finally:
+            os.environ.pop("RAG_EMBEDDING", None)
+
+class CountingEmbeddings:
+    model = "remote-emb"
+    def __init__(self, **kw):
+        self.calls = []
+        self.fail_next = 0
+    def embed_documents(self, texts):
+        if self.fail_next:
+            self.fail_next -= 1
+            raise RuntimeError("rate limited")
+        self.calls.append(list(texts))
+        return [[float(len(t)), float(sum(map(ord, t)) % 97)] for t in texts]
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+class RemoteStore:
+    built = []
+    def __init__(self, pairs, metadatas):
+        self.pairs = pairs
+        self.metadatas = metadatas
+    @classmethod
+    def from_embeddings(cls, text_embeddings, embedding, metadatas=None):
+        cls.built.append(len(text_embeddings))
+        return cls(list(text_embeddings), metadatas)
+    def save_local(self, path):
+        os.makedirs(path, exist_ok=True)
+
+class TestCachedEmbeddings(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ZstdBlobCache(os.path.join(self.tmp.name, "emb.sqlite3"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_only_missing_texts_are_embedded_in_batches(self):
+        backend = CountingEmbeddings()
+        emb = CachedEmbeddings(backend, self.cache, batch_size=2, concurrency=2)
+        first = emb.embed_documents(["a", "bb", "ccc", "a"])
+        self.assertEqual(first.dtype, np.float32)
+        self.assertEqual(sorted(len(c) for c in backend.calls), [1, 2])
+        backend.calls.clear()
+        again = CachedEmbeddings(backend, ZstdBlobCache(self.cache.path)).embed_documents(["ccc", "dddd", "a"])
+        self.assertEqual(backend.calls, [["dddd"]])
+        self.assertTrue(np.array_equal(again[0], first[2]))
+        self.assertTrue(np.array_equal(again[2], first[0]))
+
+    def test_retries_failed_batches(self):
+        backend = CountingEmbeddings()
+        backend.fail_next = 1
+        emb = CachedEmbeddings(backend, self.cache, retries=2)
+        import text2sql.embeddings as emb_mod
+        orig = emb_mod.time.sleep
+        emb_mod.time.sleep = lambda s: None
+        try:
+            self.assertEqual(emb.embed_documents(["x"]).shape, (1, 2))
+        finally:
+            emb_mod.time.sleep = orig
+        self.assertEqual(backend.calls, [["x"]])
+
+    def test_kb_edit_embeds_only_changed_chunks(self):
+        RemoteStore.built = []
+        backend = CountingEmbeddings()
+        def _index():
+            idx = RAGIndex(index_dir=os.path.join(self.tmp.name, "index"))
+            idx._emb_cls = lambda **kw: backend
+            idx._vs_cls = RemoteStore
+            idx._remote = True
+            idx._embed_cache = self.cache
+            return idx
+        docs = [f"chunk {i}" for i in range(50)]
+        _index().build(docs)
+        self.assertEqual(sum(len(c) for c in backend.calls), 50)
+        backend.calls.clear()
+        docs[7] = "chunk 7 edited"
+        _index().build(docs)
+        self.assertEqual(backend.calls, [["chunk 7 edited"]])
+        self.assertEqual(RemoteStore.built, [50, 50])
+
+if __name__ == "__main__":
+    unittest.main()
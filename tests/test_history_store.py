@@ -0,0 +1,79 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from text2sql.api import state
+from text2sql.api.state import HistoryStore
+
+def _item(i, q=None, sql=None):
+    return {"id": f"h{i}", "query_text": q or f"question {i}", "sql_generated": sql or f"SELECT {i}", "created_at": f"2025-01-01T00:00:{i:02d}Z"}
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "history.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pages_newest_first(self):
+        store = HistoryStore(self.path, max_entries=0)
+        for i in range(25):
+            store.add(_item(i))
+        self.assertEqual([h["id"] for h in store.list(1, 10)], [f"h{i}" for i in range(24, 14, -1)])
+        self.assertEqual([h["id"] for h in store.list(3, 10)], [f"h{i}" for i in range(4, -1, -1)])
+        self.assertEqual(store.list(4, 10), [])
+
+    def test_retention_keeps_newest(self):
+        store = HistoryStore(self.path, max_entries=50)
+        for i in range(200):
+            store.add(_item(i))
+        self.assertLessEqual(store.count(), 50 + 63)
+        self.assertEqual(store.list(1, 1)[0]["id"], "h199")
+
+    def test_full_text_search(self):
+        store = HistoryStore(self.path, max_entries=0)
+        store.add(_item(1, "统计每个城市的订单数量", "SELECT city, COUNT(*) FROM orders GROUP BY city"))
+        store.add(_item(2, "list active users", "SELECT * FROM users WHERE active = 1"))
+        store.add(_item(3, "订单金额最高的客户", "SELECT customer_id FROM orders ORDER BY amount DESC"))
+        self.assertEqual([h["id"] for h in store.list(1, 10, "订单")], ["h3", "h1"])
+        self.assertEqual([h["id"] for h in store.list(1, 10, "orders city")], ["h1"])
+        self.assertEqual([h["id"] for h in store.list(1, 10, "users")], ["h2"])
+        self.assertEqual(store.list(1, 10, "50%"), [])
+
+    def test_extra_fields_round_trip(self):
+        store = HistoryStore(self.path)
+        store.add(dict(_item(1), user="alice"))
+        self.assertEqual(store.list(1, 1)[0]["user"], "alice")
+
+    def test_migrates_legacy_json(self):
+        legacy = os.path.join(self.tmp.name, "history.json")
+        with open(legacy, "w", encoding="utf-8") as f:
+            json.dump([_item(2), _item(1)], f)
+        store = HistoryStore(self.path, legacy_path=legacy)
+        store.add(_item(3))
+        self.assertEqual([h["id"] for h in store.list(1, 10)], ["h3", "h2", "h1"])
+        self.assertFalse(os.path.exists(legacy))
+        self.assertTrue(os.path.exists(legacy + ".migrated"))
+
+    def test_custom_path_skips_legacy_migration(self):
+        with mock.patch.object(state, "_history", None), mock.patch.dict(os.environ, {"HISTORY_DB_PATH": self.path}):
+            store = state.get_history_store()
+            self.addCleanup(store.close)
+            self.assertEqual(store.path, self.path)
+            self.assertIsNone(store.legacy_path)
+
+    def test_concurrent_writes(self):
+        store = HistoryStore(self.path, max_entries=0)
+        threads = [threading.Thread(target=lambda n=n: [store.add(_item(n * 100 + i)) for i in range(50)]) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(store.count(), 400)
+
+if __name__ == "__main__":
+    unittest.main()
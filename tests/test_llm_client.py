@@ -0,0 +1,41 @@
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+
+class TestAsyncLLMClient(unittest.TestCase):
+    def setUp(self):
+        self.env = {"SILICONFLOW_API_KEY": "sk-test", "MODEL_NAME": "m1", "LLM_CACHE": "0", "LLM_MAX_CONCURRENCY": "3"}
+        self.saved = {k: os.environ.get(k) for k in self.env}
+        os.environ.update(self.env)
+
+    def tearDown(self):
+        for k, v in self.saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    def test_concurrency_limit_and_deadline(self):
+        from text2sql.llm_client import AsyncLLMClient
+        state = {"active": 0, "peak": 0}
+        async def create(**kw):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.05 if "slow" not in kw["messages"][1]["content"] else 1)
+            state["active"] -= 1
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="```sql\nSELECT 1;\n```"))])
+        async def main():
+            llm = AsyncLLMClient()
+            llm._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+            schema = {"docs": ["table t: a"]}
+            out = await asyncio.gather(*[llm.generate_sql(f"q{i}", schema, "mysql", 10) for i in range(9)])
+            self.assertEqual(set(out), {"SELECT 1"})
+            self.assertEqual(state["peak"], 3)
+            with self.assertRaises(RuntimeError):
+                await llm.generate_sql("slow", schema, "mysql", 10, timeout=0.05)
+            await llm._http.aclose()
+        asyncio.run(main())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import time
+import unittest
+
+from text2sql import metrics
+from text2sql.metrics import Counter, Histogram, StageTimer
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        h = Histogram("t_seconds", "test", ("stage",), buckets=(0.1, 1.0))
+        h.observe(0.05, stage="db")
+        h.observe(0.5, stage="db")
+        h.observe(5, stage="db")
+        lines = h.render()
+        self.assertIn('t_seconds_bucket{stage="db",le="0.1"} 1', lines)
+        self.assertIn('t_seconds_bucket{stage="db",le="1"} 2', lines)
+        self.assertIn('t_seconds_bucket{stage="db",le="+Inf"} 3', lines)
+        self.assertIn('t_seconds_count{stage="db"} 3', lines)
+
+    def test_counter_labels_are_escaped(self):
+        c = Counter("t_total", "test", ("name",))
+        c.inc(2, name='a"b')
+        self.assertIn('t_total{name="a\\"b"} 2', c.render())
+
+    def test_stage_timer_collects_request_metadata(self):
+        timer = StageTimer()
+        token = metrics.activate(timer)
+        try:
+            with metrics.stage("llm"):
+                time.sleep(0.01)
+            metrics.record_tokens(100, 7)
+            metrics.record_rows(3)
+        finally:
+            metrics.deactivate(token)
+        metrics.record_tokens(1, 1)
+        meta = timer.metadata()
+        self.assertGreaterEqual(meta["stages"]["llm"], 10)
+        self.assertEqual(meta["llm_tokens"], {"prompt": 100, "completion": 7})
+        self.assertEqual(meta["rows_fetched"], 3)
+        self.assertIn("text2sql_stage_seconds_count{stage=\"llm\"}", metrics.render())
+
+    def test_orchestrator_thread_pool_steps_record_to_request(self):
+        from text2sql.orchestrator import Orchestrator
+        o = Orchestrator()
+        def step():
+            with metrics.stage("schema"):
+                pass
+            return metrics.current()
+        async def main():
+            timer = StageTimer()
+            token = metrics.activate(timer)
+            try:
+                seen = await o.run_blocking(step)
+            finally:
+                metrics.deactivate(token)
+            return timer, seen
+        timer, seen = asyncio.run(main())
+        self.assertIs(seen, timer)
+        self.assertIn("schema", timer.stages)
+
+    def test_cache_hit_ratio_gauge(self):
+        metrics.record_cache("unit", True)
+        metrics.record_cache("unit", False)
+        self.assertIn('text2sql_cache_hit_ratio{cache="unit"} 0.5', metrics.render())
+
+if __name__ == "__main__":
+    unittest.main()
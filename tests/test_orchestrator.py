@@ -0,0 +1,160 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+import text2sql.orchestrator as orchestrator_mod
+from text2sql.orchestrator import Orchestrator
+
+class FakeAsyncLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_sql(self, question, schema, dialect, limit, context_docs=None):
+        self.calls += 1
+        await asyncio.sleep(0.05)
+        return "SELECT id FROM orders"
+
+class TestAsyncOrchestration(unittest.TestCase):
+    def _orchestrator(self):
+        o = Orchestrator()
+        o.async_workers = 4
+        o.allm = FakeAsyncLLM()
+        schema = {"tables": {"orders": ["id"]}, "docs": ["table orders: id"], "fingerprint": "fp"}
+        def prepare(question, show_schema):
+            time.sleep(0.01)
+            return schema, [], []
+        def finish(question, schema, sql, limit, explain, dry_run, schema_tables, cancel=None):
+            time.sleep(0.01)
+            return {"sql": sql, "thread": threading.current_thread().name}
+        o._prepare_context = prepare
+        o._finish_result = finish
+        return o
+
+    def test_identical_inflight_requests_are_coalesced(self):
+        o = self._orchestrator()
+        o.async_workers = 32
+        finished = []
+        def finish(question, schema, sql, limit, explain, dry_run, schema_tables, cancel=None):
+            finished.append(sql)
+            time.sleep(0.05)
+            return {"sql": sql, "rows": [(1,)]}
+        o._finish_result = finish
+        async def main():
+            same = [o.arun_to_result("  Top Orders ", 10, False, False) for _ in range(30)]
+            return await asyncio.gather(*same, o.arun_to_result("top orders", 20, False, False))
+        out = asyncio.run(main())
+        self.assertEqual(len(out), 31)
+        self.assertEqual(o.allm.calls, 2)
+        self.assertEqual(len(finished), 2)
+        self.assertIsNot(out[0], out[1])
+
+    def test_cancelled_shared_query_reruns_for_other_requests(self):
+        o = Orchestrator()
+        leader_cancel = threading.Event()
+        calls = []
+        def fetch_cached(db_url, sql, timeout=None, row_limit=None, cancel=None):
+            calls.append(cancel)
+            if cancel is leader_cancel:
+                time.sleep(0.1)
+                raise RuntimeError("查询已取消")
+            return [(1,)], ["id"], False, False
+        o.db = SimpleNamespace(fetch_cached=fetch_cached)
+        out = []
+        leader = threading.Thread(target=lambda: self.assertRaises(RuntimeError, o._fetch, "db", "SELECT 1", 10, leader_cancel))
+        leader.start()
+        time.sleep(0.02)
+        leader_cancel.set()
+        follower = threading.Thread(target=lambda: out.append(o._fetch("db", "SELECT  1", 10)))
+        follower.start()
+        leader.join()
+        follower.join()
+        self.assertEqual(out, [([(1,)], ["id"], False, False)])
+        self.assertEqual(len(calls), 2)
+
+    def test_literal_whitespace_not_coalesced(self):
+        o = Orchestrator()
+        def fetch_cached(db_url, sql, timeout=None, row_limit=None, cancel=None):
+            time.sleep(0.05)
+            return [(sql,)], ["sql"], False, False
+        o.db = SimpleNamespace(fetch_cached=fetch_cached)
+        sqls = ["SELECT id FROM t WHERE name = 'a b'", "SELECT id FROM t WHERE name = 'a  b'", "SELECT id FROM t  WHERE name = 'a b'"]
+        out = {}
+        threads = [threading.Thread(target=lambda s=s: out.__setitem__(s, o._fetch("db", s, 10)[0][0][0])) for s in sqls]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(out[sqls[1]], sqls[1])
+        self.assertIn(out[sqls[2]], (sqls[0], sqls[2]))
+        self.assertEqual(out[sqls[0]].count("'a b'"), 1)
+
+    def test_prune_runs_off_event_loop(self):
+        o = self._orchestrator()
+        threads = []
+        def prune(question, schema, ctx_docs=None):
+            threads.append(threading.current_thread().name)
+            return schema
+        o.linker = SimpleNamespace(prune=prune)
+        asyncio.run(o.arun_to_result("q", 10, False, False))
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("orch-io"))
+
+    def test_many_inflight_requests_share_bounded_pool(self):
+        o = self._orchestrator()
+        async def main():
+            return await asyncio.gather(*[o.arun_to_result(f"q{i}", 10, False, False) for i in range(200)])
+        started = time.monotonic()
+        out = asyncio.run(main())
+        self.assertEqual(len(out), 200)
+        self.assertLessEqual(len({r["thread"] for r in out}), 4)
+        self.assertTrue(all(r["thread"].startswith("orch-io") for r in out))
+        self.assertLess(time.monotonic() - started, 3)
+
+    def test_sync_path_spawns_no_threads(self):
+        o = self._orchestrator()
+        o.llm = SimpleNamespace(generate_sql=lambda *a, **kw: "SELECT 1")
+        before = threading.active_count()
+        self.assertEqual(o.run_to_result("q", 10, False, True)["sql"], "SELECT 1")
+        self.assertEqual(threading.active_count(), before)
+
+class TestStageTiming(unittest.TestCase):
+    def test_link_is_not_counted_in_llm(self):
+        m = orchestrator_mod.metrics
+        o = Orchestrator()
+        def prune(question, schema, ctx_docs=None):
+            time.sleep(0.05)
+            return schema
+        o.linker = SimpleNamespace(prune=prune)
+        o.llm = SimpleNamespace(generate_sql=lambda *a, **kw: "SELECT 1")
+        o.allm = SimpleNamespace(generate_sql=lambda *a, **kw: asyncio.sleep(0, "SELECT 1"))
+        o._prepare_context = lambda question, show_schema: ({"tables": {}, "docs": [], "fingerprint": "fp"}, [], [])
+        o._finish_result = lambda *a, **kw: {}
+        for run in (lambda: o._generate_sql("q", {"fingerprint": "fp"}, "mysql", 10, []), lambda: asyncio.run(o._arun("q2", 10, False, True, False, None))):
+            timer = m.StageTimer()
+            token = m.activate(timer)
+            try:
+                run()
+            finally:
+                m.deactivate(token)
+            self.assertGreaterEqual(timer.stages["link"], 50)
+            self.assertLess(timer.stages["llm"], 40)
+
+class TestBatchFile(unittest.TestCase):
+    def test_non_list_file_raises(self):
+        o = Orchestrator()
+        o.db_url = "mysql://u:p@localhost:3306/db"
+        o.schema = SimpleNamespace(load=lambda db_url, dialect: {"tables": {}, "docs": []})
+        o._index_docs = lambda schema: None
+        with tempfile.TemporaryDirectory() as tmp:
+            path = tmp + "/batch.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"question": "q"}, f)
+            with self.assertRaises(ValueError):
+                o.run_batch_file(path, 10, as_json=True)
+
+if __name__ == "__main__":
+    unittest.main()
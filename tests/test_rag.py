@@ -0,0 +1,200 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+from text2sql.rag import RAGIndex, RAGRetriever, BM25Index, tokenize, chunk_text
+
+class FakeEmbeddings:
+    def __init__(self, **kw):
+        self.model = "fake-emb"
+
+class FakeStore:
+    built = 0
+    def __init__(self, docs):
+        self.docs = docs
+    @classmethod
+    def from_texts(cls, docs, emb, metadatas=None):
+        cls.built += 1
+        return cls(list(docs))
+    @classmethod
+    def load_local(cls, path, emb, allow_dangerous_deserialization=False):
+        with open(os.path.join(path, "docs.txt"), "r", encoding="utf-8") as f:
+            return cls(f.read().split("\n"))
+    def save_local(self, path):
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "docs.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(self.docs))
+
+class TestRAGIndexPersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        FakeStore.built = 0
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _index(self):
+        idx = RAGIndex(index_dir=self.tmp.name)
+        idx._emb_cls = FakeEmbeddings
+        idx._vs_cls = FakeStore
+        return idx
+
+    def test_reuse_across_instances(self):
+        docs = ["table t1: c1, c2", "table t2: a"]
+        a = self._index()
+        a.build(docs)
+        a.build(docs)
+        b = self._index()
+        b.build(list(docs))
+        self.assertEqual(FakeStore.built, 1)
+        self.assertEqual(b.vs.docs, docs)
+        self.assertEqual(a.key, b.key)
+
+    def test_unchanged_build_skips_hashing(self):
+        docs = ["table t1: c1", "订单口径说明"]
+        metas = [{"source": "schema"}, {"source": "kb.md"}]
+        idx = self._index()
+        idx.build(docs, metas)
+        with mock.patch.object(idx, "content_key", wraps=idx.content_key) as key, mock.patch.object(idx, "_emb_cls", wraps=FakeEmbeddings) as emb:
+            idx.build(list(docs), [dict(m) for m in metas])
+            self.assertEqual((key.call_count, emb.call_count), (0, 0))
+            idx.build(docs + ["新文档"], metas + [{"source": "b.md"}])
+            self.assertEqual(key.call_count, 1)
+        self.assertEqual(FakeStore.built, 2)
+
+    def test_rebuild_on_change(self):
+        idx = self._index()
+        idx.build(["table t1: c1"])
+        idx.build(["table t1: c1, c2"])
+        self.assertEqual(FakeStore.built, 2)
+
+class TestKnowledgeBaseManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.kb = os.path.join(self.tmp.name, "kb")
+        os.makedirs(self.kb)
+        self.index_dir = os.path.join(self.tmp.name, "index")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, name, text):
+        with open(os.path.join(self.kb, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_unchanged_files_not_reparsed(self):
+        import text2sql.rag as rag_mod
+        self._write("a.txt", "电量 数据")
+        self._write("b.md", "station list")
+        calls = []
+        orig = rag_mod._extract_text
+        def counting(path):
+            calls.append(os.path.basename(path))
+            return orig(path)
+        rag_mod._extract_text = counting
+        try:
+            idx = RAGIndex(index_dir=self.index_dir)
+            os.environ["KB_WORKERS"] = "1"
+            self.assertEqual(sorted(idx.load_docs_from_dir(self.kb)), ["station list", "电量 数据"])
+            fresh = RAGIndex(index_dir=self.index_dir)
+            self.assertEqual(len(fresh.load_docs_from_dir(self.kb)), 2)
+            self.assertEqual(sorted(calls), ["a.txt", "b.md"])
+            os.remove(os.path.join(self.kb, "a.txt"))
+            self._write("c.txt", "new file")
+            self.assertEqual(sorted(fresh.load_docs_from_dir(self.kb)), ["new file", "station list"])
+            self.assertEqual(sorted(calls), ["a.txt", "b.md", "c.txt"])
+            self.assertNotIn(os.path.join(os.path.abspath(self.kb), "a.txt"), fresh.manifest)
+        finally:
+            rag_mod._extract_text = orig
+            os.environ.pop("KB_WORKERS", None)
+
+    def test_ingest_with_known_hash_and_find_duplicate(self):
+        import hashlib
+        self._write("a.md", "orders 订单")
+        path = os.path.join(self.kb, "a.md")
+        digest = hashlib.sha256("orders 订单".encode("utf-8")).hexdigest()
+        idx = RAGIndex(index_dir=self.index_dir)
+        self.assertIsNone(idx.find_by_hash(digest, self.kb))
+        self.assertEqual(idx.ingest_file(path, digest), "orders 订单")
+        self.assertEqual(idx.find_by_hash(digest, self.kb), os.path.abspath(path))
+        self.assertIsNone(idx.find_by_hash(digest, self.tmp.name))
+        self.assertEqual(RAGIndex(index_dir=self.index_dir).find_by_hash(digest), os.path.abspath(path))
+
+class TestChunking(unittest.TestCase):
+    def test_table_rows_repeat_header_with_overlap(self):
+        text = "\n".join(["name\tvalue"] + [f"row{i}\t{i}" for i in range(40)])
+        chunks = chunk_text(text, "csv", size=60, overlap=10)
+        self.assertGreater(len(chunks), 3)
+        for off, c in chunks:
+            self.assertTrue(c.startswith("name\tvalue\n"))
+            self.assertLessEqual(len(c), 60)
+            first_row = c.split("\n")[1]
+            self.assertEqual(text[off:off + len(first_row)], first_row)
+        rows = [c.split("\n")[1:] for _, c in chunks]
+        self.assertEqual(rows[0][-1], rows[1][0])
+        self.assertEqual(sorted({r for rs in rows for r in rs}), sorted(text.split("\n")[1:]))
+
+    def test_paragraphs_and_long_text(self):
+        text = "第一段内容。\n仍是第一段。\n\n第二段。\n\n" + "长" * 50
+        chunks = chunk_text(text, "md", size=20, overlap=5)
+        self.assertEqual(chunks[0], (0, "第一段内容。\n仍是第一段。\n\n第二段。"))
+        self.assertTrue(all(len(c) <= 20 for _, c in chunks))
+        tail = [c for _, c in chunks if c.startswith("长")]
+        self.assertEqual(len(tail), 3)
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual([off for off, c in chunks[1:]], [21, 36, 51])
+
+    def test_load_chunks_from_dir_keeps_source(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            kb = os.path.join(tmp, "kb")
+            os.makedirs(kb)
+            with open(os.path.join(kb, "a.csv"), "w", encoding="utf-8") as f:
+                f.write("\n".join(["station,capacity"] + [f"s{i},{i}" for i in range(200)]))
+            idx = RAGIndex(index_dir=os.path.join(tmp, "index"))
+            idx._emb_cls = None
+            os.environ["RAG_CHUNK_SIZE"] = "200"
+            try:
+                chunks, metas = idx.load_chunks_from_dir(kb)
+            finally:
+                os.environ.pop("RAG_CHUNK_SIZE", None)
+            self.assertGreater(len(chunks), 5)
+            self.assertEqual({m["source"] for m in metas}, {os.path.join(os.path.abspath(kb), "a.csv")})
+            self.assertEqual([m["chunk"] for m in metas], list(range(len(chunks))))
+            idx.build(chunks, metas)
+            r = RAGRetriever()
+            r.set_index(idx)
+            hit = r.search("s150", top_k=1)[0]
+            self.assertIn("s150\t150", hit["text"])
+            self.assertLessEqual(len(hit["text"]), 200)
+            self.assertEqual(hit["metadata"]["source"], metas[0]["source"])
+
+class TestBM25Fallback(unittest.TestCase):
+    def test_tokenize_cjk_bigrams_and_words(self):
+        self.assertEqual(tokenize("统计Order_Items数量"), ["统计", "order_items", "数量"])
+        self.assertEqual(tokenize("销售额 by city"), ["销售", "售额", "by", "city"])
+
+    def test_ranks_by_bm25(self):
+        docs = ["table orders: id, amount, city", "订单表记录每笔销售额", "用户表：姓名、城市", "weather report for the city"]
+        idx = BM25Index(docs)
+        hits = idx.search("每个城市的销售额", top_k=2)
+        self.assertEqual(hits[0][0], 1)
+        self.assertEqual(idx.search("orders amount", top_k=1)[0][0], 0)
+        self.assertEqual(idx.search("完全无关", top_k=3), [])
+
+    def test_retriever_uses_prebuilt_index(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        index = RAGIndex(index_dir=tmp.name)
+        index._emb_cls = None
+        index.build(["table users: id, name", "各城市订单数量统计口径"])
+        built = index.bm25
+        index.build(list(index.docs))
+        self.assertIs(index.bm25, built)
+        r = RAGRetriever()
+        r.set_index(index)
+        self.assertEqual(r.query("订单数量", top_k=3), ["各城市订单数量统计口径"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import sys
+import time
+import unittest
+from types import SimpleNamespace
+
+from text2sql.db_executor import DbExecutor
+from text2sql.result_cache import ResultCache
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.versions = {"orders": "2025-01-01 00:00:00", "users": None}
+        self.executed = []
+        test = self
+        class Cur:
+            description = [("id",), ("amount",)]
+            def __init__(self):
+                self._rows = []
+            def execute(self, sql, params=None):
+                if "information_schema.tables" in sql:
+                    self._rows = list(test.versions.items())
+                elif sql.startswith("SET"):
+                    self._rows = []
+                else:
+                    test.executed.append(sql)
+                    self._rows = [(i, i * 10) for i in range(5)]
+            def fetchall(self):
+                return self._rows
+            def fetchmany(self, n):
+                out, self._rows = self._rows[:n], self._rows[n:]
+                return out
+            def fetchone(self):
+                rows = self.fetchmany(1)
+                return rows[0] if rows else None
+            def close(self):
+                pass
+        class Conn:
+            def cursor(self, cls=None):
+                return Cur()
+            def ping(self, reconnect=False):
+                pass
+            def thread_id(self):
+                return 1
+            def close(self):
+                pass
+        sys.modules["pymysql.cursors"] = SimpleNamespace(SSCursor=Cur)
+        sys.modules["pymysql"] = SimpleNamespace(connect=lambda **kw: Conn(), cursors=sys.modules["pymysql.cursors"])
+        self.db_url = f"mysql://{self._testMethodName}:pw@localhost:3306/db"
+        self.cache = ResultCache(max_entries=8, max_bytes=1 << 20, ttl=60, check_interval=0)
+        self.db = DbExecutor(result_cache=self.cache)
+
+    def fetch(self, sql):
+        return self.db.fetch_cached(self.db_url, sql, row_limit=100)
+
+    def test_hit_for_same_normalized_sql(self):
+        rows, headers, truncated, hit = self.fetch("SELECT id, amount FROM orders")
+        self.assertFalse(hit)
+        rows2, headers2, _, hit2 = self.fetch("SELECT  id,\n amount FROM orders")
+        self.assertTrue(hit2)
+        self.assertEqual((rows2, headers2), (rows, headers))
+        self.assertEqual(len(self.executed), 1)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_update_time_change_invalidates(self):
+        self.fetch("SELECT o.id FROM orders o JOIN users u ON o.user_id = u.id")
+        self.fetch("SELECT id FROM users")
+        self.versions["orders"] = "2025-01-01 00:00:05"
+        self.assertFalse(self.fetch("SELECT o.id FROM orders o JOIN users u ON o.user_id = u.id")[3])
+        self.assertTrue(self.fetch("SELECT id FROM users")[3])
+        self.assertEqual(len(self.executed), 3)
+
+    def test_table_ttl_and_volatile_functions(self):
+        self.cache.table_ttl = {"users": 0.05}
+        self.fetch("SELECT id FROM users")
+        time.sleep(0.06)
+        self.assertFalse(self.fetch("SELECT id FROM users")[3])
+        self.fetch("SELECT id FROM orders ORDER BY RAND()")
+        self.assertFalse(self.fetch("SELECT id FROM orders ORDER BY RAND()")[3])
+        for sql in ("SELECT id FROM orders WHERE created_at > NOW() - INTERVAL 1 HOUR", "SELECT id, CURRENT_TIMESTAMP FROM orders", "SELECT NOW()", "SELECT 1"):
+            self.fetch(sql)
+            self.assertFalse(self.fetch(sql)[3], sql)
+
+    def test_literal_whitespace_not_shared(self):
+        self.fetch("SELECT id FROM orders WHERE note = 'a b'")
+        self.assertFalse(self.fetch("SELECT id FROM orders WHERE note = 'a  b'")[3])
+        self.assertTrue(self.fetch("SELECT id FROM orders WHERE note = 'a b'")[3])
+
+    def test_lru_by_entries_and_bytes(self):
+        for i in range(10):
+            self.fetch(f"SELECT id FROM orders WHERE id > {i}")
+        stats = self.cache.stats()
+        self.assertEqual(stats["entries"], 8)
+        self.assertEqual(stats["evictions"], 2)
+        self.assertFalse(self.fetch("SELECT id FROM orders WHERE id > 0")[3])
+        small = ResultCache(max_entries=100, max_bytes=1200, check_interval=0)
+        for i in range(10):
+            small.put(self.db_url, f"select {i}", None, [(j, "x" * 20) for j in range(5)], ["a", "b"], False, ((), {}, 60))
+        self.assertLessEqual(small.stats()["bytes"], 1200)
+        self.assertLess(small.stats()["entries"], 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import json
+import datetime
+import unittest
+from decimal import Decimal
+
+from text2sql.result_set import ResultSet, dumps
+
+class TestResultSet(unittest.TestCase):
+    def test_batches_are_stored_by_column(self):
+        rs = ResultSet.from_batches([[(1, "a"), (2, "b")], [], [(3, "c")]], ["id", "name"])
+        self.assertEqual(rs.columns, [[1, 2, 3], ["a", "b", "c"]])
+        self.assertEqual(len(rs), 3)
+        self.assertEqual(list(rs), [(1, "a"), (2, "b"), (3, "c")])
+        self.assertEqual(rs[-1], (3, "c"))
+        self.assertEqual(rs.column("name"), ["a", "b", "c"])
+        self.assertEqual(list(rs[1:].records()), [{"id": 2, "name": "b"}, {"id": 3, "name": "c"}])
+        self.assertEqual(rs, [(1, "a"), (2, "b"), (3, "c")])
+        with self.assertRaises(IndexError):
+            rs[3]
+
+    def test_from_rows_accepts_mappings(self):
+        rs = ResultSet.from_rows([{"id": 1, "name": "a", "extra": 0}], ["id", "name"])
+        self.assertEqual(list(rs), [(1, "a")])
+        self.assertIs(ResultSet.from_rows(rs, ["id", "name"]), rs)
+
+    def test_empty(self):
+        rs = ResultSet.from_rows([], ["id"])
+        self.assertFalse(rs)
+        self.assertEqual(list(rs), [])
+        self.assertEqual(dumps({"rows": rs}), b'{"rows":[]}')
+
+    def test_dumps_database_types(self):
+        rs = ResultSet.from_rows([(Decimal("10"), Decimal("1.25"), datetime.datetime(2025, 1, 2, 3, 4, 5), datetime.date(2025, 1, 2), datetime.timedelta(minutes=1), b"ok", None)],
+                                 ["a", "b", "c", "d", "e", "f", "g"])
+        out = json.loads(dumps({"columns": rs.headers, "rows": rs}))
+        self.assertEqual(out["rows"], [[10, 1.25, "2025-01-02T03:04:05", "2025-01-02", 60.0, "ok", None]])
+
+    def test_dumps_large_decimal(self):
+        rs = ResultSet.from_rows([(Decimal(2 ** 64 - 1), Decimal(2 ** 64), Decimal(-(2 ** 63) - 1), Decimal("1E+30"))], ["a", "b", "c", "d"])
+        out = json.loads(dumps({"rows": rs}))
+        self.assertEqual(out["rows"], [[2 ** 64 - 1, "18446744073709551616", "-9223372036854775809", "1" + "0" * 30]])
+
+    def test_dumps_floats(self):
+        values = [0.1, 1e16, 2.5e-05, -3.0, 1.7976931348623157e308]
+        out = dumps(values)
+        self.assertEqual(out, b"[0.1,1e16,0.000025,-3.0,1.7976931348623157e308]")
+        self.assertEqual(json.loads(out), values)
+        self.assertEqual(dumps([float("nan"), float("inf")]), b"[null,null]")
+
+    def test_indent_matches_stdlib(self):
+        obj = [{"问题": "统计", "n": 1, "x": [1, 2], "e": [], "d": {}}]
+        self.assertEqual(dumps(obj, indent=True).decode("utf-8"), json.dumps(obj, ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from text2sql.schema_linker import SchemaLinker
+
+def _schema(n_filler: int = 200) -> dict:
+    tables = {
+        "orders": ["id", "user_id", "amount", "created_at"],
+        "users": ["id", "name", "city"],
+        "productCategory": ["id", "title"],
+        "销售明细": ["id", "金额", "日期"],
+    }
+    for i in range(n_filler):
+        tables[f"log_{i}"] = ["id", f"field_{i}", "payload"]
+    return {"tables": tables, "docs": [f"table {t}: " + ", ".join(c) for t, c in tables.items()], "fingerprint": "fp-1"}
+
+class TestSchemaLinker(unittest.TestCase):
+    def test_small_schema_is_unchanged(self):
+        schema = _schema(0)
+        self.assertIs(SchemaLinker(top_k=8).prune("订单金额", schema), schema)
+
+    def test_prunes_to_relevant_and_linked_tables(self):
+        schema = _schema()
+        pruned = SchemaLinker(top_k=2).prune("total order amount per day", schema)
+        self.assertEqual(list(pruned["tables"])[0], "orders")
+        self.assertIn("users", pruned["tables"])
+        self.assertLess(len(pruned["tables"]), 6)
+        self.assertEqual(pruned["fingerprint"], "fp-1")
+        self.assertEqual(len(pruned["docs"]), len(pruned["tables"]))
+
+    def test_camel_case_cjk_and_rag_hits(self):
+        schema = _schema()
+        linker = SchemaLinker(top_k=1)
+        self.assertIn("productCategory", linker.prune("list every product category", schema)["tables"])
+        self.assertIn("销售明细", linker.prune("上个月的销售金额", schema)["tables"])
+        ranked = linker.score("payload", schema, context_docs=["table log_7: id, field_7, payload"])
+        self.assertEqual(ranked[0][0], "log_7")
+
+    def test_char_budget_keeps_whole_tables(self):
+        schema = _schema()
+        pruned = SchemaLinker(top_k=5, max_chars=60).prune("orders users", schema)
+        self.assertGreaterEqual(len(pruned["docs"]), 1)
+        for d in pruned["docs"]:
+            self.assertIn(d, schema["docs"])
+        self.assertLessEqual(sum(len(d) for d in pruned["docs"][1:]), 60)
+
+if __name__ == "__main__":
+    unittest.main()
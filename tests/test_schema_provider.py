@@ -22,6 +22,8 @@ class TestSchemaProviderMySQL(unittest.TestCase):
                 self.cursor_obj = FakeCursor()
             def cursor(self):
                 return self.cursor_obj
+            def ping(self, reconnect=False):
+                pass
             def close(self):
                 pass
         sys.modules['pymysql'] = SimpleNamespace(connect=lambda **kw: FakeConn())
@@ -48,5 +50,53 @@ class TestSchemaProviderMySQL(unittest.TestCase):
         self.assertFalse(bad)
         self.assertIn("pattern", reason)
 
+class TestSchemaProviderCache(unittest.TestCase):
+    def setUp(self):
+        state = {"fp": (2, None, 3, 100), "column_reads": 0, "connects": 0}
+        class FakeCursor:
+            def __init__(self):
+                self._sql = None
+            def execute(self, sql, params=None):
+                self._sql = sql
+                if "ordinal_position" in sql:
+                    state["column_reads"] += 1
+            def fetchall(self):
+                if "ordinal_position" in self._sql:
+                    return [("t1", "c1"), ("t1", "c2"), ("t2", "a")]
+                return [state["fp"]]
+        class FakeConn:
+            def cursor(self):
+                return FakeCursor()
+            def ping(self, reconnect=False):
+                pass
+            def close(self):
+                pass
+        def connect(**kw):
+            state["connects"] += 1
+            return FakeConn()
+        sys.modules['pymysql'] = SimpleNamespace(connect=connect)
+        self.state = state
+        # 连接池按 URL 共享，每个用例使用独立用户名以隔离连接池
+        self.db_url = f"mysql://{self._testMethodName}:pw@localhost:3306/db"
+
+    def test_ttl_hit_skips_database(self):
+        sp = SchemaProvider(ttl=60)
+        first = sp.load(self.db_url, "mysql")
+        second = sp.load(self.db_url, "mysql")
+        self.assertIs(first, second)
+        self.assertEqual(self.state["connects"], 1)
+        self.assertEqual(self.state["column_reads"], 1)
+
+    def test_reload_only_on_fingerprint_change(self):
+        sp = SchemaProvider(ttl=0)
+        first = sp.load(self.db_url, "mysql")
+        self.assertIs(sp.load(self.db_url, "mysql"), first)
+        self.assertEqual(self.state["column_reads"], 1)
+        self.state["fp"] = (3, None, 4, 123)
+        changed = sp.load(self.db_url, "mysql")
+        self.assertIsNot(changed, first)
+        self.assertNotEqual(changed["fingerprint"], first["fingerprint"])
+        self.assertEqual(self.state["column_reads"], 2)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from text2sql.singleflight import SingleFlight, AsyncSingleFlight
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_callers_share_one_call(self):
+        sf = SingleFlight()
+        calls = []
+        gate = threading.Event()
+        def work():
+            calls.append(1)
+            gate.wait(1)
+            return "result"
+        out = []
+        threads = [threading.Thread(target=lambda: out.append(sf.do("k", work))) for _ in range(10)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(out, ["result"] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sf.stats(), {"calls": 1, "shared": 9})
+
+    def test_error_is_shared_and_key_released(self):
+        sf = SingleFlight()
+        gate = threading.Event()
+        def fail():
+            gate.wait(1)
+            raise ValueError("boom")
+        errors = []
+        def call():
+            try:
+                sf.do("k", fail)
+            except ValueError as e:
+                errors.append(str(e))
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        gate.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, ["boom"] * 3)
+        self.assertEqual(sf.do("k", lambda: 1), 1)
+
+class TestAsyncSingleFlight(unittest.TestCase):
+    def test_concurrent_awaits_share_one_task(self):
+        sf = AsyncSingleFlight()
+        calls = []
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "sql"
+        async def main():
+            return await asyncio.gather(*[sf.do("k", work) for _ in range(20)], sf.do("other", work))
+        out = asyncio.run(main())
+        self.assertEqual(out, ["sql"] * 21)
+        self.assertEqual(len(calls), 2)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        sf = AsyncSingleFlight()
+        async def work():
+            await asyncio.sleep(0.05)
+            return 42
+        async def main():
+            first = asyncio.ensure_future(sf.do("k", work))
+            second = asyncio.ensure_future(sf.do("k", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+        self.assertEqual(asyncio.run(main()), 42)
+
+if __name__ == "__main__":
+    unittest.main()
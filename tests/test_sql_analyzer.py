@@ -0,0 +1,73 @@
+import unittest
+
+from text2sql.sql_analyzer import analyze, normalize_sql
+from text2sql.sql_guard import SqlGuard
+
+class TestSqlAnalyzer(unittest.TestCase):
+    def test_tables_columns_and_outer_limit(self):
+        a = analyze("SELECT o.id, u.name, sum(o.amount) total FROM orders o JOIN `users` AS u ON o.user_id = u.id GROUP BY o.id, u.name LIMIT 10, 20")
+        self.assertEqual(a.statement, "select")
+        self.assertIsNone(a.error)
+        self.assertEqual(a.tables, ("orders", "users"))
+        self.assertEqual(a.columns, ("id", "name", "amount", "user_id"))
+        self.assertEqual(a.limit, 20)
+
+    def test_subquery_limit_and_ctes(self):
+        a = analyze("select * from (select id from t1 limit 5) x")
+        self.assertIsNone(a.limit)
+        self.assertEqual(a.tables, ("t1",))
+        b = analyze("WITH a AS (SELECT id FROM t1), b AS (SELECT id FROM t2) SELECT * FROM a JOIN b USING (id)")
+        self.assertEqual(b.statement, "with")
+        self.assertIsNone(b.error)
+        self.assertEqual(b.tables, ("t1", "t2"))
+        self.assertEqual(b.ctes, ("a", "b"))
+
+    def test_from_inside_function_arguments(self):
+        a = analyze("SELECT EXTRACT(YEAR FROM created_at) y, count(*) FROM orders GROUP BY y")
+        self.assertEqual(a.tables, ("orders",))
+        self.assertEqual(a.columns, ("created_at",))
+        b = analyze("SELECT TRIM(LEADING '0' FROM code) FROM items")
+        self.assertEqual((b.tables, b.columns), (("items",), ("code",)))
+        c = analyze("SELECT SUBSTRING(name FROM 2 FOR 3) AS s FROM users WHERE id > 1")
+        self.assertEqual((c.tables, c.columns), (("users",), ("name", "id")))
+        d = analyze("SELECT COALESCE((SELECT max(a) FROM t3), 0) FROM t4")
+        self.assertEqual(d.tables, ("t3", "t4"))
+
+    def test_verdicts(self):
+        self.assertEqual(analyze("select 1; drop table x").error, "unsafe sql")
+        self.assertEqual(analyze("select 1; select 2").error, "multi statements not allowed")
+        self.assertEqual(analyze("show tables").error, "only select allowed")
+        self.assertEqual(analyze("select * from t for update").error, "unsafe sql")
+        self.assertEqual(analyze("select 1 into outfile '/tmp/x'").error, "unsafe sql")
+        self.assertIsNone(analyze("select updated_at, 'delete me', `drop` from t -- update").error)
+        self.assertIsNone(analyze("select replace(name, 'a', 'b') from t;").error)
+
+    def test_executable_comments_rejected(self):
+        self.assertEqual(analyze('select * from t /*! into outfile "/tmp/x" */').error, "unsafe sql")
+        self.assertEqual(analyze("select /*+ SET_VAR(sql_mode='') */ * from t").error, "unsafe sql")
+        self.assertIsNone(analyze("select /*+ MAX_EXECUTION_TIME(1000) */ * from t /* note */").error)
+
+    def test_cached_per_exact_sql(self):
+        self.assertIs(analyze("select a from t"), analyze("select a from t"))
+        self.assertEqual(normalize_sql(" select\ta  from t "), "select a from t")
+        self.assertNotEqual(normalize_sql("select 1 from t where n = 'a  b'"), normalize_sql("select 1 from t where n = 'a b'"))
+
+class TestSqlGuard(unittest.TestCase):
+    def test_validate(self):
+        g = SqlGuard()
+        self.assertEqual(g.validate("SELECT id, updated_at FROM orders;", "mysql"), "SELECT id, updated_at FROM orders LIMIT 100")
+        self.assertEqual(g.validate("select * from (select id from t limit 5) x -- note", "mysql"), "select * from (select id from t limit 5) x LIMIT 100")
+        self.assertEqual(g.validate("select id from t limit 3", "mysql"), "select id from t limit 3")
+        self.assertEqual(g.analyze("SELECT id, updated_at FROM orders LIMIT 100").limit, 100)
+        with self.assertRaises(ValueError):
+            g.validate("delete from t", "mysql")
+
+    def test_validate_keeps_literal_whitespace(self):
+        g = SqlGuard()
+        self.assertEqual(g.validate("SELECT id FROM t WHERE name = 'a  b' LIMIT 5", "mysql"), "SELECT id FROM t WHERE name = 'a  b' LIMIT 5")
+        self.assertEqual(g.validate("SELECT id FROM t WHERE name = 'a b' LIMIT 5", "mysql"), "SELECT id FROM t WHERE name = 'a b' LIMIT 5")
+        self.assertEqual(g.validate("SELECT id FROM t WHERE name = 'x  y'", "mysql"), "SELECT id FROM t WHERE name = 'x  y' LIMIT 100")
+        self.assertEqual(g.validate("SELECT id FROM t WHERE name = 'x y'", "mysql"), "SELECT id FROM t WHERE name = 'x y' LIMIT 100")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from text2sql.api import state
+from text2sql.api.state import TaskStore
+from text2sql.task_scheduler import TaskScheduler
+
+def _wait(pred, timeout=3):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if pred():
+            return True
+        time.sleep(0.01)
+    return False
+
+class TestTaskScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = TaskStore(os.path.join(self.tmp.name, "tasks.sqlite3"))
+        self.schedulers = []
+
+    def tearDown(self):
+        for s in self.schedulers:
+            s.shutdown()
+        self.store.close()
+        self.tmp.cleanup()
+
+    def _scheduler(self, workers=1):
+        s = TaskScheduler(self.store, workers)
+        self.schedulers.append(s)
+        return s
+
+    def test_priority_order_and_bounded_workers(self):
+        s = self._scheduler(workers=1)
+        gate = threading.Event()
+        order, active, peak = [], [0], [0]
+        def handler(payload, progress, cancel):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            if payload["name"] == "first":
+                gate.wait(2)
+            order.append(payload["name"])
+            active[0] -= 1
+        s.register("job", handler)
+        s.submit("t0", "job", {"name": "first"})
+        self.assertTrue(_wait(lambda: self.store.get("t0")["status"] == "processing"))
+        s.submit("t1", "job", {"name": "low"}, priority=0)
+        s.submit("t2", "job", {"name": "high"}, priority=5)
+        s.submit("t3", "job", {"name": "low2"}, priority=0)
+        gate.set()
+        self.assertTrue(_wait(lambda: self.store.get("t3")["status"] == "completed"))
+        self.assertEqual(order, ["first", "high", "low", "low2"])
+        self.assertEqual(peak[0], 1)
+
+    def test_progress_and_result_fields(self):
+        s = self._scheduler()
+        seen = []
+        def handler(payload, progress, cancel):
+            for i in range(1, 5):
+                progress(i, 4)
+                seen.append(self.store.get("t")["progress"])
+            return {"result_url": "/v1/downloads/out.json"}
+        s.register("job", handler)
+        s.submit("t", "job")
+        self.assertTrue(_wait(lambda: self.store.get("t")["status"] == "completed"))
+        t = self.store.get("t")
+        self.assertEqual(seen, [25, 50, 75, 100])
+        self.assertEqual((t["done"], t["total"], t["result_url"]), (4, 4, "/v1/downloads/out.json"))
+
+    def test_cancel_queued_and_running(self):
+        s = self._scheduler()
+        started = threading.Event()
+        def handler(payload, progress, cancel):
+            started.set()
+            cancel.wait(2)
+        s.register("job", handler)
+        s.submit("a", "job")
+        s.submit("b", "job")
+        self.assertTrue(started.wait(2))
+        self.assertTrue(s.cancel("b"))
+        self.assertEqual(self.store.get("b")["status"], "cancelled")
+        self.assertTrue(s.cancel("a"))
+        self.assertTrue(_wait(lambda: self.store.get("a")["status"] == "cancelled"))
+        self.assertFalse(s.cancel("a"))
+
+    def test_failure_is_recorded(self):
+        s = self._scheduler()
+        def handler(payload, progress, cancel):
+            raise RuntimeError("boom")
+        s.register("job", handler)
+        s.submit("t", "job")
+        self.assertTrue(_wait(lambda: self.store.get("t")["status"] == "failed"))
+        self.assertEqual(self.store.get("t")["error"], "boom")
+
+    def test_recover_requeues_unfinished_tasks(self):
+        self.store.create("t1", "job", {"n": 1})
+        self.store.update("t1", status="processing", progress=40)
+        self.store.create("t2", "gone", {})
+        self.store.create("t3", "job", {"n": 3})
+        self.store.update("t3", status="completed")
+        ran = []
+        s = self._scheduler()
+        s.register("job", lambda payload, progress, cancel: ran.append(payload["n"]))
+        self.assertEqual(s.recover(), 1)
+        self.assertTrue(_wait(lambda: self.store.get("t1")["status"] == "completed"))
+        self.assertEqual(ran, [1])
+        self.assertEqual(self.store.get("t2")["status"], "failed")
+
+class TestTaskStorePath(unittest.TestCase):
+    def test_custom_path_skips_legacy_migration(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tasks.sqlite3")
+            with mock.patch.object(state, "_task_store", None), mock.patch.dict(os.environ, {"TASK_DB_PATH": path}):
+                store = state.get_task_store()
+                self.assertEqual(store.path, path)
+                self.assertIsNone(store.legacy_path)
+                store.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import asyncio
+import hashlib
+import os
+import tempfile
+import unittest
+
+from text2sql.api.upload import receive_multipart
+
+BOUNDARY = "----t2sboundary"
+CTYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+def _body(content: bytes, filename: str = "kb.md", fields: dict | None = None) -> bytes:
+    out = [f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\nContent-Type: text/markdown\r\n\r\n".encode() + content + b"\r\n"]
+    for k, v in (fields or {}).items():
+        out.append(f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{k}\"\r\n\r\n{v}\r\n".encode())
+    out.append(f"--{BOUNDARY}--\r\n".encode())
+    return b"".join(out)
+
+class _Stream:
+    def __init__(self, body: bytes, chunk: int):
+        self.body = body
+        self.chunk = chunk
+        self.read = 0
+
+    async def __aiter__(self):
+        while self.read < len(self.body):
+            piece = self.body[self.read:self.read + self.chunk]
+            self.read += len(piece)
+            yield piece
+
+class TestReceiveMultipart(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_fields_and_file_across_small_chunks(self):
+        content = "订单表 orders\n".encode() * 500
+        stream = _Stream(_body(content, "统计.md", {"task_type": "update_kb", "priority": "3"}), 7)
+        up = asyncio.run(receive_multipart(stream, CTYPE, self.tmp.name, 1 << 20, chunk_size=1000))
+        self.assertEqual(up.fields, {"task_type": "update_kb", "priority": "3"})
+        self.assertEqual(up.filename, "统计.md")
+        self.assertEqual((up.size, up.sha256), (len(content), hashlib.sha256(content).hexdigest()))
+        with open(up.path, "rb") as f:
+            self.assertEqual(f.read(), content)
+        self.assertTrue(os.path.basename(up.path).startswith(".upload_"))
+
+    def test_over_limit_stops_reading_body(self):
+        body = _body(b"x" * (20 << 20))
+        stream = _Stream(body, 64 * 1024)
+        self.assertIsNone(asyncio.run(receive_multipart(stream, CTYPE, self.tmp.name, 1 << 20)))
+        self.assertLess(stream.read, (1 << 20) + 2 * 64 * 1024)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_malformed_requests(self):
+        with self.assertRaises(ValueError):
+            asyncio.run(receive_multipart(_Stream(b"a=1", 10), "application/x-www-form-urlencoded", self.tmp.name, 100))
+        no_file = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"task_type\"\r\n\r\nupdate_kb\r\n--{BOUNDARY}--\r\n".encode()
+        with self.assertRaises(ValueError):
+            asyncio.run(receive_multipart(_Stream(no_file, 10), CTYPE, self.tmp.name, 100))
+        truncated = _body(b"abc" * 100)[:150]
+        with self.assertRaises(ValueError):
+            asyncio.run(receive_multipart(_Stream(truncated, 10), CTYPE, self.tmp.name, 1000))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+if __name__ == "__main__":
+    unittest.main()